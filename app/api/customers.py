@@ -1,20 +1,54 @@
 """Customer API endpoints."""
 
-from typing import List
+import json
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.db import get_db
+from app.api.etag import etag_matches, make_etag, not_modified
+from app.db import get_async_db, get_async_session_factory
 from app.schemas.customer import (
+    CustomerBulkCreate,
+    CustomerBulkCreateResponse,
     CustomerCreate,
     CustomerUpdate,
     CustomerWithPortfolio,
 )
+from app.schemas.portfolio import PortfolioStockUpdate
 from app.services.customer_service import CustomerService
+from app.services.valuation_service import ValuationService
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
+# Largest page list_customers returns
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def schedule_valuations(
+    background_tasks: BackgroundTasks,
+    portfolio_ids: List[UUID],
+    session_factory: async_sessionmaker,
+) -> None:
+    """Store daily values of written portfolios once the response is sent."""
+    if portfolio_ids:
+        background_tasks.add_task(
+            ValuationService.refresh_later, portfolio_ids, session_factory
+        )
+
 
 @router.post(
     "/",
@@ -22,9 +56,11 @@ router = APIRouter(prefix="/customers", tags=["customers"])
     status_code=status.HTTP_201_CREATED,
     summary="Create a new customer",
 )
-def create_customer(
+async def create_customer(
     customer: CustomerCreate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory),
 ):
     """
     Create a new customer with optional initial portfolio stocks.
@@ -32,9 +68,13 @@ def create_customer(
     - **name**: Customer name (required)
     - **address**: Customer address (required)
     - **stocks**: Optional list of initial stocks in format [{"ticker": "AAPL", "quantity": 10}]
+
+    The portfolio's daily values are stored after the response is sent.
     """
+    pending: List[UUID] = []
     try:
-        new_customer = CustomerService.create_customer(db, customer)
+        new_customer = await CustomerService.create_customer(db, customer, pending)
+        schedule_valuations(background_tasks, pending, session_factory)
         return new_customer
     except Exception as e:
         raise HTTPException(
@@ -43,24 +83,89 @@ def create_customer(
         )
 
 
+@router.post(
+    "/bulk",
+    response_model=CustomerBulkCreateResponse,
+    summary="Create many customers",
+)
+async def bulk_create_customers(
+    request: CustomerBulkCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory),
+):
+    """
+    Create up to 10,000 customers with portfolios in one transaction.
+
+    - **customers**: Items in the same format as `POST /customers/`
+
+    Each item is validated on its own; invalid items, and items holding
+    unknown tickers, are reported in `results` without aborting the rest.
+    The new portfolios' daily values are stored after the response is sent.
+    """
+    pending: List[UUID] = []
+    result = await CustomerService.bulk_create_customers(db, request.customers, pending)
+    schedule_valuations(background_tasks, pending, session_factory)
+    return result
+
+
+@router.get(
+    "/export",
+    summary="Export all customers",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_customers(db: AsyncSession = Depends(get_async_db)):
+    """
+    Export every customer with their holdings, oldest first.
+
+    Streams newline-delimited JSON, one object per customer in the same shape
+    as `GET /customers/{customer_id}`. Rows are read from a server-side
+    cursor in chunks, so memory use does not grow with the number of
+    customers.
+    """
+
+    async def stream_lines():
+        async for customers in CustomerService.stream_customers(db):
+            yield "".join(json.dumps(customer) + "\n" for customer in customers)
+
+    return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+
+
 @router.get(
     "/{customer_id}",
     response_model=CustomerWithPortfolio,
     summary="Get customer by ID",
 )
-def get_customer(
+async def get_customer(
     customer_id: UUID,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve a customer by their UUID along with their portfolio.
+
+    Responses carry an `ETag`. Send it back in `If-None-Match` to get an empty
+    `304 Not Modified` while the customer and their holdings are unchanged.
     """
-    customer = CustomerService.get_customer(db, customer_id)
+    if if_none_match:
+        # Answer from a version-only query before loading the portfolio graph
+        version = await CustomerService.get_customer_version(db, customer_id)
+        if version is not None:
+            etag = make_etag("customer", customer_id, *version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    customer = await CustomerService.get_customer(db, customer_id)
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Customer with ID {customer_id} not found",
         )
+    response.headers["ETag"] = make_etag(
+        "customer", customer.id, *CustomerService.customer_version(customer)
+    )
     return customer
 
 
@@ -69,18 +174,35 @@ def get_customer(
     response_model=List[CustomerWithPortfolio],
     summary="List all customers",
 )
-def list_customers(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def list_customers(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Retrieve all customers with pagination.
+    Retrieve all customers with pagination, oldest first.
 
-    - **skip**: Number of records to skip (default: 0)
     - **limit**: Maximum number of records to return (default: 100)
+    - **cursor**: Cursor from the previous page's `X-Next-Cursor` header
+    - **skip**: Number of records to skip (default: 0); ignored with `cursor`
+
+    When more customers exist, the response carries an `X-Next-Cursor` header
+    to pass as `cursor` for the next page. Cursor pages cost the same at any
+    depth, unlike `skip`.
     """
-    customers = CustomerService.get_customers(db, skip=skip, limit=limit)
+    if cursor is None and skip:
+        return await CustomerService.get_customers(db, skip=skip, limit=limit)
+
+    try:
+        customers, next_cursor = await CustomerService.get_customers_page(
+            db, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return customers
 
 
@@ -89,10 +211,12 @@ def list_customers(
     response_model=CustomerWithPortfolio,
     summary="Update customer",
 )
-def update_customer(
+async def update_customer(
     customer_id: UUID,
     customer: CustomerUpdate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory),
 ):
     """
     Update customer information and/or portfolio.
@@ -100,9 +224,14 @@ def update_customer(
     All fields are optional:
     - **name**: Update customer name
     - **address**: Update customer address
-    - **stocks**: Replace portfolio stocks with new list
+    - **stocks**: Replace portfolio stocks with new list; only holdings that
+      differ from the current ones are written
     """
-    updated_customer = CustomerService.update_customer(db, customer_id, customer)
+    pending: List[UUID] = []
+    updated_customer = await CustomerService.update_customer(
+        db, customer_id, customer, pending
+    )
+    schedule_valuations(background_tasks, pending, session_factory)
     if not updated_customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -111,19 +240,53 @@ def update_customer(
     return updated_customer
 
 
+@router.patch(
+    "/{customer_id}/holdings/{ticker}",
+    response_model=CustomerWithPortfolio,
+    summary="Set one holding",
+)
+async def set_holding(
+    customer_id: UUID,
+    ticker: str,
+    holding: PortfolioStockUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory: async_sessionmaker = Depends(get_async_session_factory),
+):
+    """
+    Set the quantity of a single holding without rewriting the portfolio.
+
+    - **quantity**: New number of shares; 0 removes the holding
+    """
+    pending: List[UUID] = []
+    try:
+        customer = await CustomerService.set_holding(
+            db, customer_id, ticker.upper(), holding.quantity, pending
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    schedule_valuations(background_tasks, pending, session_factory)
+    if not customer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Customer with ID {customer_id} not found",
+        )
+    return customer
+
+
 @router.delete(
     "/{customer_id}",
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Delete customer",
 )
-def delete_customer(
+async def delete_customer(
     customer_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Delete a customer and their associated portfolio (cascade delete).
     """
-    deleted = CustomerService.delete_customer(db, customer_id)
+    deleted = await CustomerService.delete_customer(db, customer_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,28 @@
+"""Entity tags for conditional GET requests."""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the values a representation depends on."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return "*" in candidates or etag in (
+        candidate.removeprefix("W/") for candidate in candidates
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """An empty 304 response carrying the current ETag."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -1,23 +1,32 @@
 """Portfolio API endpoints."""
 
+import json
 from datetime import datetime
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.schemas.portfolio import PortfolioReturnResponse
+from app.db import get_async_db
+from app.schemas.portfolio import (
+    PortfolioBatchReturnRequest,
+    PortfolioReturnResponse,
+    PortfolioTimeSeriesResponse,
+)
 from app.services.portfolio_service import PortfolioService
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
+# Longest range a daily time series may cover
+MAX_TIMESERIES_DAYS = 3660
+
 
 @router.get(
     "/{customer_id}/returns",
     response_model=PortfolioReturnResponse,
     summary="Calculate portfolio returns",
 )
-def calculate_portfolio_returns(
+async def calculate_portfolio_returns(
     customer_id: UUID,
     start_date: str = Query(
         ...,
@@ -29,7 +38,7 @@ def calculate_portfolio_returns(
         description="End date in YYYY-MM-DD format",
         regex=r"^\d{4}-\d{2}-\d{2}$",
     ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Calculate portfolio returns for a customer over a date range.
@@ -54,7 +63,7 @@ def calculate_portfolio_returns(
             )
 
         # Calculate returns
-        result = PortfolioService.calculate_portfolio_return(
+        result = await PortfolioService.calculate_portfolio_return(
             db, customer_id, start, end
         )
         return result
@@ -74,3 +83,123 @@ def calculate_portfolio_returns(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error calculating returns: {str(e)}",
         )
+
+
+@router.get(
+    "/{customer_id}/timeseries",
+    response_model=PortfolioTimeSeriesResponse,
+    summary="Daily portfolio value time series",
+)
+async def get_portfolio_timeseries(
+    customer_id: UUID,
+    start_date: str = Query(
+        ...,
+        description="Start date in YYYY-MM-DD format",
+        pattern=r"^\d{4}-\d{2}-\d{2}$",
+    ),
+    end_date: str = Query(
+        ...,
+        description="End date in YYYY-MM-DD format",
+        pattern=r"^\d{4}-\d{2}-\d{2}$",
+    ),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Daily portfolio value, daily return and cumulative return over a date range.
+
+    - **customer_id**: Customer UUID
+    - **start_date**: Start date in YYYY-MM-DD format
+    - **end_date**: End date in YYYY-MM-DD format
+
+    Returns one point per calendar day; non-trading days carry the previous
+    close forward.
+
+    Example: `/portfolio/{customer_id}/timeseries?start_date=2024-01-01&end_date=2024-01-31`
+    """
+    try:
+        # Parse dates
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+        if start > end:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_date must be before end_date",
+            )
+        if (end - start).days >= MAX_TIMESERIES_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Date range must not exceed {MAX_TIMESERIES_DAYS} days",
+            )
+
+        return await PortfolioService.calculate_portfolio_timeseries(
+            db, customer_id, start, end
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        if "not found" in str(e):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(e),
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid date format or data: {str(e)}",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error calculating time series: {str(e)}",
+        )
+
+
+@router.post(
+    "/returns/batch",
+    summary="Calculate portfolio returns for many customers",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def calculate_portfolio_returns_batch(
+    request: PortfolioBatchReturnRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Calculate portfolio returns for many customers over the same date range.
+
+    - **customer_ids**: Customer UUIDs to include
+    - **all_customers**: Set to true instead of `customer_ids` to include everyone
+    - **start_date**: Start date in YYYY-MM-DD format
+    - **end_date**: End date in YYYY-MM-DD format
+    - **include_holdings**: Set to false for totals only, read from precomputed
+      daily portfolio values
+
+    Streams newline-delimited JSON, one object per customer in the same shape
+    as `/portfolio/{customer_id}/returns`. Unknown customers produce
+    `{"customer_id": ..., "error": ...}` lines.
+    """
+    try:
+        start = datetime.strptime(request.start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(request.end_date, "%Y-%m-%d").date()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid date format or data: {str(e)}",
+        )
+
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before end_date",
+        )
+
+    customer_ids = None if request.all_customers else request.customer_ids
+
+    async def stream_results():
+        async for result in PortfolioService.calculate_portfolio_returns_batch(
+            db, customer_ids, start, end, request.include_holdings
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
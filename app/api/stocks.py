@@ -1,10 +1,28 @@
 """Stock API endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-
-from app.db import get_db
-from app.schemas.stock import StockResponse
+from datetime import date
+from typing import Literal, Optional
+from uuid import UUID
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.etag import etag_matches, make_etag, not_modified
+from app.db import get_async_db
+from app.schemas.stock import (
+    IngestionJobResponse,
+    StockPopulateResponse,
+    StockResponse,
+)
+from app.services.job_service import JobService
 from app.services.stock_service import StockService
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
@@ -12,23 +30,35 @@ router = APIRouter(prefix="/stocks", tags=["stocks"])
 
 @router.post(
     "/populate/{ticker}",
-    response_model=StockResponse,
+    response_model=StockPopulateResponse,
     summary="Populate stock data for a ticker",
 )
 async def populate_stock_data(
     ticker: str,
-    db: Session = Depends(get_db),
+    backfill_from: Optional[date] = Query(
+        None, description="Also fetch missing history back to this day"
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Fetch and store stock data from Polygon API for a specific ticker.
 
     - **ticker**: Stock ticker symbol (e.g., AAPL, GOOGL)
+    - **backfill_from**: Optional YYYY-MM-DD; history before the earliest
+      stored day is fetched back to it, a year per request
 
-    This will fetch the last 14 days of closing prices.
+    Only days since the last stored price are fetched (the last 14 days for
+    a new ticker). Reports how many price rows were inserted and updated.
     """
     try:
-        stock = await StockService.populate_stock_data(db, ticker.upper())
-        return stock
+        stock, counts = await StockService.populate_stock_data(
+            db, ticker.upper(), backfill_from
+        )
+        return StockPopulateResponse(
+            **StockResponse.model_validate(stock).model_dump(),
+            rows_inserted=counts["inserted"],
+            rows_updated=counts["updated"],
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,45 +72,93 @@ async def populate_stock_data(
     summary="Populate Fortune 500 stock data",
 )
 async def populate_fortune500_stocks(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    backfill_from: Optional[date] = Query(
+        None, description="Also fetch missing history back to this day"
+    ),
+    mode: Literal["per_ticker", "grouped"] = Query(
+        "per_ticker",
+        description="One Polygon request per ticker, or one grouped daily "
+        "request per trading day for all tickers",
+    ),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Fetch and store stock data for Fortune 500 companies.
 
-    This is a long-running operation and runs in the background.
-    Returns immediately with status 202 Accepted.
-    """
-
-    async def fetch_all_stocks():
-        await StockService.populate_fortune500_stocks(db)
+    This is a long-running operation, so it is queued as an ingestion job
+    and run by a job worker. Returns immediately with status 202 Accepted
+    and the job ID; follow progress at `/stocks/jobs/{job_id}` (also sent in
+    the `Location` header).
 
-    background_tasks.add_task(fetch_all_stocks)
+    With `mode=grouped`, a routine refresh costs one Polygon request per
+    missing trading day instead of one per ticker.
+    """
+    job = await JobService.enqueue_ingestion(
+        db, StockService.FORTUNE_500_TICKERS, backfill_from, mode
+    )
+    response.headers["Location"] = str(
+        request.url_for("get_ingestion_job", job_id=str(job.id))
+    )
 
     return {
-        "message": "Fortune 500 stock data population started in background",
-        "status": "processing",
+        "message": "Fortune 500 stock data population queued",
+        "status": job.status,
+        "job_id": str(job.id),
     }
 
 
+@router.get(
+    "/jobs/{job_id}",
+    response_model=IngestionJobResponse,
+    summary="Get ingestion job status",
+)
+async def get_ingestion_job(job_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """
+    Retrieve an ingestion job's status and per-ticker progress.
+    """
+    job = await JobService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion job {job_id} not found",
+        )
+    return job
+
+
 @router.get(
     "/{ticker}",
     response_model=StockResponse,
     summary="Get stock information",
 )
-def get_stock(
+async def get_stock(
     ticker: str,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Retrieve stock information by ticker symbol.
+
+    Responses carry an `ETag`. Send it back in `If-None-Match` to get an empty
+    `304 Not Modified` while the stock is unchanged.
     """
     from app.models import Stock
 
-    stock = db.query(Stock).filter(Stock.ticker == ticker.upper()).first()
+    ticker = ticker.upper()
+    if if_none_match:
+        updated_at = await StockService.get_stock_version(db, ticker)
+        if updated_at is not None:
+            etag = make_etag("stock", ticker, updated_at)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    stock = await db.get(Stock, ticker)
     if not stock:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Stock {ticker} not found. Use /stocks/populate/{ticker} to add it.",
         )
+    response.headers["ETag"] = make_etag("stock", stock.ticker, stock.updated_at)
     return stock
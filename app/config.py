@@ -16,9 +16,35 @@ class Settings(BaseSettings):
     database_url: str
     db_pool_size: int = 10
     db_max_overflow: int = 20
+    # stock_prices partition size, "year" or "month"; must match existing partitions
+    stock_price_partition_granularity: str = "year"
 
     # Polygon/Massive API
     polygon_api_key: str
+    polygon_base_url: str = "https://api.polygon.io"
+    polygon_requests_per_second: float = 5.0
+    polygon_timeout_seconds: float = 30.0
+    polygon_max_connections: int = 20
+    polygon_max_retries: int = 3
+    polygon_retry_backoff_seconds: float = 0.5
+    polygon_cache_dir: str = ".cache/polygon"  # Empty disables the response cache
+
+    # Ingestion
+    ingest_concurrency: int = 8
+    ingest_initial_days: int = 14  # History fetched for a ticker without prices
+    ingest_backfill_page_days: int = 365  # Days per Polygon request when backfilling
+    ingest_worker_enabled: bool = False  # Run a job worker inside each API process
+    ingest_worker_poll_seconds: float = 2.0
+    ingest_job_stale_seconds: int = 300  # Reclaim running jobs silent for this long
+    ingest_job_max_attempts: int = 3
+
+    # Price cache (per worker, 0 disables)
+    price_cache_max_bytes: int = 64 * 1024 * 1024
+    price_cache_ttl_seconds: int = 300
+
+    # Portfolio return result cache (per worker, 0 disables)
+    return_cache_max_entries: int = 10000
+    return_cache_ttl_seconds: int = 60
 
     # AWS Configuration
     aws_region: str = "us-east-1"
@@ -38,6 +64,10 @@ class Settings(BaseSettings):
     # Monitoring
     enable_metrics: bool = True
 
+    # Per-request SQL statement budget (raises instead of logging under test)
+    query_budget_enabled: bool = False
+    query_budget_max_statements: int = 25
+
     @property
     def cors_origins(self) -> List[str]:
         """Parse CORS origins from comma-separated string."""
@@ -48,6 +78,11 @@ class Settings(BaseSettings):
         """Check if running in production environment."""
         return self.environment.lower() == "production"
 
+    @property
+    def is_test(self) -> bool:
+        """Check if running in test environment."""
+        return self.environment.lower() == "test"
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,5 +1,21 @@
 """Database utilities."""
 
-from app.db.session import get_db, engine, SessionLocal
+from app.db.session import (
+    get_db,
+    get_async_db,
+    get_async_session_factory,
+    engine,
+    async_engine,
+    SessionLocal,
+    AsyncSessionLocal,
+)
 
-__all__ = ["get_db", "engine", "SessionLocal"]
+__all__ = [
+    "get_db",
+    "get_async_db",
+    "get_async_session_factory",
+    "engine",
+    "async_engine",
+    "SessionLocal",
+    "AsyncSessionLocal",
+]
@@ -0,0 +1,179 @@
+"""Range partitions of the ``stock_prices`` table on PostgreSQL.
+
+``stock_prices`` is partitioned by ``date``, one partition per year or per
+month (``settings.stock_price_partition_granularity``). Partitions are
+created by the migration for the history present at the time and ahead of
+time by the ingestion workers (``maintain_partitions``). Bars outside every
+range partition, such as backfills reaching further back, land in the
+DEFAULT partition, so writes never take a lock on the parent table.
+"""
+
+import asyncio
+import logging
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "stock_prices"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+# How long partition DDL waits for the ACCESS EXCLUSIVE lock on the parent
+LOCK_TIMEOUT = "5s"
+
+
+def partition_start(day: date, granularity: str) -> date:
+    """First day of the partition holding ``day``."""
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    if granularity == "month":
+        return date(day.year, day.month, 1)
+    raise ValueError(f"Unknown partition granularity {granularity!r}")
+
+
+def partition_end(start: date, granularity: str) -> date:
+    """First day after the partition starting on ``start``."""
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def partition_name(start: date, granularity: str) -> str:
+    """Name of a partition, e.g. ``stock_prices_2024`` or ``stock_prices_2024_01``."""
+    if granularity == "year":
+        return f"{PARENT_TABLE}_{start.year}"
+    return f"{PARENT_TABLE}_{start.year}_{start.month:02d}"
+
+
+def partitions_between(
+    first: date, last: date, granularity: str
+) -> List[Tuple[str, date, date]]:
+    """(name, start, end) of every partition covering ``first`` to ``last``."""
+    partitions = []
+    start = partition_start(first, granularity)
+    while start <= last:
+        end = partition_end(start, granularity)
+        partitions.append((partition_name(start, granularity), start, end))
+        start = end
+    return partitions
+
+
+def create_partition_sql(name: str, start: date, end: date) -> str:
+    """DDL creating one partition if it does not exist yet."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+def create_default_partition_sql() -> str:
+    """DDL creating the DEFAULT partition if it does not exist yet."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} "
+        f"PARTITION OF {PARENT_TABLE} DEFAULT"
+    )
+
+
+def create_stock_price_partitions(
+    conn: Connection, first: date, last: date, granularity: Optional[str] = None
+) -> List[str]:
+    """
+    Create the partitions covering a date range, and the DEFAULT
+    partition, on a sync connection.
+
+    For use after ``Base.metadata.create_all``, which creates the
+    partitioned table without any partition.
+
+    Returns:
+        Names of the partitions covering the range
+    """
+    granularity = granularity or settings.stock_price_partition_granularity
+    partitions = partitions_between(first, last, granularity)
+    for name, start, end in partitions:
+        conn.execute(text(create_partition_sql(name, start, end)))
+    conn.execute(text(create_default_partition_sql()))
+    return [name for name, _, _ in partitions]
+
+
+async def create_upcoming_partitions(
+    engine: AsyncEngine, today: Optional[date] = None
+) -> List[str]:
+    """
+    Create any missing partition from the current period to the end of next year.
+
+    Each partition is created in its own short transaction on a dedicated
+    connection, never inside a transaction that has read ``stock_prices``,
+    and gives up after ``LOCK_TIMEOUT`` instead of queueing behind long
+    readers. Failures are logged and retried on the next run. A no-op on
+    other databases and on an unpartitioned ``stock_prices``.
+
+    Returns:
+        Names of the partitions created
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+    today = today or date.today()
+    granularity = settings.stock_price_partition_granularity
+    wanted = partitions_between(today, date(today.year + 1, 12, 31), granularity)
+
+    async with engine.connect() as conn:
+        partitioned = await conn.scalar(
+            text("SELECT relkind = 'p' FROM pg_class WHERE relname = :name"),
+            {"name": PARENT_TABLE},
+        )
+        existing = set(
+            await conn.scalars(
+                text(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                    "WHERE parent.relname = :name"
+                ),
+                {"name": PARENT_TABLE},
+            )
+        )
+        await conn.rollback()
+        if not partitioned:
+            return []
+
+        created = []
+        for name, start, end in wanted:
+            if name in existing:
+                continue
+            try:
+                async with conn.begin():
+                    await conn.execute(
+                        text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                    )
+                    await conn.execute(text(create_partition_sql(name, start, end)))
+            except DBAPIError:
+                logger.warning("Could not create partition %s", name, exc_info=True)
+                continue
+            created.append(name)
+    if created:
+        logger.info("Created stock_prices partitions %s", ", ".join(created))
+    return created
+
+
+async def maintain_partitions(
+    engine: AsyncEngine, stop: asyncio.Event, interval_seconds: float = 86400
+) -> None:
+    """Run ``create_upcoming_partitions`` now and then daily until ``stop`` is set."""
+    while not stop.is_set():
+        try:
+            await create_upcoming_partitions(engine)
+        except Exception:
+            logger.exception("Failed to create stock_prices partitions")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
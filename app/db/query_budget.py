@@ -0,0 +1,125 @@
+"""Per-request SQL statement budgets and N+1 detection."""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# A bound parameter in any of the drivers' paramstyles
+_PARAMETER = r"(?:\?|%\(\w+\)s|\$\d+)"
+# Parenthesized parameter lists, such as expanded IN clauses
+_PARAMETERS = re.compile(rf"\(\s*{_PARAMETER}(?:\s*,\s*{_PARAMETER})*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised when a block issues more SQL statements than its budget."""
+
+
+class QueryCounter:
+    """Statements issued while a budget is active."""
+
+    def __init__(self, max_statements: int, label: str):
+        self.max_statements = max_statements
+        self.label = label
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        """Number of statements issued so far."""
+        return len(self.statements)
+
+    @property
+    def exceeded(self) -> bool:
+        """Whether more statements than budgeted were issued."""
+        return self.count > self.max_statements
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Statement shapes issued more than once, most frequent first."""
+        patterns = Counter(
+            _PARAMETERS.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+            for statement in self.statements
+        )
+        return [(pattern, n) for pattern, n in patterns.most_common() if n > 1]
+
+    def report(self) -> str:
+        """Describe the overrun, listing repeated statements."""
+        lines = [
+            f"{self.label} issued {self.count} SQL statements "
+            f"(budget {self.max_statements})"
+        ]
+        lines.extend(f"  {n}x {pattern}" for pattern, n in self.repeated())
+        return "\n".join(lines)
+
+
+_active_counters: ContextVar[Tuple[QueryCounter, ...]] = ContextVar(
+    "active_query_counters", default=()
+)
+
+
+@contextmanager
+def query_budget(
+    max_statements: int, label: str = "block", raise_on_exceed: bool = True
+) -> Iterator[QueryCounter]:
+    """
+    Count the SQL statements issued by the current task.
+
+    Statements are seen on engines registered with ``track_queries``.
+    Budgets may be nested; each counts every statement issued inside it.
+
+    Raises:
+        QueryBudgetExceeded: On leaving the block over budget, when
+            ``raise_on_exceed`` is set; otherwise the overrun is logged
+    """
+    counter = QueryCounter(max_statements, label)
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+    if counter.exceeded:
+        if raise_on_exceed:
+            raise QueryBudgetExceeded(counter.report())
+        logger.warning(counter.report())
+
+
+def track_queries(engine: Engine) -> None:
+    """
+    Feed an engine's statements to active query budgets.
+
+    For an ``AsyncEngine`` pass its ``sync_engine``.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        for counter in _active_counters.get():
+            counter.statements.append(statement)
+
+
+class QueryBudgetMiddleware:
+    """Apply a statement budget to every HTTP request."""
+
+    def __init__(
+        self, app: ASGIApp, max_statements: int, raise_on_exceed: bool = False
+    ):
+        self.app = app
+        self.max_statements = max_statements
+        self.raise_on_exceed = raise_on_exceed
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        with query_budget(self.max_statements, label, self.raise_on_exceed):
+            await self.app(scope, receive, send)
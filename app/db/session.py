@@ -1,24 +1,76 @@
 """Database session management."""
 
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, Session
 
 from app.config import get_settings
+from app.db.query_budget import track_queries
+from app.metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
 
 settings = get_settings()
 
+# Async drivers used for each sync database backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Map a sync database URL onto the matching async driver."""
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return database_url
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
 # Create database engine
 engine = create_engine(
     settings.database_url,
+    poolclass=TimedQueuePool,
     pool_size=settings.db_pool_size,
     max_overflow=settings.db_max_overflow,
     pool_pre_ping=True,  # Verify connections before using
     echo=not settings.is_production,  # Log SQL in non-production
 )
 
-# Create session factory
+# Create async database engine (aiosqlite has no connection pool to size)
+async_database_url = get_async_database_url(settings.database_url)
+async_engine = create_async_engine(
+    async_database_url,
+    pool_pre_ping=True,
+    echo=not settings.is_production,
+    **(
+        {}
+        if make_url(async_database_url).get_backend_name() == "sqlite"
+        else {
+            "poolclass": TimedAsyncAdaptedQueuePool,
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+        }
+    ),
+)
+
+track_queries(engine)
+track_queries(async_engine.sync_engine)
+if settings.enable_metrics:
+    instrument_engine(engine, "sync")
+    instrument_engine(async_engine.sync_engine, "async")
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,  # Attributes cannot lazy-load after commit
+)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -33,3 +85,26 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session.
+
+    Yields:
+        Async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    Dependency function to get the async session factory.
+
+    For work that outlives the request's session, such as background tasks.
+
+    Returns:
+        Async session factory
+    """
+    return AsyncSessionLocal
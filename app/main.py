@@ -1,11 +1,19 @@
 """Main FastAPI application."""
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
 
 from app.config import get_settings
 from app.api import customers, stocks, portfolio
+from app.db import async_engine
+from app.db.partitions import maintain_partitions
+from app.db.query_budget import QueryBudgetMiddleware
+from app.metrics import PrometheusMiddleware
+from app.services.job_service import JobService
+from app.services.polygon_client import polygon_client
 
 settings = get_settings()
 
@@ -28,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Include routers
@@ -35,8 +44,17 @@ app.include_router(customers.router, prefix="/api/v1")
 app.include_router(stocks.router, prefix="/api/v1")
 app.include_router(portfolio.router, prefix="/api/v1")
 
+# Statement budget per request, to catch N+1 query patterns
+if settings.query_budget_enabled:
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        max_statements=settings.query_budget_max_statements,
+        raise_on_exceed=settings.is_test,
+    )
+
 # Metrics endpoint (Prometheus)
 if settings.enable_metrics:
+    app.add_middleware(PrometheusMiddleware)
     metrics_app = make_asgi_app()
     app.mount("/metrics", metrics_app)
 
@@ -62,6 +80,13 @@ def health_check():
 async def startup_event():
     """Actions to perform on application startup."""
     print(f"Starting application in {settings.environment} mode...")
+    await polygon_client.start()
+    if settings.ingest_worker_enabled:
+        app.state.worker_stop = asyncio.Event()
+        app.state.worker = asyncio.create_task(JobService.work(app.state.worker_stop))
+        app.state.partitions = asyncio.create_task(
+            maintain_partitions(async_engine, app.state.worker_stop)
+        )
     print(
         f"API documentation available at: http://{settings.app_host}:{settings.app_port}/docs"
     )
@@ -71,3 +96,10 @@ async def startup_event():
 async def shutdown_event():
     """Actions to perform on application shutdown."""
     print("Shutting down application...")
+    if settings.ingest_worker_enabled:
+        # The current ticker finishes; the rest of its job resumes elsewhere
+        app.state.worker_stop.set()
+        await app.state.worker
+        await app.state.partitions
+    await polygon_client.close()
+    await async_engine.dispose()
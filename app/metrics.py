@@ -0,0 +1,223 @@
+"""Prometheus instrumentation for HTTP routes, the database and Polygon."""
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets for whole requests and upstream calls, in seconds
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+# Buckets for statements issued by a single request
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method", "route"],
+)
+HTTP_REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per HTTP request",
+    ["method", "route"],
+    buckets=STATEMENT_COUNT_BUCKETS,
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per HTTP request",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement execution time",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Pooled connections currently checked out",
+    ["engine"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked-out connections over pool_size + max_overflow",
+    ["engine"],
+)
+POLYGON_FETCH_DURATION = Histogram(
+    "polygon_fetch_duration_seconds",
+    "Polygon aggregate fetch latency, including retries",
+    buckets=LATENCY_BUCKETS,
+)
+POLYGON_FETCH_ERRORS = Counter(
+    "polygon_fetch_errors_total",
+    "Polygon aggregate fetches that failed",
+    ["error"],
+)
+POLYGON_RETRIES = Counter(
+    "polygon_request_retries_total",
+    "Polygon requests retried after a transient failure",
+    ["reason"],
+)
+
+
+class RequestStats:
+    """SQL activity of the request being served."""
+
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class PrometheusMiddleware:
+    """
+    Record latency, concurrency and SQL usage per route.
+
+    Routes are labelled by their path template, so ``/customers/{customer_id}``
+    is one series however many customers exist. Streaming responses are
+    timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        if route is None:
+            # Unrouted paths (404s, mounted apps) are not worth a series each
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(
+                time.perf_counter() - start
+            )
+            in_flight.dec()
+            HTTP_REQUEST_DB_STATEMENTS.labels(method, route).observe(stats.statements)
+            HTTP_REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+            _request_stats.reset(token)
+
+
+def _route_template(scope: Scope) -> Optional[str]:
+    """Path template of the application route matching a request, if any."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+    return None
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Record statement timings, per-request SQL usage and pool saturation.
+
+    For an ``AsyncEngine`` pass its ``sync_engine``.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        DB_STATEMENT_DURATION.labels(name).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += elapsed
+
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    capacity = pool.size() + max(pool._max_overflow, 0)
+
+    def record_pool_usage(*args) -> None:
+        checked_out = pool.checkedout()
+        DB_POOL_CHECKED_OUT.labels(name).set(checked_out)
+        DB_POOL_SATURATION.labels(name).set(checked_out / capacity)
+
+    event.listen(pool, "checkout", record_pool_usage)
+    event.listen(pool, "checkin", record_pool_usage)
+
+
+class _TimedCheckoutMixin:
+    """Time how long callers wait for a pooled connection."""
+
+    metrics_engine_name = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_engine_name).observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """``QueuePool`` recording checkout wait time."""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` recording checkout wait time."""
+
+    metrics_engine_name = "async"
@@ -5,5 +5,15 @@ from app.models.portfolio import Portfolio
 from app.models.stock import Stock
 from app.models.portfolio_stock import PortfolioStock
 from app.models.stock_price import StockPrice
+from app.models.portfolio_daily_value import PortfolioDailyValue
+from app.models.ingestion_job import IngestionJob
 
-__all__ = ["Customer", "Portfolio", "Stock", "PortfolioStock", "StockPrice"]
+__all__ = [
+    "Customer",
+    "Portfolio",
+    "Stock",
+    "PortfolioStock",
+    "StockPrice",
+    "PortfolioDailyValue",
+    "IngestionJob",
+]
@@ -1,7 +1,7 @@
 """Customer model."""
 
 import uuid
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Index, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,10 @@ class Customer(Base, TimestampMixin):
     """Customer entity with portfolio."""
 
     __tablename__ = "customers"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_customers_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False, index=True)
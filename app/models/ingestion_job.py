@@ -0,0 +1,43 @@
+"""Durable stock ingestion job model."""
+
+import uuid
+from sqlalchemy import JSON, Column, Date, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.models.base import Base, TimestampMixin
+
+
+class IngestionJob(Base, TimestampMixin):
+    """A batch of tickers to ingest, claimed and run by a job worker."""
+
+    __tablename__ = "ingestion_jobs"
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    # One aggregates request per ticker, or one grouped daily request per day
+    PER_TICKER = "per_ticker"
+    GROUPED = "grouped"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    status = Column(String(20), nullable=False, default=PENDING)
+    mode = Column(String(20), nullable=False, default=PER_TICKER)
+    tickers = Column(JSON, nullable=False)
+    backfill_from = Column(Date, nullable=True)
+    # Per-ticker results, as recorded by IngestionService.ingest_tickers
+    progress = Column(JSON, nullable=False, default=dict)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_ingestion_job_status_created", "status", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<IngestionJob {self.id} {self.status}>"
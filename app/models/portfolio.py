@@ -26,6 +26,12 @@ class Portfolio(Base, TimestampMixin):
     portfolio_stocks = relationship(
         "PortfolioStock", back_populates="portfolio", cascade="all, delete-orphan"
     )
+    daily_values = relationship(
+        "PortfolioDailyValue",
+        back_populates="portfolio",
+        cascade="all, delete-orphan",
+        passive_deletes=True,  # Rows are removed by the ON DELETE CASCADE
+    )
 
     def __repr__(self) -> str:
         return f"<Portfolio {self.id} for Customer {self.customer_id}>"
@@ -0,0 +1,29 @@
+"""Materialized daily portfolio valuation model."""
+
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Numeric
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+
+from app.models.base import Base, TimestampMixin
+
+
+class PortfolioDailyValue(Base, TimestampMixin):
+    """Precomputed market value of a portfolio on a trading day."""
+
+    __tablename__ = "portfolio_daily_values"
+
+    portfolio_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("portfolios.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    date = Column(Date, primary_key=True)
+    market_value = Column(Numeric(20, 2), nullable=False)
+    # Whether every priced holding has a close on this very day
+    all_priced = Column(Boolean, nullable=False, default=False)
+
+    # Relationships
+    portfolio = relationship("Portfolio", back_populates="daily_values")
+
+    def __repr__(self) -> str:
+        return f"<PortfolioDailyValue {self.portfolio_id} {self.date}: ${self.market_value}>"
@@ -17,7 +17,13 @@ from app.models.base import Base, TimestampMixin
 
 
 class StockPrice(Base, TimestampMixin):
-    """Historical stock price data."""
+    """
+    Historical stock price data.
+
+    On PostgreSQL the table is range-partitioned by ``date`` (see
+    ``app.db.partitions``), so ``date`` is part of the primary key and of
+    every unique constraint.
+    """
 
     __tablename__ = "stock_prices"
 
@@ -25,7 +31,7 @@ class StockPrice(Base, TimestampMixin):
     stock_ticker = Column(
         String(10), ForeignKey("stocks.ticker", ondelete="CASCADE"), nullable=False
     )
-    date = Column(Date, nullable=False, index=True)
+    date = Column(Date, primary_key=True)
     open_price = Column(Numeric(10, 2), nullable=True)
     high_price = Column(Numeric(10, 2), nullable=True)
     low_price = Column(Numeric(10, 2), nullable=True)
@@ -36,8 +42,11 @@ class StockPrice(Base, TimestampMixin):
     stock = relationship("Stock", back_populates="prices")
 
     __table_args__ = (
+        # Upsert target; its index also serves per-ticker date range scans
         UniqueConstraint("stock_ticker", "date", name="uq_stock_price_date"),
-        Index("idx_stock_price_ticker_date", "stock_ticker", "date"),
+        # Compact index for scans over date ranges across all tickers
+        Index("idx_stock_price_date_brin", "date", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (date)"},
     )
 
     def __repr__(self) -> str:
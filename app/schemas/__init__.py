@@ -5,18 +5,39 @@ from app.schemas.customer import (
     CustomerUpdate,
     CustomerResponse,
     CustomerWithPortfolio,
+    CustomerBulkCreate,
+    CustomerBulkCreateResponse,
+)
+from app.schemas.stock import (
+    StockCreate,
+    StockResponse,
+    StockPopulateResponse,
+    StockPriceResponse,
+    IngestionJobResponse,
+)
+from app.schemas.portfolio import (
+    PortfolioStockCreate,
+    PortfolioStockUpdate,
+    PortfolioStockResponse,
+    PortfolioBatchReturnRequest,
+    PortfolioTimeSeriesResponse,
 )
-from app.schemas.stock import StockCreate, StockResponse, StockPriceResponse
-from app.schemas.portfolio import PortfolioStockCreate, PortfolioStockResponse
 
 __all__ = [
     "CustomerCreate",
     "CustomerUpdate",
     "CustomerResponse",
     "CustomerWithPortfolio",
+    "CustomerBulkCreate",
+    "CustomerBulkCreateResponse",
     "StockCreate",
     "StockResponse",
+    "StockPopulateResponse",
     "StockPriceResponse",
+    "IngestionJobResponse",
     "PortfolioStockCreate",
+    "PortfolioStockUpdate",
     "PortfolioStockResponse",
+    "PortfolioBatchReturnRequest",
+    "PortfolioTimeSeriesResponse",
 ]
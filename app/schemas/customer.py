@@ -1,7 +1,7 @@
 """Customer schemas."""
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -53,3 +53,31 @@ class CustomerWithPortfolio(CustomerResponse):
     portfolio_stocks: List[PortfolioStockResponse] = []
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class CustomerBulkCreate(BaseModel):
+    """Schema for creating many customers at once."""
+
+    customers: List[Dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="Customers in the same format as a single create; each item "
+        "is validated on its own",
+    )
+
+
+class CustomerBulkItemResult(BaseModel):
+    """Outcome of one item of a bulk create."""
+
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[UUID] = Field(None, description="ID of the created customer")
+    error: Optional[str] = Field(None, description="Why the item was rejected")
+
+
+class CustomerBulkCreateResponse(BaseModel):
+    """Schema for bulk create response."""
+
+    created: int
+    failed: int
+    results: List[CustomerBulkItemResult]
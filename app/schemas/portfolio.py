@@ -1,7 +1,9 @@
 """Portfolio schemas."""
 
 from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
 class PortfolioStockCreate(BaseModel):
@@ -11,6 +13,12 @@ class PortfolioStockCreate(BaseModel):
     quantity: int = Field(..., gt=0, description="Number of shares")
 
 
+class PortfolioStockUpdate(BaseModel):
+    """Schema for setting the quantity of one holding."""
+
+    quantity: int = Field(..., ge=0, description="Number of shares (0 removes it)")
+
+
 class PortfolioStockResponse(BaseModel):
     """Schema for portfolio stock response."""
 
@@ -33,6 +41,27 @@ class PortfolioReturnRequest(BaseModel):
     )
 
 
+class PortfolioBatchReturnRequest(PortfolioReturnRequest):
+    """Schema for calculating returns of many portfolios at once."""
+
+    customer_ids: Optional[List[UUID]] = Field(
+        None, description="Customers to include (omit when all_customers is set)"
+    )
+    all_customers: bool = Field(False, description="Include every customer")
+    include_holdings: bool = Field(
+        True,
+        description="Include per-holding returns; totals alone are read from "
+        "precomputed daily values",
+    )
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "PortfolioBatchReturnRequest":
+        """Require exactly one way of selecting customers."""
+        if self.all_customers == (self.customer_ids is not None):
+            raise ValueError("Provide either customer_ids or all_customers=true")
+        return self
+
+
 class PortfolioReturnResponse(BaseModel):
     """Schema for portfolio return calculation response."""
 
@@ -42,3 +71,27 @@ class PortfolioReturnResponse(BaseModel):
     total_return: float = Field(..., description="Total portfolio return in dollars")
     return_percentage: float = Field(..., description="Return as percentage")
     holdings: list[dict] = Field(..., description="Individual stock returns")
+
+
+class PortfolioValuePoint(BaseModel):
+    """Schema for one day of a portfolio value time series."""
+
+    date: str
+    market_value: float = Field(..., description="Portfolio value in dollars")
+    daily_return_percentage: float = Field(
+        ..., description="Change from the previous day as percentage"
+    )
+    cumulative_return_percentage: float = Field(
+        ..., description="Change since the first day as percentage"
+    )
+
+
+class PortfolioTimeSeriesResponse(BaseModel):
+    """Schema for portfolio value time series response."""
+
+    customer_id: str
+    start_date: str
+    end_date: str
+    points: List[PortfolioValuePoint] = Field(
+        ..., description="One point per calendar day"
+    )
@@ -2,7 +2,9 @@
 
 from datetime import date, datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field, ConfigDict, computed_field
 
 
 class StockBase(BaseModel):
@@ -30,6 +32,13 @@ class StockResponse(StockBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class StockPopulateResponse(StockResponse):
+    """Schema for stock response after populating prices."""
+
+    rows_inserted: int = Field(..., description="Price rows newly inserted")
+    rows_updated: int = Field(..., description="Existing price rows updated")
+
+
 class StockPriceResponse(BaseModel):
     """Schema for stock price response."""
 
@@ -42,3 +51,41 @@ class StockPriceResponse(BaseModel):
     volume: Decimal | None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class IngestionJobResponse(BaseModel):
+    """Schema for an ingestion job and its per-ticker progress."""
+
+    id: UUID
+    status: str = Field(..., description="pending, running, completed or failed")
+    mode: str = Field(..., description="per_ticker or grouped")
+    tickers: List[str]
+    backfill_from: Optional[date] = None
+    progress: Dict[str, Dict[str, Any]] = Field(
+        ..., description="Result per ticker processed so far"
+    )
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def succeeded(self) -> int:
+        """Tickers stored successfully."""
+        return sum(1 for r in self.progress.values() if r.get("status") == "ok")
+
+    @computed_field
+    @property
+    def failed(self) -> int:
+        """Tickers that failed in the latest attempt."""
+        return sum(1 for r in self.progress.values() if r.get("status") == "error")
+
+    @computed_field
+    @property
+    def remaining(self) -> int:
+        """Tickers not processed yet."""
+        return len(self.tickers) - len(self.progress)
@@ -1,53 +1,258 @@
 """Customer service layer."""
 
-from typing import List, Optional
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
-from sqlalchemy.orm import Session, joinedload
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.models import Customer, Portfolio, PortfolioStock
+from app.models import Customer, Portfolio, PortfolioStock, Stock
 from app.schemas.customer import CustomerCreate, CustomerUpdate
+from app.schemas.portfolio import PortfolioStockCreate
+from app.services.valuation_service import ValuationService
+
+# Rows fetched per round trip when streaming the customer export
+EXPORT_CHUNK_SIZE = 1000
 
 
 class CustomerService:
     """Service for customer operations."""
 
     @staticmethod
-    def get_customer(db: Session, customer_id: UUID) -> Optional[Customer]:
-        """Get customer by ID with portfolio."""
-        return (
-            db.query(Customer)
+    async def get_customer(
+        db: AsyncSession, customer_id: UUID, refresh: bool = False
+    ) -> Optional[Customer]:
+        """
+        Get customer by ID with portfolio.
+
+        Pass ``refresh=True`` after writes to overwrite any stale copies of
+        the customer graph already held by the session.
+        """
+        result = await db.execute(
+            select(Customer)
             .options(
                 joinedload(Customer.portfolio).joinedload(Portfolio.portfolio_stocks)
             )
             .filter(Customer.id == customer_id)
-            .first()
+            .execution_options(populate_existing=refresh)
         )
+        return result.unique().scalar_one_or_none()
 
     @staticmethod
-    def get_customers(db: Session, skip: int = 0, limit: int = 100) -> List[Customer]:
-        """Get all customers with pagination."""
+    async def get_customer_version(
+        db: AsyncSession, customer_id: UUID
+    ) -> Optional[Tuple]:
+        """
+        Get the values a customer's representation depends on.
+
+        A single aggregate row, without loading the portfolio graph. Matches
+        ``customer_version`` of the loaded customer.
+
+        Returns:
+            Version tuple, or None if the customer does not exist
+        """
+        result = await db.execute(
+            select(
+                Customer.updated_at,
+                Portfolio.updated_at,
+                func.count(PortfolioStock.id),
+                func.max(PortfolioStock.updated_at),
+            )
+            .outerjoin(Portfolio, Portfolio.customer_id == Customer.id)
+            .outerjoin(PortfolioStock, PortfolioStock.portfolio_id == Portfolio.id)
+            .where(Customer.id == customer_id)
+            .group_by(Customer.id, Customer.updated_at, Portfolio.updated_at)
+        )
+        row = result.one_or_none()
+        return tuple(row) if row is not None else None
+
+    @staticmethod
+    def customer_version(customer: Customer) -> Tuple:
+        """Version tuple of a customer loaded with portfolio and holdings."""
+        portfolio_stocks = customer.portfolio_stocks
         return (
-            db.query(Customer)
+            customer.updated_at,
+            customer.portfolio.updated_at if customer.portfolio else None,
+            len(portfolio_stocks),
+            max(
+                (portfolio_stock.updated_at for portfolio_stock in portfolio_stocks),
+                default=None,
+            ),
+        )
+
+    @staticmethod
+    async def get_customers(
+        db: AsyncSession, skip: int = 0, limit: int = 100
+    ) -> List[Customer]:
+        """Get all customers with offset pagination."""
+        result = await db.execute(
+            select(Customer)
             .options(
-                joinedload(Customer.portfolio).joinedload(Portfolio.portfolio_stocks)
+                selectinload(Customer.portfolio).selectinload(
+                    Portfolio.portfolio_stocks
+                )
             )
+            .order_by(Customer.created_at, Customer.id)
             .offset(skip)
             .limit(limit)
-            .all()
         )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_customers_page(
+        db: AsyncSession, limit: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Customer], Optional[str]]:
+        """
+        Get a page of customers ordered by (created_at, id).
+
+        Pages are found by seeking past the last row of the previous page,
+        so every page costs the same regardless of depth. Portfolios and
+        holdings are loaded with one extra query each.
+
+        Args:
+            db: Database session
+            limit: Maximum number of customers to return
+            cursor: Cursor returned with the previous page, if any
+
+        Returns:
+            The customers, and a cursor for the next page (None on the last
+            page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        query = select(Customer)
+        if cursor is not None:
+            created_at, customer_id = CustomerService._decode_cursor(cursor)
+            query = query.where(
+                tuple_(Customer.created_at, Customer.id) > (created_at, customer_id)
+            )
+        result = await db.execute(
+            query.options(
+                selectinload(Customer.portfolio).selectinload(
+                    Portfolio.portfolio_stocks
+                )
+            )
+            .order_by(Customer.created_at, Customer.id)
+            .limit(limit + 1)  # One extra row tells whether another page exists
+        )
+        customers = list(result.scalars().all())
+        if len(customers) <= limit:
+            return customers, None
+        customers = customers[:limit]
+        return customers, CustomerService._encode_cursor(customers[-1])
+
+    @staticmethod
+    async def stream_customers(
+        db: AsyncSession, chunk_size: int = EXPORT_CHUNK_SIZE
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Stream every customer with their holdings, oldest first.
+
+        Customers and holdings are read as plain rows of a single join over
+        a server-side cursor, ``chunk_size`` rows per fetch, so memory stays
+        bounded however many customers exist.
+
+        Yields:
+            Lists of customers in the ``CustomerWithPortfolio`` JSON shape;
+            each customer appears in exactly one list
+        """
+        result = await db.stream(
+            select(
+                Customer.id,
+                Customer.name,
+                Customer.address,
+                Customer.created_at,
+                Customer.updated_at,
+                PortfolioStock.stock_ticker,
+                PortfolioStock.quantity,
+                PortfolioStock.created_at,
+                PortfolioStock.updated_at,
+            )
+            .outerjoin(Portfolio, Portfolio.customer_id == Customer.id)
+            .outerjoin(PortfolioStock, PortfolioStock.portfolio_id == Portfolio.id)
+            .order_by(Customer.created_at, Customer.id, PortfolioStock.stock_ticker)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        current: Optional[Dict] = None
+        async for partition in result.partitions():
+            done = []
+            for row in partition:
+                if current is None or current["id"] != str(row[0]):
+                    if current is not None:
+                        done.append(current)
+                    current = {
+                        "id": str(row[0]),
+                        "name": row[1],
+                        "address": row[2],
+                        "created_at": row[3].isoformat(),
+                        "updated_at": row[4].isoformat(),
+                        "portfolio_stocks": [],
+                    }
+                if row[5] is not None:
+                    current["portfolio_stocks"].append(
+                        {
+                            "stock_ticker": row[5],
+                            "quantity": row[6],
+                            "created_at": row[7].isoformat(),
+                            "updated_at": row[8].isoformat(),
+                        }
+                    )
+            # The last customer may continue in the next partition
+            if done:
+                yield done
+        if current is not None:
+            yield [current]
 
     @staticmethod
-    def create_customer(db: Session, customer_data: CustomerCreate) -> Customer:
-        """Create a new customer with portfolio."""
+    def _format_errors(error: ValidationError) -> str:
+        """Summarize a validation error on one line."""
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+            for detail in error.errors()
+        )
+
+    @staticmethod
+    def _encode_cursor(customer: Customer) -> str:
+        payload = json.dumps([customer.created_at.isoformat(), str(customer.id)])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+        try:
+            created_at, customer_id = json.loads(base64.urlsafe_b64decode(cursor))
+            return datetime.fromisoformat(created_at), UUID(customer_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    async def create_customer(
+        db: AsyncSession,
+        customer_data: CustomerCreate,
+        pending_valuations: Optional[List[UUID]] = None,
+    ) -> Customer:
+        """
+        Create a new customer with portfolio.
+
+        With ``pending_valuations``, the new portfolio's ID is appended to it
+        for the caller to pass to ``ValuationService.refresh_later`` once
+        committed, instead of computing its daily valuations in the write.
+        """
         # Create customer
         customer = Customer(name=customer_data.name, address=customer_data.address)
         db.add(customer)
-        db.flush()  # Get customer ID
+        await db.flush()  # Get customer ID
 
         # Create portfolio for customer
         portfolio = Portfolio(customer_id=customer.id)
         db.add(portfolio)
-        db.flush()
+        await db.flush()
 
         # Add stocks to portfolio if provided
         if customer_data.stocks:
@@ -59,16 +264,140 @@ class CustomerService:
                 )
                 db.add(portfolio_stock)
 
-        db.commit()
-        db.refresh(customer)
-        return customer
+            await db.flush()
+            if pending_valuations is not None:
+                pending_valuations.append(portfolio.id)
+            else:
+                await ValuationService.refresh_portfolios(db, [portfolio.id])
+
+        await db.commit()
+        return await CustomerService.get_customer(db, customer.id, refresh=True)
 
     @staticmethod
-    def update_customer(
-        db: Session, customer_id: UUID, customer_data: CustomerUpdate
+    async def bulk_create_customers(
+        db: AsyncSession,
+        items: List[Dict],
+        pending_valuations: Optional[List[UUID]] = None,
+    ) -> Dict:
+        """
+        Create many customers with portfolios in one transaction.
+
+        Every item is validated on its own and rejected items are reported
+        instead of aborting the batch. Customers, portfolios and holdings of
+        the accepted items are then written with one executemany insert per
+        table and committed. Their daily valuations are computed afterwards
+        in a transaction of their own, or, with ``pending_valuations``, left
+        to the caller as for ``create_customer``.
+
+        Args:
+            db: Database session
+            items: Customers in the ``CustomerCreate`` format
+            pending_valuations: Append the IDs of new portfolios with
+                holdings here instead of computing their valuations
+
+        Returns:
+            ``created`` and ``failed`` counts, and per-item ``results``
+            carrying either the new customer ``id`` or an ``error``
+        """
+        results: List[Dict] = []
+        accepted: List[Tuple[Dict, CustomerCreate, List[PortfolioStockCreate]]] = []
+        for index, item in enumerate(items):
+            try:
+                customer_data = CustomerCreate.model_validate(item)
+                holdings = [
+                    PortfolioStockCreate.model_validate(stock)
+                    for stock in customer_data.stocks or []
+                ]
+            except ValidationError as e:
+                results.append(
+                    {"index": index, "error": CustomerService._format_errors(e)}
+                )
+                continue
+            tickers = [holding.ticker for holding in holdings]
+            if len(set(tickers)) != len(tickers):
+                results.append({"index": index, "error": "Duplicate ticker in stocks"})
+                continue
+            result = {"index": index}
+            results.append(result)
+            accepted.append((result, customer_data, holdings))
+
+        # Holdings must reference known stocks
+        tickers = {h.ticker for _, _, holdings in accepted for h in holdings}
+        known = set()
+        if tickers:
+            known = set(
+                (
+                    await db.execute(
+                        select(Stock.ticker).where(Stock.ticker.in_(tickers))
+                    )
+                ).scalars()
+            )
+
+        now = datetime.utcnow()
+        customer_rows, portfolio_rows, holding_rows = [], [], []
+        for result, customer_data, holdings in accepted:
+            unknown = sorted({h.ticker for h in holdings} - known)
+            if unknown:
+                result["error"] = f"Unknown tickers: {', '.join(unknown)}"
+                continue
+            customer_id, portfolio_id = uuid.uuid4(), uuid.uuid4()
+            result["id"] = customer_id
+            timestamps = {"created_at": now, "updated_at": now}
+            customer_rows.append(
+                {
+                    "id": customer_id,
+                    "name": customer_data.name,
+                    "address": customer_data.address,
+                    **timestamps,
+                }
+            )
+            portfolio_rows.append(
+                {"id": portfolio_id, "customer_id": customer_id, **timestamps}
+            )
+            holding_rows.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "portfolio_id": portfolio_id,
+                    "stock_ticker": holding.ticker,
+                    "quantity": holding.quantity,
+                    **timestamps,
+                }
+                for holding in holdings
+            )
+
+        if customer_rows:
+            await db.execute(insert(Customer), customer_rows)
+            await db.execute(insert(Portfolio), portfolio_rows)
+            if holding_rows:
+                await db.execute(insert(PortfolioStock), holding_rows)
+            await db.commit()
+
+        valued = list(dict.fromkeys(row["portfolio_id"] for row in holding_rows))
+        if pending_valuations is not None:
+            pending_valuations.extend(valued)
+        elif valued:
+            await ValuationService.refresh_portfolios(db, valued)
+            await db.commit()
+
+        return {
+            "created": len(customer_rows),
+            "failed": len(results) - len(customer_rows),
+            "results": results,
+        }
+
+    @staticmethod
+    async def update_customer(
+        db: AsyncSession,
+        customer_id: UUID,
+        customer_data: CustomerUpdate,
+        pending_valuations: Optional[List[UUID]] = None,
     ) -> Optional[Customer]:
-        """Update customer information."""
-        customer = CustomerService.get_customer(db, customer_id)
+        """
+        Update customer information.
+
+        ``pending_valuations`` works as for ``create_customer``.
+        """
+        customer = await CustomerService.get_customer(db, customer_id)
         if not customer:
             return None
 
@@ -78,33 +407,132 @@ class CustomerService:
         if customer_data.address is not None:
             customer.address = customer_data.address
 
-        # Update portfolio stocks if provided
+        # Update portfolio stocks if provided, touching only changed rows
         if customer_data.stocks is not None:
-            # Clear existing portfolio stocks
-            db.query(PortfolioStock).filter(
-                PortfolioStock.portfolio_id == customer.portfolio.id
-            ).delete()
+            quantities = {
+                stock_data["ticker"]: stock_data["quantity"]
+                for stock_data in customer_data.stocks
+            }
+            removed = [
+                portfolio_stock.stock_ticker
+                for portfolio_stock in customer.portfolio.portfolio_stocks
+                if portfolio_stock.stock_ticker not in quantities
+            ]
+            await CustomerService._apply_holdings(
+                db, customer.portfolio, quantities, removed, pending_valuations
+            )
 
-            # Add new portfolio stocks
-            for stock_data in customer_data.stocks:
-                portfolio_stock = PortfolioStock(
-                    portfolio_id=customer.portfolio.id,
-                    stock_ticker=stock_data["ticker"],
-                    quantity=stock_data["quantity"],
+        await db.commit()
+        return await CustomerService.get_customer(db, customer_id, refresh=True)
+
+    @staticmethod
+    async def set_holding(
+        db: AsyncSession,
+        customer_id: UUID,
+        ticker: str,
+        quantity: int,
+        pending_valuations: Optional[List[UUID]] = None,
+    ) -> Optional[Customer]:
+        """
+        Set the quantity of a single holding, leaving the others untouched.
+
+        A quantity of 0 removes the holding. ``pending_valuations`` works as
+        for ``create_customer``.
+
+        Raises:
+            ValueError: If a new holding references an unknown stock
+        """
+        customer = await CustomerService.get_customer(db, customer_id)
+        if not customer:
+            return None
+
+        held = any(
+            portfolio_stock.stock_ticker == ticker
+            for portfolio_stock in customer.portfolio.portfolio_stocks
+        )
+        if quantity and not held and await db.get(Stock, ticker) is None:
+            raise ValueError(f"Stock {ticker} not found")
+
+        if quantity:
+            await CustomerService._apply_holdings(
+                db, customer.portfolio, {ticker: quantity}, [], pending_valuations
+            )
+        else:
+            await CustomerService._apply_holdings(
+                db, customer.portfolio, {}, [ticker], pending_valuations
+            )
+
+        await db.commit()
+        return await CustomerService.get_customer(db, customer_id, refresh=True)
+
+    @staticmethod
+    async def _apply_holdings(
+        db: AsyncSession,
+        portfolio: Portfolio,
+        quantities: Dict[str, int],
+        removed: List[str],
+        pending_valuations: Optional[List[UUID]] = None,
+    ) -> bool:
+        """
+        Diff holdings against the loaded portfolio and write only the changes.
+
+        Unchanged holdings keep their rows and timestamps. When anything
+        changed, the portfolio's ``updated_at`` is bumped and its daily
+        valuations are recomputed, or dropped and left pending. The caller
+        is responsible for committing.
+
+        Args:
+            db: Database session
+            portfolio: Portfolio with ``portfolio_stocks`` loaded
+            quantities: Ticker to quantity for holdings to insert or update
+            removed: Tickers of holdings to delete
+            pending_valuations: Append the portfolio's ID here when it
+                changed, instead of recomputing its valuations
+
+        Returns:
+            Whether any holding changed
+        """
+        existing = {
+            portfolio_stock.stock_ticker: portfolio_stock
+            for portfolio_stock in portfolio.portfolio_stocks
+        }
+        changed = False
+
+        for ticker in removed:
+            portfolio_stock = existing.get(ticker)
+            if portfolio_stock is not None:
+                # delete-orphan cascade issues the DELETE on flush
+                portfolio.portfolio_stocks.remove(portfolio_stock)
+                changed = True
+
+        for ticker, quantity in quantities.items():
+            portfolio_stock = existing.get(ticker)
+            if portfolio_stock is None:
+                portfolio.portfolio_stocks.append(
+                    PortfolioStock(stock_ticker=ticker, quantity=quantity)
                 )
-                db.add(portfolio_stock)
+                changed = True
+            elif portfolio_stock.quantity != quantity:
+                portfolio_stock.quantity = quantity
+                changed = True
 
-        db.commit()
-        db.refresh(customer)
-        return customer
+        if changed:
+            portfolio.updated_at = datetime.utcnow()
+            await db.flush()
+            if pending_valuations is not None:
+                await ValuationService.clear_portfolios(db, [portfolio.id])
+                pending_valuations.append(portfolio.id)
+            else:
+                await ValuationService.refresh_portfolios(db, [portfolio.id])
+        return changed
 
     @staticmethod
-    def delete_customer(db: Session, customer_id: UUID) -> bool:
+    async def delete_customer(db: AsyncSession, customer_id: UUID) -> bool:
         """Delete a customer (cascade deletes portfolio and stocks)."""
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
+        customer = await db.get(Customer, customer_id)
         if not customer:
             return False
 
-        db.delete(customer)
-        db.commit()
+        await db.delete(customer)
+        await db.commit()
         return True
@@ -0,0 +1,359 @@
+"""Concurrent stock data ingestion."""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Stock
+from app.services.stock_service import StockService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Grouped daily responses fetched before their bars are written
+GROUPED_DAYS_PER_WRITE = 20
+
+# Tickers stored by ingest_tickers between stored valuation refreshes
+VALUATION_REFRESH_BATCH = 100
+
+
+class RateLimiter:
+    """Spaces out calls so that at most ``rate`` start per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until the next request slot is available."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+
+class IngestionService:
+    """Service for ingesting many tickers concurrently."""
+
+    @staticmethod
+    async def ingest_tickers(
+        db: AsyncSession,
+        tickers: List[str],
+        concurrency: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        backfill_from: Optional[date] = None,
+        on_result: Optional[Callable[[str, Dict], Awaitable[None]]] = None,
+        stop: Optional[asyncio.Event] = None,
+    ) -> Dict:
+        """
+        Fetch and store price data for many tickers.
+
+        Polygon requests run concurrently, bounded by ``concurrency`` and
+        spaced by a per-second request budget. Fetched bars are handed to a
+        single writer over a queue, so the database session is only used
+        once a ticker's data is ready and never held across a slow request.
+
+        Every ticker's stored date range is read up front in one query, and
+        only the days since its watermark are requested, as with
+        ``StockService.populate_stock_data``. Each page of a backfill counts
+        against the request budget.
+
+        Stored valuations are refreshed once per ``VALUATION_REFRESH_BATCH``
+        stored tickers and at the end, so a portfolio holding many of the
+        tickers is recomputed once per batch rather than once per ticker.
+
+        Args:
+            db: Database session used by the writer
+            tickers: Stock ticker symbols
+            concurrency: Maximum in-flight Polygon requests
+                (default: ``settings.ingest_concurrency``)
+            requests_per_second: Polygon request budget
+                (default: ``settings.polygon_requests_per_second``)
+            backfill_from: Also fetch missing history back to this day
+            on_result: Called with each ticker and its result on the
+                writer's session, once the ticker has failed or its bars and
+                the valuations they affect are stored
+            stop: When set, return after the ticker being stored; tickers
+                not reached are left out of the results
+
+        Returns:
+            Summary with ``total``, ``succeeded`` and ``failed`` counts and
+            per-ticker results under ``tickers``
+        """
+        tickers = list(dict.fromkeys(tickers))
+        concurrency = concurrency or settings.ingest_concurrency
+        if requests_per_second is None:
+            requests_per_second = settings.polygon_requests_per_second
+
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = RateLimiter(requests_per_second)
+        fetched: asyncio.Queue = asyncio.Queue()
+        results: Dict[str, Dict] = {}
+        stored = await StockService.get_price_ranges(db, tickers)
+        today = date.today()
+
+        async def fetch(ticker: str) -> None:
+            async with semaphore:
+                try:
+                    bars = []
+                    for start, end in StockService.ingestion_ranges(
+                        stored.get(ticker), today, backfill_from
+                    ):
+                        await limiter.acquire()
+                        bars.extend(
+                            await StockService.fetch_stock_data_from_polygon(
+                                ticker, start, end
+                            )
+                        )
+                except Exception as e:
+                    await fetched.put((ticker, None, e))
+                else:
+                    await fetched.put((ticker, bars, None))
+
+        # Stored tickers awaiting the next valuation refresh
+        refresh_starts: Dict[str, Optional[date]] = {}
+        unreported: List[str] = []
+
+        async def refresh_valuations() -> None:
+            from app.services.valuation_service import ValuationService
+
+            await ValuationService.refresh_for_tickers(db, refresh_starts)
+            await db.commit()
+            refresh_starts.clear()
+            if on_result is not None:
+                for stored_ticker in unreported:
+                    await on_result(stored_ticker, results[stored_ticker])
+            unreported.clear()
+
+        async def next_fetched() -> Optional[tuple]:
+            """The next fetched ticker, or None once ``stop`` is set."""
+            if stop is None:
+                return await fetched.get()
+            getter = asyncio.ensure_future(fetched.get())
+            stopper = asyncio.ensure_future(stop.wait())
+            await asyncio.wait({getter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            getter.cancel()
+            stopper.cancel()
+            if stop.is_set():
+                return None
+            return getter.result()
+
+        fetchers = [asyncio.create_task(fetch(ticker)) for ticker in tickers]
+        try:
+            for _ in fetchers:
+                item = await next_fetched()
+                if item is None:
+                    break
+                ticker, bars, error = item
+                if error is None:
+                    try:
+                        _, counts = await StockService.store_stock_data(
+                            db, ticker, bars, refresh_starts
+                        )
+                    except Exception as e:
+                        await db.rollback()
+                        error = e
+                    else:
+                        results[ticker] = {"status": "ok", **counts}
+                        unreported.append(ticker)
+                        if len(unreported) >= VALUATION_REFRESH_BATCH:
+                            await refresh_valuations()
+                if error is not None:
+                    logger.warning("Error ingesting data for %s: %s", ticker, error)
+                    results[ticker] = {"status": "error", "error": str(error)}
+                    if on_result is not None:
+                        await on_result(ticker, results[ticker])
+            await refresh_valuations()
+        finally:
+            for task in fetchers:
+                task.cancel()
+
+        succeeded = sum(1 for result in results.values() if result["status"] == "ok")
+        summary = {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "tickers": results,
+        }
+        logger.info(
+            "Ingested %d tickers: %d succeeded, %d failed",
+            summary["total"],
+            summary["succeeded"],
+            summary["failed"],
+        )
+        return summary
+
+    @staticmethod
+    async def ingest_grouped(
+        db: AsyncSession,
+        tickers: List[str],
+        concurrency: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        backfill_from: Optional[date] = None,
+        on_result: Optional[Callable[[str, Dict], Awaitable[None]]] = None,
+        end_date: Optional[date] = None,
+        stop: Optional[asyncio.Event] = None,
+    ) -> Dict:
+        """
+        Fetch and store price data for many tickers, one request per day.
+
+        Polygon's grouped daily endpoint returns the bar of every US stock
+        for a day, so refreshing any number of tickers costs one request per
+        missing trading day instead of one per ticker. The days fetched are
+        the union of each ticker's ``StockService.ingestion_ranges``; each
+        response is filtered to the tickers that need that day, and written
+        with set-based upserts every ``GROUPED_DAYS_PER_WRITE`` days. Stored
+        valuations are refreshed once at the end.
+
+        Args:
+            db: Database session
+            tickers: Stock ticker symbols to track
+            concurrency: Maximum in-flight Polygon requests
+                (default: ``settings.ingest_concurrency``)
+            requests_per_second: Polygon request budget
+                (default: ``settings.polygon_requests_per_second``)
+            backfill_from: Also fetch missing history back to this day
+            on_result: Called with each ticker and its result once all days
+                are stored
+            end_date: Last day to fetch (default: today)
+            stop: When set, return after the days being fetched are stored,
+                without any ticker results
+
+        Returns:
+            Summary as for ``ingest_tickers``, where each ticker's result
+            counts its ``bars``, plus the number of ``requests``, the rows
+            ``inserted`` and ``updated``, and ``failed_days`` with their errors
+        """
+        tickers = list(dict.fromkeys(tickers))
+        concurrency = concurrency or settings.ingest_concurrency
+        if requests_per_second is None:
+            requests_per_second = settings.polygon_requests_per_second
+        end_date = end_date or date.today()
+
+        # Trading days to fetch, and the tickers that need each of them
+        stored = await StockService.get_price_ranges(db, tickers)
+        wanted: Dict[date, Set[str]] = {}
+        for ticker in tickers:
+            for start, end in StockService.ingestion_ranges(
+                stored.get(ticker), end_date, backfill_from
+            ):
+                day = start
+                while day <= end:
+                    if day.weekday() < 5:
+                        wanted.setdefault(day, set()).add(ticker)
+                    day += timedelta(days=1)
+
+        known = set(
+            (await db.execute(select(Stock.ticker).where(Stock.ticker.in_(tickers))))
+            .scalars()
+            .all()
+        )
+        new_stocks = [{"ticker": t, "name": t} for t in tickers if t not in known]
+        if new_stocks:
+            await db.execute(insert(Stock), new_stocks)
+            await db.commit()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = RateLimiter(requests_per_second)
+
+        async def fetch(day: date) -> List[dict]:
+            async with semaphore:
+                await limiter.acquire()
+                return await StockService.fetch_grouped_daily(day)
+
+        days = sorted(wanted)
+        bar_counts = dict.fromkeys(tickers, 0)
+        first_bars: Dict[str, date] = {}
+        failed_days: Dict[date, str] = {}
+        counts = {"inserted": 0, "updated": 0}
+        requested = 0
+        stopped = False
+        for offset in range(0, len(days), GROUPED_DAYS_PER_WRITE):
+            if stop is not None and stop.is_set():
+                stopped = True
+                break
+            chunk_end = offset + GROUPED_DAYS_PER_WRITE
+            chunk = days[offset:chunk_end]
+            requested += len(chunk)
+            responses = await asyncio.gather(
+                *(fetch(day) for day in chunk), return_exceptions=True
+            )
+
+            rows = []
+            for day, bars in zip(chunk, responses):
+                if isinstance(bars, Exception):
+                    logger.warning("Error fetching grouped bars for %s: %s", day, bars)
+                    failed_days[day] = str(bars)
+                    continue
+                needed = wanted[day]
+                for bar in bars:
+                    ticker = bar.get("T")
+                    if ticker in needed:
+                        # Grouped bars are stamped at the end of the session
+                        rows.append(
+                            {**StockService.parse_bar(ticker, bar), "date": day}
+                        )
+                        bar_counts[ticker] += 1
+                        first_bars.setdefault(ticker, day)
+
+            if rows:
+                written = await StockService.store_price_rows(db, rows)
+                counts["inserted"] += written["inserted"]
+                counts["updated"] += written["updated"]
+
+        if first_bars:
+            from app.services.valuation_service import ValuationService
+
+            await ValuationService.refresh_for_tickers(
+                db,
+                {
+                    ticker: ValuationService.refresh_start(stored.get(ticker), day)
+                    for ticker, day in first_bars.items()
+                },
+            )
+            await db.commit()
+
+        results: Dict[str, Dict] = {}
+        for ticker in [] if stopped else tickers:
+            missed = sorted(day for day in failed_days if ticker in wanted.get(day, ()))
+            if missed:
+                results[ticker] = {
+                    "status": "error",
+                    "error": f"Missing {len(missed)} day(s) from {missed[0]}",
+                    "bars": bar_counts[ticker],
+                }
+            else:
+                results[ticker] = {"status": "ok", "bars": bar_counts[ticker]}
+            if on_result is not None:
+                await on_result(ticker, results[ticker])
+
+        succeeded = sum(1 for result in results.values() if result["status"] == "ok")
+        summary = {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "tickers": results,
+            "requests": requested,
+            **counts,
+            "failed_days": {str(day): error for day, error in failed_days.items()},
+        }
+        logger.info(
+            "Ingested %d tickers from %d grouped daily requests: %d rows inserted, "
+            "%d updated, %d days failed",
+            summary["total"],
+            summary["requests"],
+            counts["inserted"],
+            counts["updated"],
+            len(failed_days),
+        )
+        return summary
@@ -0,0 +1,265 @@
+"""Durable ingestion jobs and the worker loop that runs them."""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db import AsyncSessionLocal
+from app.models import IngestionJob
+from app.services.ingestion_service import IngestionService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+def default_worker_id() -> str:
+    """Identify this process in claimed jobs."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobService:
+    """Service for queueing ingestion jobs and running them."""
+
+    @staticmethod
+    async def enqueue_ingestion(
+        db: AsyncSession,
+        tickers: List[str],
+        backfill_from: Optional[date] = None,
+        mode: str = IngestionJob.PER_TICKER,
+    ) -> IngestionJob:
+        """
+        Queue tickers for ingestion by a job worker.
+
+        Args:
+            db: Database session
+            tickers: Stock ticker symbols
+            backfill_from: Also fetch missing history back to this day
+            mode: ``IngestionJob.PER_TICKER`` or ``IngestionJob.GROUPED``
+
+        Returns:
+            The pending job
+        """
+        job = IngestionJob(
+            status=IngestionJob.PENDING,
+            mode=mode,
+            tickers=list(dict.fromkeys(tickers)),
+            backfill_from=backfill_from,
+            progress={},
+            attempts=0,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: UUID) -> Optional[IngestionJob]:
+        """Get a job by ID."""
+        return await db.get(IngestionJob, job_id)
+
+    @staticmethod
+    async def claim_next(db: AsyncSession, worker_id: str) -> Optional[UUID]:
+        """
+        Claim the oldest runnable job for a worker.
+
+        Pending jobs are runnable, as are running jobs whose worker stopped
+        sending heartbeats for ``settings.ingest_job_stale_seconds``. The
+        candidate row is locked with ``FOR UPDATE SKIP LOCKED``, so workers
+        polling at the same time claim different jobs instead of queueing
+        behind each other. Jobs already tried ``settings.ingest_job_max_attempts``
+        times are failed instead of claimed.
+
+        Returns:
+            ID of the claimed job, or None if there is nothing to run
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=settings.ingest_job_stale_seconds)
+        while True:
+            result = await db.execute(
+                select(IngestionJob)
+                .where(
+                    or_(
+                        IngestionJob.status == IngestionJob.PENDING,
+                        and_(
+                            IngestionJob.status == IngestionJob.RUNNING,
+                            IngestionJob.heartbeat_at < stale,
+                        ),
+                    )
+                )
+                .order_by(IngestionJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalar_one_or_none()
+            if job is None:
+                await db.rollback()
+                return None
+
+            if job.attempts >= settings.ingest_job_max_attempts:
+                job.status = IngestionJob.FAILED
+                job.error = f"Abandoned after {job.attempts} attempts"
+                job.finished_at = now
+                await db.commit()
+                continue
+
+            job.status = IngestionJob.RUNNING
+            job.worker_id = worker_id
+            job.attempts += 1
+            job.started_at = job.started_at or now
+            job.heartbeat_at = now
+            await db.commit()
+            return job.id
+
+    @staticmethod
+    async def run_job(
+        job_id: UUID,
+        session_factory: SessionFactory = AsyncSessionLocal,
+        stop: Optional[asyncio.Event] = None,
+    ) -> None:
+        """
+        Run a claimed job on its own session.
+
+        Each ticker's result is committed to the job as soon as it is known,
+        and a heartbeat is written on a second session while the job runs.
+        A reclaimed job skips the tickers an earlier attempt already stored.
+
+        When ``stop`` is set, the job returns after the ticker being stored
+        and goes back to pending, without counting the attempt, for another
+        worker to resume.
+        """
+        heartbeat = asyncio.create_task(JobService._heartbeat(job_id, session_factory))
+        try:
+            await JobService._run(job_id, session_factory, stop)
+        finally:
+            heartbeat.cancel()
+
+    @staticmethod
+    async def _heartbeat(job_id: UUID, session_factory: SessionFactory) -> None:
+        while True:
+            await asyncio.sleep(settings.ingest_job_stale_seconds / 3)
+            try:
+                async with session_factory() as db:
+                    await JobService._update(db, job_id, heartbeat_at=datetime.utcnow())
+            except Exception:
+                logger.exception("Could not record heartbeat of job %s", job_id)
+
+    @staticmethod
+    async def _run(
+        job_id: UUID, session_factory: SessionFactory, stop: Optional[asyncio.Event]
+    ) -> None:
+        async with session_factory() as db:
+            job = await db.get(IngestionJob, job_id)
+            progress: Dict[str, Dict] = dict(job.progress or {})
+            remaining = [
+                ticker
+                for ticker in job.tickers
+                if progress.get(ticker, {}).get("status") != "ok"
+            ]
+            backfill_from = job.backfill_from
+            ingest = (
+                IngestionService.ingest_grouped
+                if job.mode == IngestionJob.GROUPED
+                else IngestionService.ingest_tickers
+            )
+
+            async def record(ticker: str, result: Dict) -> None:
+                progress[ticker] = result
+                await JobService._update(
+                    db, job_id, progress=dict(progress), heartbeat_at=datetime.utcnow()
+                )
+
+            try:
+                summary = await ingest(
+                    db,
+                    remaining,
+                    backfill_from=backfill_from,
+                    on_result=record,
+                    stop=stop,
+                )
+            except Exception as e:
+                logger.exception("Ingestion job %s failed", job_id)
+                await db.rollback()
+                await JobService._update(
+                    db,
+                    job_id,
+                    status=IngestionJob.FAILED,
+                    error=str(e),
+                    finished_at=datetime.utcnow(),
+                )
+            else:
+                if len(summary["tickers"]) < len(remaining):
+                    logger.info(
+                        "Released ingestion job %s with %d tickers left",
+                        job_id,
+                        len(remaining) - len(summary["tickers"]),
+                    )
+                    await JobService._update(
+                        db,
+                        job_id,
+                        status=IngestionJob.PENDING,
+                        worker_id=None,
+                        attempts=IngestionJob.attempts - 1,
+                    )
+                    return
+                await JobService._update(
+                    db,
+                    job_id,
+                    status=IngestionJob.COMPLETED,
+                    finished_at=datetime.utcnow(),
+                )
+
+    @staticmethod
+    async def _update(db: AsyncSession, job_id: UUID, **values) -> None:
+        await db.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id)
+            .values(**values, updated_at=datetime.utcnow())
+        )
+        await db.commit()
+
+    @staticmethod
+    async def work(
+        stop: asyncio.Event,
+        worker_id: Optional[str] = None,
+        session_factory: SessionFactory = AsyncSessionLocal,
+        poll_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Claim and run jobs one at a time until ``stop`` is set.
+
+        Setting ``stop`` also interrupts the running job after its current
+        ticker (see ``run_job``). Run several workers, in one process or
+        many, to ingest several jobs in parallel.
+        """
+        worker_id = worker_id or default_worker_id()
+        if poll_seconds is None:
+            poll_seconds = settings.ingest_worker_poll_seconds
+        logger.info("Ingestion worker %s started", worker_id)
+
+        while not stop.is_set():
+            try:
+                async with session_factory() as db:
+                    job_id = await JobService.claim_next(db, worker_id)
+                if job_id is not None:
+                    logger.info("Worker %s running ingestion job %s", worker_id, job_id)
+                    await JobService.run_job(job_id, session_factory, stop)
+                    continue
+            except Exception:
+                logger.exception("Ingestion worker %s failed to run a job", worker_id)
+
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        logger.info("Ingestion worker %s stopped", worker_id)
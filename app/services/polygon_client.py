@@ -0,0 +1,206 @@
+"""Shared Polygon/Massive API client."""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import date
+from typing import List, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.metrics import POLYGON_RETRIES
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PolygonClient:
+    """
+    Long-lived Polygon client with pooled keep-alive connections.
+
+    Requests are retried with exponential backoff on transport errors,
+    rate limiting and 5xx responses. Aggregates for ranges that ended
+    before today never change, so they are kept in an on-disk cache keyed
+    by ticker and date range (or by day, for grouped daily bars) and served
+    from there on later backfills.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.polygon.io",
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        cache_dir: str = "",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cache_dir = cache_dir
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """Open the underlying connection pool."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+
+    async def close(self) -> None:
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_aggregates(
+        self, ticker: str, start_date: date, end_date: date
+    ) -> List[dict]:
+        """
+        Get daily aggregate bars for a ticker and date range.
+
+        Args:
+            ticker: Stock ticker symbol
+            start_date: First day of the range
+            end_date: Last day of the range
+
+        Returns:
+            List of Polygon aggregate bars, oldest first
+        """
+        cacheable = bool(self.cache_dir) and end_date < date.today()
+        safe_ticker = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        cache_name = os.path.join("aggs", f"{safe_ticker}_{start_date}_{end_date}.json")
+        if cacheable:
+            cached = self._read_cache(cache_name)
+            if cached is not None:
+                return cached
+
+        data = await self._get_json(
+            f"/v2/aggs/ticker/{ticker}/range/1/day/{start_date}/{end_date}",
+            {"adjusted": "true", "sort": "asc"},
+        )
+
+        # Polygon API returns "OK" for real-time data or "DELAYED" for delayed data
+        # Both are valid responses
+        if data.get("status") not in ["OK", "DELAYED"]:
+            return []
+
+        results = data.get("results") or []
+        if cacheable:
+            self._write_cache(cache_name, results)
+        return results
+
+    async def get_grouped_daily(self, day: date) -> List[dict]:
+        """
+        Get the daily bar of every US stock ticker for one day.
+
+        Args:
+            day: Trading day
+
+        Returns:
+            List of Polygon aggregate bars, each with its ticker under ``T``;
+            empty for days the market was closed
+        """
+        cacheable = bool(self.cache_dir) and day < date.today()
+        cache_name = os.path.join("grouped", f"{day}.json")
+        if cacheable:
+            cached = self._read_cache(cache_name)
+            if cached is not None:
+                return cached
+
+        data = await self._get_json(
+            f"/v2/aggs/grouped/locale/us/market/stocks/{day}", {"adjusted": "true"}
+        )
+        if data.get("status") not in ["OK", "DELAYED"]:
+            return []
+
+        results = data.get("results") or []
+        if cacheable:
+            self._write_cache(cache_name, results)
+        return results
+
+    async def _get_json(self, path: str, params: dict) -> dict:
+        await self.start()
+        params = {**params, "apiKey": self.api_key}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.get(path, params=params)
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt == self.max_retries
+                ):
+                    response.raise_for_status()
+                    return response.json()
+                delay = self._retry_delay(attempt, response)
+                reason = f"HTTP {response.status_code}"
+                retry_label = str(response.status_code)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+                reason = repr(e)
+                retry_label = type(e).__name__
+
+            POLYGON_RETRIES.labels(retry_label).inc()
+            logger.info(
+                "Retrying Polygon request %s in %.2fs (%s)", path, delay, reason
+            )
+            await asyncio.sleep(delay)
+
+    def _retry_delay(
+        self, attempt: int, response: Optional[httpx.Response] = None
+    ) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_seconds * (2**attempt)
+
+    def _read_cache(self, name: str) -> Optional[List[dict]]:
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, name: str, results: List[dict]) -> None:
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(results, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write Polygon cache file %s: %s", path, e)
+
+
+polygon_client = PolygonClient(
+    api_key=settings.polygon_api_key,
+    base_url=settings.polygon_base_url,
+    timeout=settings.polygon_timeout_seconds,
+    max_connections=settings.polygon_max_connections,
+    max_retries=settings.polygon_max_retries,
+    backoff_seconds=settings.polygon_retry_backoff_seconds,
+    cache_dir=settings.polygon_cache_dir,
+)
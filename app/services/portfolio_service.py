@@ -1,21 +1,29 @@
 """Portfolio service layer."""
 
-from datetime import date
-from typing import Dict
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
-from decimal import Decimal
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.models import Customer
+from app.models import Customer, Portfolio, PortfolioStock
+from app.services.price_cache import price_versions
+from app.services.return_cache import Versions, return_cache
 from app.services.stock_service import StockService
+from app.services.valuation_service import ValuationService
+
+# Customers whose holdings and prices are loaded per batch round trip
+BATCH_CHUNK_SIZE = 1000
 
 
 class PortfolioService:
     """Service for portfolio operations."""
 
     @staticmethod
-    def calculate_portfolio_return(
-        db: Session,
+    async def calculate_portfolio_return(
+        db: AsyncSession,
         customer_id: UUID,
         start_date: date,
         end_date: date,
@@ -23,6 +31,9 @@ class PortfolioService:
         """
         Calculate portfolio return for a customer over a date range.
 
+        Results are cached per worker until the customer's holdings or the
+        prices of any holding change, in any process.
+
         Args:
             db: Database session
             customer_id: Customer UUID
@@ -32,81 +43,485 @@ class PortfolioService:
         Returns:
             Dictionary with return details
         """
-        # Get customer with portfolio
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if not customer or not customer.portfolio:
-            raise ValueError("Customer or portfolio not found")
 
-        portfolio_stocks = customer.portfolio.portfolio_stocks
+        async def current_versions(tickers: List[str]) -> Versions:
+            return Versions(
+                await PortfolioService._holdings_version(db, customer_id),
+                await price_versions(db, tickers),
+            )
+
+        cached = await return_cache.get(
+            customer_id, start_date, end_date, current_versions
+        )
+        if cached is not None:
+            return cached
+
+        holdings_version = await PortfolioService._holdings_version(db, customer_id)
+        _, portfolio_holdings = await PortfolioService._get_holdings(db, customer_id)
+        holdings = [(0, ticker, quantity) for ticker, quantity in portfolio_holdings]
+        tickers = [ticker for _, ticker, _ in holdings]
+        versions = Versions(holdings_version, await price_versions(db, tickers))
+
+        # Fetch first/last closes for every holding in one query
+        boundary_cents = await StockService.get_boundary_cents(
+            db, tickers, start_date, end_date
+        )
+
+        result = PortfolioService._summarize_returns(
+            [customer_id], holdings, boundary_cents, start_date, end_date
+        )[0]
+        return_cache.put(customer_id, start_date, end_date, result, versions)
+        return result
+
+    @staticmethod
+    async def calculate_portfolio_timeseries(
+        db: AsyncSession,
+        customer_id: UUID,
+        start_date: date,
+        end_date: date,
+    ) -> Dict:
+        """
+        Calculate a customer's daily portfolio value over a date range.
+
+        Values are read from the materialized ``portfolio_daily_values``
+        table when its first row in the range is ``all_priced``. Otherwise closes for every
+        holding are pivoted into a (day x ticker) matrix covering each
+        calendar day of the range. Either way non-trading days carry the
+        previous value forward and days before the first value in the range
+        use that first value, matching ``calculate_portfolio_return``.
+        Values and returns are then computed as array operations.
+
+        Args:
+            db: Database session
+            customer_id: Customer UUID
+            start_date: Start date for calculation
+            end_date: End date for calculation
+
+        Returns:
+            Dictionary with one point per calendar day
+        """
+        portfolio_id, holdings = await PortfolioService._get_holdings(db, customer_id)
+
+        series = {
+            "customer_id": str(customer_id),
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "points": [],
+        }
+        start_ordinal = start_date.toordinal()
+        days = end_date.toordinal() - start_ordinal + 1
+
+        # Prefer the materialized valuations, one row per trading day
+        value_dates, stored_values = await ValuationService.get_values(
+            db, portfolio_id, start_date, end_date
+        )
+        if len(value_dates):
+            values = PortfolioService._fill_calendar(
+                [(value_dates, stored_values)], start_ordinal, days
+            )[:, 0]
+        else:
+            quantities = dict(holdings)
+            columns = await StockService.get_close_columns(
+                db, list(quantities), start_date, end_date
+            )
+            if not columns:
+                # No holding has price data in the range
+                return series
+            tickers = list(columns)
+            closes = PortfolioService._fill_calendar(
+                [columns[ticker] for ticker in tickers], start_ordinal, days
+            )
+            values = closes @ np.array(
+                [quantities[ticker] for ticker in tickers], float
+            )
+
+        previous_values = np.concatenate(([values[0]], values[:-1]))
+        daily_returns = PortfolioService._percent_change(previous_values, values)
+        cumulative_returns = PortfolioService._percent_change(
+            np.full(days, values[0]), values
+        )
+
+        series["points"] = [
+            {
+                "date": str(date.fromordinal(start_ordinal + offset)),
+                "market_value": value,
+                "daily_return_percentage": daily_return,
+                "cumulative_return_percentage": cumulative_return,
+            }
+            for offset, (value, daily_return, cumulative_return) in enumerate(
+                zip(
+                    values.tolist(),
+                    daily_returns.tolist(),
+                    cumulative_returns.tolist(),
+                )
+            )
+        ]
+        return series
+
+    @staticmethod
+    async def calculate_portfolio_returns_batch(
+        db: AsyncSession,
+        customer_ids: Optional[List[UUID]],
+        start_date: date,
+        end_date: date,
+        include_holdings: bool = True,
+    ) -> AsyncIterator[Dict]:
+        """
+        Calculate portfolio returns for many customers.
+
+        Customers are processed in chunks: each chunk costs one query for
+        portfolios, one for holdings and one for boundary prices, and the
+        returns of every holding in the chunk are computed as array
+        operations. Results are yielded as soon as a chunk is done.
+
+        Without per-holding detail, totals come from the first and last
+        materialized daily value of each portfolio instead, so a chunk
+        reads at most two valuation rows per portfolio and, unless some
+        portfolio has no stored values yet, no prices.
+
+        Args:
+            db: Database session
+            customer_ids: Customer UUIDs, or None for every customer
+            start_date: Start date for calculation
+            end_date: End date for calculation
+            include_holdings: Include per-holding returns
+
+        Yields:
+            Return details per customer, in the same shape as
+            ``calculate_portfolio_return``. Unknown customers yield a
+            dictionary with ``customer_id`` and ``error`` instead.
+        """
+        async for chunk, portfolios in PortfolioService._portfolio_chunks(
+            db, customer_ids
+        ):
+            if not include_holdings:
+                for result in await PortfolioService._summarize_stored_returns(
+                    db, chunk, portfolios, start_date, end_date
+                ):
+                    yield result
+                continue
+
+            found = [customer_id for customer_id in chunk if customer_id in portfolios]
+            results = iter(
+                await PortfolioService._summarize_held_returns(
+                    db, found, portfolios, start_date, end_date
+                )
+            )
+
+            for customer_id in chunk:
+                if customer_id in portfolios:
+                    yield next(results)
+                else:
+                    yield {
+                        "customer_id": str(customer_id),
+                        "error": "Customer or portfolio not found",
+                    }
+
+    @staticmethod
+    async def _summarize_held_returns(
+        db: AsyncSession,
+        found: List[UUID],
+        portfolios: Dict[UUID, UUID],
+        start_date: date,
+        end_date: date,
+    ) -> List[Dict]:
+        """Compute returns of existing customers from their holdings' closes."""
+        holdings_result = await db.execute(
+            select(
+                PortfolioStock.portfolio_id,
+                PortfolioStock.stock_ticker,
+                PortfolioStock.quantity,
+            ).where(
+                PortfolioStock.portfolio_id.in_(
+                    [portfolios[customer_id] for customer_id in found]
+                )
+            )
+        )
+
+        index_by_portfolio = {
+            portfolios[customer_id]: index for index, customer_id in enumerate(found)
+        }
+        holdings = [
+            (index_by_portfolio[portfolio_id], ticker, quantity)
+            for portfolio_id, ticker, quantity in holdings_result
+        ]
+
+        boundary_cents = await StockService.get_boundary_cents(
+            db, [ticker for _, ticker, _ in holdings], start_date, end_date
+        )
+        return PortfolioService._summarize_returns(
+            found, holdings, boundary_cents, start_date, end_date
+        )
 
-        if not portfolio_stocks:
-            return {
+    @staticmethod
+    async def _summarize_stored_returns(
+        db: AsyncSession,
+        chunk: List[UUID],
+        portfolios: Dict[UUID, UUID],
+        start_date: date,
+        end_date: date,
+    ) -> List[Dict]:
+        """
+        Compute portfolio totals from materialized daily values.
+
+        Portfolios without ``all_priced`` stored values bounding the range,
+        such as those whose valuations are still being refreshed after a
+        write or with a holding that starts trading inside the range, fall
+        back to their holdings' closes.
+        """
+        boundary_values = await ValuationService.get_boundary_values(
+            db, list(portfolios.values()), start_date, end_date
+        )
+        found = [
+            customer_id
+            for customer_id in chunk
+            if portfolios.get(customer_id) in boundary_values
+        ]
+        start_values = np.fromiter(
+            (boundary_values[portfolios[c]][0] for c in found), np.float64, len(found)
+        )
+        end_values = np.fromiter(
+            (boundary_values[portfolios[c]][1] for c in found), np.float64, len(found)
+        )
+        return_percentages = PortfolioService._percent_change(start_values, end_values)
+        summaries = {
+            customer_id: {
                 "customer_id": str(customer_id),
                 "start_date": str(start_date),
                 "end_date": str(end_date),
-                "total_return": 0.0,
-                "return_percentage": 0.0,
+                "total_return": total_return,
+                "return_percentage": return_percentage,
                 "holdings": [],
             }
+            for customer_id, total_return, return_percentage in zip(
+                found,
+                (end_values - start_values).tolist(),
+                return_percentages.tolist(),
+            )
+        }
+
+        unvalued = [
+            customer_id
+            for customer_id in chunk
+            if customer_id in portfolios and customer_id not in summaries
+        ]
+        if unvalued:
+            for customer_id, summary in zip(
+                unvalued,
+                await PortfolioService._summarize_held_returns(
+                    db, unvalued, portfolios, start_date, end_date
+                ),
+            ):
+                summaries[customer_id] = {**summary, "holdings": []}
+
+        return [
+            summaries.get(customer_id)
+            or {
+                "customer_id": str(customer_id),
+                "error": "Customer or portfolio not found",
+            }
+            for customer_id in chunk
+        ]
 
-        holdings = []
-        total_start_value = Decimal("0")
-        total_end_value = Decimal("0")
+    @staticmethod
+    async def _portfolio_chunks(
+        db: AsyncSession, customer_ids: Optional[List[UUID]]
+    ) -> AsyncIterator[Tuple[List[UUID], Dict[UUID, UUID]]]:
+        """Yield customer ID chunks with their portfolio IDs."""
+        if customer_ids is not None:
+            customer_ids = list(dict.fromkeys(customer_ids))
+            for offset in range(0, len(customer_ids), BATCH_CHUNK_SIZE):
+                chunk_end = offset + BATCH_CHUNK_SIZE
+                chunk = customer_ids[offset:chunk_end]
+                result = await db.execute(
+                    select(Portfolio.customer_id, Portfolio.id).where(
+                        Portfolio.customer_id.in_(chunk)
+                    )
+                )
+                yield chunk, dict(result.all())
+            return
 
-        for portfolio_stock in portfolio_stocks:
-            ticker = portfolio_stock.stock_ticker
-            quantity = portfolio_stock.quantity
+        # Every customer: keyset over customer_id so each chunk costs the same
+        last_customer_id = None
+        while True:
+            query = select(Portfolio.customer_id, Portfolio.id)
+            if last_customer_id is not None:
+                query = query.where(Portfolio.customer_id > last_customer_id)
+            result = await db.execute(
+                query.order_by(Portfolio.customer_id).limit(BATCH_CHUNK_SIZE)
+            )
+            portfolios = dict(result.all())
+            if not portfolios:
+                return
+            chunk = list(portfolios)
+            last_customer_id = chunk[-1]
+            yield chunk, portfolios
 
-            # Get stock prices for the date range
-            prices = StockService.get_stock_prices(db, ticker, start_date, end_date)
+    @staticmethod
+    async def _get_holdings(
+        db: AsyncSession, customer_id: UUID
+    ) -> Tuple[UUID, List[Tuple[str, int]]]:
+        """Get a customer's portfolio ID and (ticker, quantity) holdings."""
+        # Get customer with portfolio
+        result = await db.execute(
+            select(Customer)
+            .options(
+                selectinload(Customer.portfolio).selectinload(
+                    Portfolio.portfolio_stocks
+                )
+            )
+            .filter(Customer.id == customer_id)
+        )
+        customer = result.scalar_one_or_none()
+        if not customer or not customer.portfolio:
+            raise ValueError("Customer or portfolio not found")
 
-            if not prices:
-                # Skip stocks with no price data
-                continue
+        return customer.portfolio.id, [
+            (portfolio_stock.stock_ticker, portfolio_stock.quantity)
+            for portfolio_stock in customer.portfolio.portfolio_stocks
+        ]
+
+    @staticmethod
+    async def _holdings_version(
+        db: AsyncSession, customer_id: UUID
+    ) -> Optional[datetime]:
+        """The ``updated_at`` of a customer's portfolio, bumped by holdings changes."""
+        return await db.scalar(
+            select(Portfolio.updated_at).where(Portfolio.customer_id == customer_id)
+        )
+
+    @staticmethod
+    def _summarize_returns(
+        customer_ids: List[UUID],
+        holdings: List[Tuple[int, str, int]],
+        boundary_cents: Dict[str, Tuple[int, int]],
+        start_date: date,
+        end_date: date,
+    ) -> List[Dict]:
+        """
+        Compute holding and portfolio returns for many portfolios at once.
+
+        Prices, values and totals are exact int64 cents and only become
+        dollar floats in the result.
+
+        Args:
+            customer_ids: Customer UUIDs, one per portfolio
+            holdings: (index into ``customer_ids``, ticker, quantity) rows
+            boundary_cents: First and last close per ticker, in cents
+            start_date: Start date for calculation
+            end_date: End date for calculation
+
+        Returns:
+            Return details per customer, in ``customer_ids`` order
+        """
+        # Skip stocks with no price data
+        priced = [holding for holding in holdings if holding[1] in boundary_cents]
+        count = len(priced)
+
+        # Closes per ticker, gathered per holding by ticker position
+        positions = {ticker: position for position, ticker in enumerate(boundary_cents)}
+        closes = np.array(list(boundary_cents.values()), dtype=np.int64).reshape(-1, 2)
+
+        owners = np.fromiter((owner for owner, _, _ in priced), np.int64, count)
+        quantities = np.fromiter((qty for _, _, qty in priced), np.int64, count)
+        tickers = np.fromiter(
+            (positions[ticker] for _, ticker, _ in priced), np.int64, count
+        )
+        start_prices = closes[tickers, 0]
+        end_prices = closes[tickers, 1]
+
+        # Per-holding values and returns
+        start_values = start_prices * quantities
+        end_values = end_prices * quantities
+        stock_returns = end_values - start_values
+        stock_return_pcts = PortfolioService._percent_change(start_prices, end_prices)
+
+        # Per-portfolio totals; float64 sums of whole cents are exact below 2**53
+        total_start_values = np.bincount(
+            owners, weights=start_values, minlength=len(customer_ids)
+        ).astype(np.int64)
+        total_end_values = np.bincount(
+            owners, weights=end_values, minlength=len(customer_ids)
+        ).astype(np.int64)
+        total_returns = total_end_values - total_start_values
+        return_percentages = PortfolioService._percent_change(
+            total_start_values, total_end_values
+        )
 
-            # Get first and last prices
-            start_price = prices[0].close_price
-            end_price = prices[-1].close_price
-
-            # Calculate values
-            start_value = start_price * Decimal(str(quantity))
-            end_value = end_price * Decimal(str(quantity))
-            stock_return = end_value - start_value
-            stock_return_pct = (
-                (float(end_price - start_price) / float(start_price)) * 100
-                if start_price > 0
-                else 0.0
+        results = [
+            {
+                "customer_id": str(customer_id),
+                "start_date": str(start_date),
+                "end_date": str(end_date),
+                "total_return": total_return,
+                "return_percentage": return_percentage,
+                "holdings": [],
+            }
+            for customer_id, total_return, return_percentage in zip(
+                customer_ids,
+                (total_returns / 100).tolist(),
+                return_percentages.tolist(),
             )
+        ]
 
-            holdings.append(
+        for (owner, ticker, quantity), columns in zip(
+            priced,
+            zip(
+                (start_prices / 100).tolist(),
+                (end_prices / 100).tolist(),
+                (start_values / 100).tolist(),
+                (end_values / 100).tolist(),
+                (stock_returns / 100).tolist(),
+                stock_return_pcts.tolist(),
+            ),
+        ):
+            start_price, end_price, start_value, end_value, stock_return, pct = columns
+            results[owner]["holdings"].append(
                 {
                     "ticker": ticker,
                     "quantity": quantity,
-                    "start_price": float(start_price),
-                    "end_price": float(end_price),
-                    "start_value": float(start_value),
-                    "end_value": float(end_value),
-                    "return": float(stock_return),
-                    "return_percentage": stock_return_pct,
+                    "start_price": start_price,
+                    "end_price": end_price,
+                    "start_value": start_value,
+                    "end_value": end_value,
+                    "return": stock_return,
+                    "return_percentage": pct,
                 }
             )
 
-            total_start_value += start_value
-            total_end_value += end_value
+        return results
+
+    @staticmethod
+    def _fill_calendar(
+        columns: List[Tuple[np.ndarray, np.ndarray]], start_ordinal: int, days: int
+    ) -> np.ndarray:
+        """
+        Pivot sparse (date ordinals, values) columns onto calendar days.
+
+        Days without a value carry the previous value forward; days before a
+        column's first value use that first value.
 
-        # Calculate total return
-        total_return = total_end_value - total_start_value
-        return_percentage = (
-            (float(total_return) / float(total_start_value)) * 100
-            if total_start_value > 0
-            else 0.0
+        Returns:
+            A (day x column) matrix
+        """
+        matrix = np.full((days, len(columns)), np.nan)
+        for column, (dates, values) in enumerate(columns):
+            matrix[dates - start_ordinal, column] = values
+
+        # Forward-fill gaps, then back-fill the days before each first value
+        present = ~np.isnan(matrix)
+        rows = np.arange(days)[:, None]
+        last_row = np.maximum.accumulate(np.where(present, rows, 0), axis=0)
+        matrix = np.take_along_axis(matrix, last_row, axis=0)
+        first_row = present.argmax(axis=0)
+        return np.where(
+            np.isnan(matrix), matrix[first_row, np.arange(len(columns))], matrix
         )
 
-        return {
-            "customer_id": str(customer_id),
-            "start_date": str(start_date),
-            "end_date": str(end_date),
-            "total_return": float(total_return),
-            "return_percentage": return_percentage,
-            "holdings": holdings,
-        }
+    @staticmethod
+    def _percent_change(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Element-wise percentage change, 0.0 where the start is not positive."""
+        positive = start > 0
+        change = np.zeros(start.shape, dtype=np.float64)
+        np.divide(end - start, start, out=change, where=positive)
+        return change * 100
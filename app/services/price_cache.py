@@ -0,0 +1,270 @@
+"""Per-worker in-memory cache of daily closing prices."""
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Stock, StockPrice
+
+settings = get_settings()
+
+# Rough per-entry cost of the Python objects wrapping the arrays
+_ENTRY_OVERHEAD_BYTES = 256
+# float_to_cents rounds products of prices below the limit directly unless
+# they lie within the tolerance of a half cent, far above their float error
+_FAST_CENTS_LIMIT = 1e9
+_HALF_CENT_TOLERANCE = 1e-4
+
+
+class PricePoint(NamedTuple):
+    """A single daily close."""
+
+    date: date
+    close_price: Decimal
+
+
+class TickerPrices:
+    """Column-oriented close history for one ticker, sorted by date."""
+
+    __slots__ = ("dates", "closes", "version", "loaded_at")
+
+    def __init__(self, dates: array, closes: array, version: Optional[datetime] = None):
+        self.dates = dates  # date ordinals
+        self.closes = closes  # close prices in integer cents
+        self.version = version  # stocks.updated_at when loaded
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint of this entry."""
+        return (
+            len(self.dates) * self.dates.itemsize
+            + len(self.closes) * self.closes.itemsize
+            + _ENTRY_OVERHEAD_BYTES
+        )
+
+    def index_range(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        """Return the [lo, hi) slice of rows falling inside a date range."""
+        lo = bisect_left(self.dates, start_date.toordinal())
+        hi = bisect_right(self.dates, end_date.toordinal(), lo)
+        return lo, hi
+
+    def points(self, start_date: date, end_date: date) -> List[PricePoint]:
+        """Closes inside a date range, oldest first."""
+        lo, hi = self.index_range(start_date, end_date)
+        return [
+            PricePoint(
+                date.fromordinal(self.dates[i]), cents_to_decimal(self.closes[i])
+            )
+            for i in range(lo, hi)
+        ]
+
+    def columns(
+        self, start_date: date, end_date: date, carry_in: bool = False
+    ) -> Tuple[array, array]:
+        """
+        Date ordinals and cent closes inside a date range.
+
+        With ``carry_in``, the last close before the range is included too.
+        """
+        lo, hi = self.index_range(start_date, end_date)
+        if carry_in and lo:
+            lo -= 1
+        return self.dates[lo:hi], self.closes[lo:hi]
+
+    def boundaries(self, start_date: date, end_date: date) -> Optional[Tuple[int, int]]:
+        """First and last close inside a date range in cents, if any."""
+        lo, hi = self.index_range(start_date, end_date)
+        if lo == hi:
+            return None
+        return self.closes[lo], self.closes[hi - 1]
+
+
+async def price_versions(
+    db: AsyncSession, tickers: Iterable[str]
+) -> Tuple[Tuple[str, datetime], ...]:
+    """
+    Current version of some tickers' prices, sorted by ticker.
+
+    ``stocks.updated_at`` is bumped by every price write
+    (``StockService.store_price_rows``), so it changes in every process
+    that writes prices. Unknown tickers are omitted.
+    """
+    result = await db.execute(
+        select(Stock.ticker, Stock.updated_at)
+        .where(Stock.ticker.in_(set(tickers)))
+        .order_by(Stock.ticker)
+    )
+    return tuple((ticker, updated_at) for ticker, updated_at in result)
+
+
+def decimal_to_cents(value: Decimal) -> int:
+    """Convert a two-decimal price to integer cents."""
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def float_to_cents(value: float) -> int:
+    """
+    Convert a float price, e.g. from a Polygon bar, to integer cents.
+
+    The float's shortest decimal text is rounded exactly, half cents away
+    from zero, as when PostgreSQL stores that text in a ``NUMERIC(10, 2)``
+    column; ``1.005`` becomes 101 even though ``1.005 * 100`` is
+    ``100.49999999999999``. Away from half cents the float product is far
+    more precise than needed and rounds the same way, so only prices close
+    to a half cent pay for ``Decimal``.
+    """
+    scaled = value * 100
+    fraction = scaled - math.floor(scaled)
+    if abs(fraction - 0.5) > _HALF_CENT_TOLERANCE and abs(value) < _FAST_CENTS_LIMIT:
+        return math.floor(scaled + 0.5)
+    return int((Decimal(repr(value)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """Convert integer cents back to a two-decimal price."""
+    return Decimal(cents).scaleb(-2)
+
+
+class PriceCache:
+    """
+    LRU cache of per-ticker close histories, bounded by memory size.
+
+    Each ticker's full history is loaded once and kept as two parallel
+    arrays, so date-range lookups are binary searches instead of queries.
+    Every load first reads the tickers' ``stocks.updated_at`` (see
+    ``price_versions``) by primary key and reloads entries whose version
+    changed, so writes made by any worker are visible on the next call.
+    Writes made by this worker also drop the ticker immediately, and
+    entries expire after a TTL.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, TickerPrices]" = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache holds anything at all."""
+        return self.max_bytes > 0
+
+    @property
+    def size(self) -> int:
+        """Approximate number of bytes currently cached."""
+        return self._size
+
+    def get(self, ticker: str) -> Optional[TickerPrices]:
+        """Get a ticker's history and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                self._remove(ticker)
+                return None
+            self._entries.move_to_end(ticker)
+            return entry
+
+    def invalidate(self, ticker: str) -> None:
+        """Drop a ticker, e.g. after new bars were written for it."""
+        with self._lock:
+            self._generation += 1
+            self._remove(ticker)
+
+    def clear(self) -> None:
+        """Drop every cached ticker."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
+    async def load(
+        self, db: AsyncSession, tickers: Iterable[str]
+    ) -> Dict[str, TickerPrices]:
+        """
+        Get histories for many tickers, loading all misses in one query.
+
+        Tickers without any stored prices are omitted from the result.
+        """
+        tickers = set(tickers)
+        # Read before the prices, so a racing write leaves the entry stale
+        versions = dict(await price_versions(db, tickers))
+        found: Dict[str, TickerPrices] = {}
+        missing = []
+        for ticker in tickers:
+            entry = self.get(ticker)
+            if entry is None or entry.version != versions.get(ticker):
+                missing.append(ticker)
+            else:
+                found[ticker] = entry
+
+        if not missing:
+            return found
+
+        generation = self._generation
+        result = await db.execute(
+            select(StockPrice.stock_ticker, StockPrice.date, StockPrice.close_price)
+            .where(StockPrice.stock_ticker.in_(missing))
+            .order_by(StockPrice.stock_ticker, StockPrice.date)
+        )
+        rows = result.all()
+
+        loaded: Dict[str, TickerPrices] = {}
+        for ticker, price_date, close_price in rows:
+            entry = loaded.get(ticker)
+            if entry is None:
+                entry = loaded[ticker] = TickerPrices(
+                    array("l"), array("q"), versions.get(ticker)
+                )
+            entry.dates.append(price_date.toordinal())
+            entry.closes.append(decimal_to_cents(close_price))
+        # Remember unpriced tickers too, so they do not re-query every call
+        for ticker in missing:
+            if ticker not in loaded:
+                loaded[ticker] = TickerPrices(
+                    array("l"), array("q"), versions.get(ticker)
+                )
+
+        with self._lock:
+            # Skip storing if an invalidation raced with the query
+            if generation == self._generation:
+                for ticker, entry in loaded.items():
+                    self._put(ticker, entry)
+
+        found.update(loaded)
+        return {ticker: entry for ticker, entry in found.items() if entry.dates}
+
+    def _put(self, ticker: str, entry: TickerPrices) -> None:
+        if entry.nbytes > self.max_bytes:
+            return
+        self._remove(ticker)
+        self._entries[ticker] = entry
+        self._size += entry.nbytes
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+
+    def _remove(self, ticker: str) -> None:
+        entry = self._entries.pop(ticker, None)
+        if entry is not None:
+            self._size -= entry.nbytes
+
+
+price_cache = PriceCache(
+    max_bytes=settings.price_cache_max_bytes,
+    ttl_seconds=settings.price_cache_ttl_seconds,
+)
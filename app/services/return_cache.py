@@ -0,0 +1,139 @@
+"""Per-worker cache of portfolio return calculations."""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from prometheus_client import Counter
+
+from app.config import get_settings
+
+settings = get_settings()
+
+RETURN_CACHE_HITS = Counter(
+    "portfolio_return_cache_hits_total",
+    "Portfolio return calculations served from the result cache",
+)
+RETURN_CACHE_MISSES = Counter(
+    "portfolio_return_cache_misses_total",
+    "Portfolio return calculations that had to be computed",
+)
+
+
+class Versions(NamedTuple):
+    """Versions of the inputs a cached result was computed from."""
+
+    # The portfolio's updated_at, bumped whenever its holdings change
+    holdings: Optional[datetime]
+    # stocks.updated_at of each held ticker, bumped whenever its prices change
+    prices: Tuple[Tuple[str, datetime], ...]
+
+
+class CachedReturn(NamedTuple):
+    """A cached result together with the versions it depends on."""
+
+    result: Dict
+    versions: Versions
+    stored_at: float
+
+
+class ReturnCache:
+    """
+    LRU cache of portfolio returns keyed by customer and date range.
+
+    A cached result is only served while the versions it was computed from
+    are still current. Versions are timestamps stored in the database, so
+    writes made by any worker, including the ingestion workers, invalidate
+    exactly the results depending on them; checking them costs two primary
+    key lookups instead of a return calculation. Entries also expire after
+    a TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[UUID, date, date], CachedReturn]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache holds anything at all."""
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(
+        self,
+        customer_id: UUID,
+        start_date: date,
+        end_date: date,
+        current_versions: Callable[[List[str]], Awaitable[Versions]],
+    ) -> Optional[Dict]:
+        """
+        Get a cached result if it is still current.
+
+        ``current_versions`` is awaited with the cached result's tickers and
+        returns the versions stored now.
+        """
+        key = (customer_id, start_date, end_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry.stored_at > self.ttl_seconds
+            ):
+                del self._entries[key]
+                entry = None
+
+        if entry is not None:
+            tickers = [ticker for ticker, _ in entry.versions.prices]
+            current = await current_versions(tickers)
+            with self._lock:
+                if current == entry.versions:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    RETURN_CACHE_HITS.inc()
+                    return entry.result
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+        RETURN_CACHE_MISSES.inc()
+        return None
+
+    def put(
+        self,
+        customer_id: UUID,
+        start_date: date,
+        end_date: date,
+        result: Dict,
+        versions: Versions,
+    ) -> None:
+        """
+        Cache a result computed from the given input versions.
+
+        Read the versions before loading the inputs, so that a write racing
+        with the calculation leaves the result unservable.
+        """
+        if not self.enabled:
+            return
+        key = (customer_id, start_date, end_date)
+        with self._lock:
+            self._entries[key] = CachedReturn(result, versions, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+
+return_cache = ReturnCache(
+    max_entries=settings.return_cache_max_entries,
+    ttl_seconds=settings.return_cache_ttl_seconds,
+)
@@ -1,17 +1,63 @@
 """Stock service layer."""
 
+import time
 from datetime import datetime, timedelta, date
-from typing import List
-from decimal import Decimal
-import httpx
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    String,
+    and_,
+    bindparam,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
 from app.models import Stock, StockPrice
 from app.config import get_settings
+from app.metrics import POLYGON_FETCH_DURATION, POLYGON_FETCH_ERRORS
+from app.services.polygon_client import polygon_client
+from app.services.price_cache import (
+    PricePoint,
+    cents_to_decimal,
+    decimal_to_cents,
+    float_to_cents,
+    price_cache,
+)
 
 settings = get_settings()
 
+# Rows per upsert statement
+UPSERT_BATCH_SIZE = 1000
+
+# Price columns, filled from the integer-cent values of parsed bars
+CENT_COLUMNS = {
+    "open_price": "open_cents",
+    "high_price": "high_cents",
+    "low_price": "low_cents",
+    "close_price": "close_cents",
+}
+
+# Columns refreshed when a bar for an existing (ticker, date) arrives again
+PRICE_COLUMNS = (*CENT_COLUMNS, "volume")
+
+# Parsed bar values sent to PostgreSQL as one array parameter each
+BAR_ARRAYS = (
+    ("stock_ticker", String),
+    ("date", Date),
+    *((key, BigInteger) for key in CENT_COLUMNS.values()),
+    ("volume", BigInteger),
+)
+
 
 class StockService:
     """Service for stock operations."""
@@ -75,127 +121,607 @@ class StockService:
     ]
 
     @staticmethod
-    async def fetch_stock_data_from_polygon(ticker: str, days: int = 14) -> List[dict]:
+    async def fetch_stock_data_from_polygon(
+        ticker: str, start_date: date, end_date: date
+    ) -> List[dict]:
         """
         Fetch stock data from Polygon/Massive API.
 
         Args:
             ticker: Stock ticker symbol
-            days: Number of days of historical data to fetch
+            start_date: First day to fetch
+            end_date: Last day to fetch
 
         Returns:
             List of stock price data
         """
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
+        start = time.perf_counter()
+        try:
+            return await polygon_client.get_aggregates(ticker, start_date, end_date)
+        except Exception as e:
+            POLYGON_FETCH_ERRORS.labels(type(e).__name__).inc()
+            raise
+        finally:
+            POLYGON_FETCH_DURATION.observe(time.perf_counter() - start)
+
+    @staticmethod
+    async def fetch_grouped_daily(day: date) -> List[dict]:
+        """
+        Fetch every US stock's daily bar for one day from Polygon/Massive API.
+
+        Args:
+            day: Trading day
+
+        Returns:
+            List of stock price data, with each bar's ticker under ``T``
+        """
+        start = time.perf_counter()
+        try:
+            return await polygon_client.get_grouped_daily(day)
+        except Exception as e:
+            POLYGON_FETCH_ERRORS.labels(type(e).__name__).inc()
+            raise
+        finally:
+            POLYGON_FETCH_DURATION.observe(time.perf_counter() - start)
+
+    @staticmethod
+    async def get_price_ranges(
+        db: AsyncSession, tickers: List[str]
+    ) -> Dict[str, Tuple[date, date]]:
+        """
+        Get the first and last stored price date of many tickers.
+
+        The last date is the ticker's ingestion watermark. Tickers without
+        any stored price are omitted.
+        """
+        if not tickers:
+            return {}
+        result = await db.execute(
+            select(
+                StockPrice.stock_ticker,
+                func.min(StockPrice.date),
+                func.max(StockPrice.date),
+            )
+            .where(StockPrice.stock_ticker.in_(set(tickers)))
+            .group_by(StockPrice.stock_ticker)
+        )
+        return {ticker: (first, last) for ticker, first, last in result}
+
+    @staticmethod
+    def ingestion_ranges(
+        stored: Optional[Tuple[date, date]],
+        end_date: date,
+        backfill_from: Optional[date] = None,
+    ) -> List[Tuple[date, date]]:
+        """
+        Plan the Polygon requests that bring a ticker up to ``end_date``.
+
+        Only days after the watermark are fetched, plus the watermark day
+        itself, whose bar may have been stored before the session closed.
+        A ticker without prices gets ``settings.ingest_initial_days`` of
+        history. ``backfill_from`` also fetches the history missing before
+        the first stored day. Long ranges are split into pages of
+        ``settings.ingest_backfill_page_days``.
+
+        Args:
+            stored: First and last stored price date (see ``get_price_ranges``)
+            end_date: Last day to fetch, normally today
+            backfill_from: Fetch history back to this day
+
+        Returns:
+            (start, end) date ranges, oldest first
+        """
+        if stored is None:
+            start = backfill_from or end_date - timedelta(
+                days=settings.ingest_initial_days
+            )
+            return StockService._pages(start, end_date)
+
+        first, last = stored
+        ranges = []
+        if backfill_from is not None and backfill_from < first:
+            ranges.extend(StockService._pages(backfill_from, first - timedelta(days=1)))
+        ranges.extend(StockService._pages(min(last, end_date), end_date))
+        return ranges
+
+    @staticmethod
+    def _pages(start: date, end: date) -> List[Tuple[date, date]]:
+        page = timedelta(days=settings.ingest_backfill_page_days)
+        pages = []
+        while start <= end:
+            page_end = min(start + page - timedelta(days=1), end)
+            pages.append((start, page_end))
+            start = page_end + timedelta(days=1)
+        return pages
+
+    @staticmethod
+    def parse_bar(ticker: str, bar: dict) -> dict:
+        """
+        Convert a Polygon aggregate bar into a price row.
+
+        Prices are kept in integer cents (see ``CENT_COLUMNS``) and only
+        become decimals when written, so parsing large ingests does not
+        build five ``Decimal`` objects per bar.
+        """
+        return {
+            "stock_ticker": ticker,
+            "date": datetime.fromtimestamp(bar["t"] / 1000).date(),
+            "open_cents": float_to_cents(bar["o"]),
+            "high_cents": float_to_cents(bar["h"]),
+            "low_cents": float_to_cents(bar["l"]),
+            "close_cents": float_to_cents(bar["c"]),
+            "volume": round(bar["v"]),
+        }
+
+    @staticmethod
+    def price_values(row: dict) -> dict:
+        """``StockPrice`` price column values of a parsed row."""
+        return {
+            **{
+                column: cents_to_decimal(row[key])
+                for column, key in CENT_COLUMNS.items()
+            },
+            "volume": row["volume"],
+        }
+
+    @staticmethod
+    async def upsert_stock_prices(db: AsyncSession, rows: List[dict]) -> Dict[str, int]:
+        """
+        Insert or update many price rows with set-based statements.
 
-        # Polygon API endpoint for aggregates (bars)
-        url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/day/{start_date}/{end_date}"
+        On PostgreSQL every batch is a single ``INSERT ... ON CONFLICT DO
+        UPDATE`` against ``uq_stock_price_date``, reading the rows from one
+        array parameter per column and scaling cents to prices in SQL. Other
+        databases (SQLite in tests) look up the existing rows of a batch in
+        one query and then issue one executemany insert and one executemany
+        update.
 
-        params = {"apiKey": settings.polygon_api_key, "adjusted": "true", "sort": "asc"}
+        The caller is responsible for committing.
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            data = response.json()
+        Args:
+            db: Database session
+            rows: ``StockPrice`` column values, as built by ``parse_bar``
+
+        Returns:
+            Dictionary with the number of rows ``inserted`` and ``updated``
+        """
+        counts = {"inserted": 0, "updated": 0}
+        # Later bars for the same day win, as with row-by-row updates
+        unique_rows = list(
+            {(row["stock_ticker"], row["date"]): row for row in rows}.values()
+        )
+
+        for offset in range(0, len(unique_rows), UPSERT_BATCH_SIZE):
+            batch_end = offset + UPSERT_BATCH_SIZE
+            batch = unique_rows[offset:batch_end]
+            if db.get_bind().dialect.name == "postgresql":
+                inserted, updated = await StockService._upsert_batch_postgresql(
+                    db, batch
+                )
+            else:
+                inserted, updated = await StockService._upsert_batch_portable(db, batch)
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+
+        return counts
+
+    @staticmethod
+    async def _upsert_batch_postgresql(
+        db: AsyncSession, batch: List[dict]
+    ) -> Tuple[int, int]:
+        now = datetime.utcnow()
+        bars = (
+            func.unnest(
+                *(
+                    bindparam(key, [row[key] for row in batch], type_=ARRAY(type_))
+                    for key, type_ in BAR_ARRAYS
+                )
+            )
+            .table_valued(*(key for key, _ in BAR_ARRAYS))
+            .render_derived(name="bars")
+        )
+        rows = select(
+            func.gen_random_uuid(),
+            bars.c.stock_ticker,
+            bars.c.date,
+            # integer * numeric literal stays an exact numeric
+            *(bars.c[key] * literal_column("0.01") for key in CENT_COLUMNS.values()),
+            bars.c.volume,
+            literal(now, StockPrice.created_at.type),
+            literal(now, StockPrice.updated_at.type),
+        )
+
+        stmt = pg_insert(StockPrice).from_select(
+            ["id", "stock_ticker", "date", *PRICE_COLUMNS, "created_at", "updated_at"],
+            rows,
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_stock_price_date",
+            set_={
+                **{column: stmt.excluded[column] for column in PRICE_COLUMNS},
+                "updated_at": now,
+            },
+        ).returning(literal_column("xmax = 0").label("inserted"))
+
+        # xmax is 0 only for freshly inserted tuples
+        flags = (await db.execute(stmt)).scalars().all()
+        inserted = sum(1 for flag in flags if flag)
+        return inserted, len(flags) - inserted
+
+    @staticmethod
+    async def _upsert_batch_portable(
+        db: AsyncSession, batch: List[dict]
+    ) -> Tuple[int, int]:
+        existing = {
+            (ticker, price_date): price_id
+            for price_id, ticker, price_date in await db.execute(
+                select(StockPrice.id, StockPrice.stock_ticker, StockPrice.date).where(
+                    and_(
+                        StockPrice.stock_ticker.in_(
+                            {row["stock_ticker"] for row in batch}
+                        ),
+                        StockPrice.date.in_({row["date"] for row in batch}),
+                    )
+                )
+            )
+        }
 
-            # Polygon API returns "OK" for real-time data or "DELAYED" for delayed data
-            # Both are valid responses
-            if data.get("status") not in ["OK", "DELAYED"] or not data.get("results"):
-                return []
+        new_rows = []
+        changed_rows = []
+        now = datetime.utcnow()
+        for row in batch:
+            price_id = existing.get((row["stock_ticker"], row["date"]))
+            values = StockService.price_values(row)
+            if price_id is None:
+                new_rows.append(
+                    {"stock_ticker": row["stock_ticker"], "date": row["date"], **values}
+                )
+            else:
+                changed_rows.append(
+                    {
+                        "id": price_id,
+                        "date": row["date"],
+                        **values,
+                        "updated_at": now,
+                    }
+                )
 
-            return data["results"]
+        if new_rows:
+            await db.execute(insert(StockPrice), new_rows)
+        if changed_rows:
+            await db.execute(update(StockPrice), changed_rows)
+        return len(new_rows), len(changed_rows)
 
     @staticmethod
-    async def populate_stock_data(db: Session, ticker: str) -> Stock:
+    async def populate_stock_data(
+        db: AsyncSession, ticker: str, backfill_from: Optional[date] = None
+    ) -> Tuple[Stock, Dict[str, int]]:
         """
         Fetch and populate stock data from Polygon API.
 
+        Only the days since the ticker's watermark are fetched (see
+        ``ingestion_ranges``).
+
         Args:
             db: Database session
             ticker: Stock ticker symbol
+            backfill_from: Also fetch missing history back to this day
 
         Returns:
-            Stock object with populated prices
+            Stock object with populated prices, and the number of price
+            rows ``inserted`` and ``updated``
+        """
+        stored = (await StockService.get_price_ranges(db, [ticker])).get(ticker)
+
+        # Fetch price data from Polygon
+        price_data = []
+        for start, end in StockService.ingestion_ranges(
+            stored, date.today(), backfill_from
+        ):
+            price_data.extend(
+                await StockService.fetch_stock_data_from_polygon(ticker, start, end)
+            )
+
+        return await StockService.store_stock_data(db, ticker, price_data)
+
+    @staticmethod
+    async def store_stock_data(
+        db: AsyncSession,
+        ticker: str,
+        price_data: List[dict],
+        refresh_starts: Optional[Dict[str, Optional[date]]] = None,
+    ) -> Tuple[Stock, Dict[str, int]]:
+        """
+        Store already-fetched Polygon bars for a ticker.
+
+        Args:
+            db: Database session
+            ticker: Stock ticker symbol
+            price_data: Aggregate bars as returned by Polygon
+            refresh_starts: Record the ticker's valuation refresh start here
+                for the caller to pass to
+                ``ValuationService.refresh_for_tickers``, instead of
+                refreshing stored valuations now
+
+        Returns:
+            Stock object with populated prices, and the number of price
+            rows ``inserted`` and ``updated``
         """
         # Get or create stock
-        stock = db.query(Stock).filter(Stock.ticker == ticker).first()
+        stock = await db.get(Stock, ticker)
         if not stock:
             stock = Stock(ticker=ticker, name=ticker)  # Name can be updated later
             db.add(stock)
-            db.flush()
-
-        # Fetch price data from Polygon
-        price_data = await StockService.fetch_stock_data_from_polygon(ticker)
+            await db.flush()
 
         # Store price data
-        for bar in price_data:
-            price_date = datetime.fromtimestamp(bar["t"] / 1000).date()
+        rows = [StockService.parse_bar(ticker, bar) for bar in price_data]
+        stored = (await StockService.get_price_ranges(db, [ticker])).get(ticker)
+        counts = await StockService.store_price_rows(db, rows)
+
+        # Bring stored valuations of portfolios holding the ticker up to date
+        if rows:
+            from app.services.valuation_service import ValuationService
+
+            start = ValuationService.refresh_start(
+                stored, min(row["date"] for row in rows)
+            )
+            if refresh_starts is not None:
+                refresh_starts[ticker] = start
+            else:
+                await ValuationService.refresh_for_ticker(db, ticker, start)
+                await db.commit()
+
+        await db.refresh(stock)
+        return stock, counts
+
+    @staticmethod
+    async def store_price_rows(db: AsyncSession, rows: List[dict]) -> Dict[str, int]:
+        """
+        Upsert price rows of existing stocks and commit.
+
+        Every ticker written gets a new ``stocks.updated_at``, which
+        invalidates cached prices and returns in every process. Stored
+        portfolio valuations are left to the caller (see
+        ``ValuationService.refresh_for_tickers``).
+
+        Args:
+            db: Database session
+            rows: ``StockPrice`` column values, as built by ``parse_bar``
+
+        Returns:
+            Dictionary with the number of rows ``inserted`` and ``updated``
+        """
+        tickers = {row["stock_ticker"] for row in rows}
+        counts = await StockService.upsert_stock_prices(db, rows)
+        await db.execute(
+            update(Stock)
+            .where(Stock.ticker.in_(tickers))
+            .values(updated_at=datetime.utcnow())
+        )
+        await db.commit()
+        for ticker in tickers:
+            price_cache.invalidate(ticker)
+        return counts
+
+    @staticmethod
+    async def populate_fortune500_stocks(
+        db: AsyncSession, backfill_from: Optional[date] = None
+    ) -> Dict:
+        """
+        Populate data for all Fortune 500 stocks.
+
+        Returns:
+            Per-ticker ingestion summary (see ``IngestionService.ingest_tickers``)
+        """
+        from app.services.ingestion_service import IngestionService
+
+        return await IngestionService.ingest_tickers(
+            db, StockService.FORTUNE_500_TICKERS, backfill_from=backfill_from
+        )
 
-            # Check if price already exists
-            existing_price = (
-                db.query(StockPrice)
-                .filter(
+    @staticmethod
+    async def get_stock_version(db: AsyncSession, ticker: str) -> Optional[datetime]:
+        """Get a stock's ``updated_at`` without loading the row, if it exists."""
+        result = await db.execute(
+            select(Stock.updated_at).where(Stock.ticker == ticker)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_stock_prices(
+        db: AsyncSession, ticker: str, start_date: date, end_date: date
+    ) -> List[PricePoint]:
+        """
+        Get daily closes for a date range, oldest first.
+
+        Served from the per-worker price cache when it is enabled; otherwise
+        only the date and close columns are queried.
+        """
+        if price_cache.enabled:
+            history = (await price_cache.load(db, [ticker])).get(ticker)
+            return history.points(start_date, end_date) if history else []
+
+        result = await db.execute(
+            select(StockPrice.date, StockPrice.close_price)
+            .where(
+                and_(
+                    StockPrice.stock_ticker == ticker,
+                    StockPrice.date >= start_date,
+                    StockPrice.date <= end_date,
+                )
+            )
+            .order_by(StockPrice.date)
+        )
+        return [
+            PricePoint(price_date, close_price) for price_date, close_price in result
+        ]
+
+    @staticmethod
+    async def get_close_columns(
+        db: AsyncSession,
+        tickers: List[str],
+        start_date: date,
+        end_date: date,
+        carry_in: bool = False,
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get daily closes for many tickers as arrays, in one round trip.
+
+        Args:
+            db: Database session
+            tickers: Stock ticker symbols
+            start_date: Start of the date range (inclusive)
+            end_date: End of the date range (inclusive)
+            carry_in: Also include each ticker's last close before
+                ``start_date``, to carry forward into the range
+
+        Returns:
+            Mapping of ticker to (date ordinals, closes in dollars), oldest
+            first. Tickers without any price in the range are omitted.
+        """
+        if not tickers:
+            return {}
+
+        columns = {}
+        if price_cache.enabled:
+            histories = await price_cache.load(db, tickers)
+            for ticker, history in histories.items():
+                dates, cents = history.columns(start_date, end_date, carry_in)
+                if dates:
+                    columns[ticker] = (
+                        np.asarray(dates, dtype=np.int64),
+                        np.asarray(cents, dtype=np.float64) / 100,
+                    )
+            return columns
+
+        query = select(
+            StockPrice.stock_ticker, StockPrice.date, StockPrice.close_price
+        ).where(
+            and_(
+                StockPrice.stock_ticker.in_(set(tickers)),
+                StockPrice.date >= start_date,
+                StockPrice.date <= end_date,
+            )
+        )
+        if carry_in:
+            last_before = (
+                select(
+                    StockPrice.stock_ticker,
+                    func.max(StockPrice.date).label("last_date"),
+                )
+                .where(
                     and_(
-                        StockPrice.stock_ticker == ticker,
-                        StockPrice.date == price_date,
+                        StockPrice.stock_ticker.in_(set(tickers)),
+                        StockPrice.date < start_date,
                     )
                 )
-                .first()
+                .group_by(StockPrice.stock_ticker)
+                .subquery()
             )
+            carried = select(
+                StockPrice.stock_ticker, StockPrice.date, StockPrice.close_price
+            ).join(
+                last_before,
+                and_(
+                    StockPrice.stock_ticker == last_before.c.stock_ticker,
+                    StockPrice.date == last_before.c.last_date,
+                ),
+            )
+            query = union_all(carried, query)
 
-            if existing_price:
-                # Update existing price
-                existing_price.open_price = Decimal(str(bar["o"]))
-                existing_price.high_price = Decimal(str(bar["h"]))
-                existing_price.low_price = Decimal(str(bar["l"]))
-                existing_price.close_price = Decimal(str(bar["c"]))
-                existing_price.volume = Decimal(str(bar["v"]))
-            else:
-                # Create new price record
-                stock_price = StockPrice(
-                    stock_ticker=ticker,
-                    date=price_date,
-                    open_price=Decimal(str(bar["o"])),
-                    high_price=Decimal(str(bar["h"])),
-                    low_price=Decimal(str(bar["l"])),
-                    close_price=Decimal(str(bar["c"])),
-                    volume=Decimal(str(bar["v"])),
+        ordered = query.subquery()
+        result = await db.execute(
+            select(ordered).order_by(ordered.c.stock_ticker, ordered.c.date)
+        )
+        rows: Dict[str, Tuple[List[int], List[float]]] = {}
+        for ticker, price_date, close_price in result:
+            dates, closes = rows.setdefault(ticker, ([], []))
+            dates.append(price_date.toordinal())
+            closes.append(float(close_price))
+
+        return {
+            ticker: (np.asarray(dates, dtype=np.int64), np.asarray(closes))
+            for ticker, (dates, closes) in rows.items()
+        }
+
+    @staticmethod
+    async def get_boundary_cents(
+        db: AsyncSession, tickers: List[str], start_date: date, end_date: date
+    ) -> Dict[str, Tuple[int, int]]:
+        """
+        Get the first and last close in cents in a date range for many tickers.
+
+        Served from the per-worker price cache when it is enabled. Otherwise
+        each ticker's rows are ranked by date in both directions with window
+        functions, so the whole lookup is a single query that walks
+        ``uq_stock_price_date`` instead of one query per ticker.
+
+        Args:
+            db: Database session
+            tickers: Stock ticker symbols
+            start_date: Start of the date range (inclusive)
+            end_date: End of the date range (inclusive)
+
+        Returns:
+            Mapping of ticker to (first close, last close) in integer cents.
+            Tickers without any price in the range are omitted.
+        """
+        if not tickers:
+            return {}
+
+        if price_cache.enabled:
+            boundaries = {}
+            histories = await price_cache.load(db, tickers)
+            for ticker, history in histories.items():
+                prices = history.boundaries(start_date, end_date)
+                if prices is not None:
+                    boundaries[ticker] = prices
+            return boundaries
+
+        ranked = (
+            select(
+                StockPrice.stock_ticker,
+                StockPrice.close_price,
+                func.row_number()
+                .over(
+                    partition_by=StockPrice.stock_ticker,
+                    order_by=StockPrice.date.asc(),
+                )
+                .label("first_rank"),
+                func.row_number()
+                .over(
+                    partition_by=StockPrice.stock_ticker,
+                    order_by=StockPrice.date.desc(),
                 )
-                db.add(stock_price)
-
-        db.commit()
-        db.refresh(stock)
-        return stock
-
-    @staticmethod
-    async def populate_fortune500_stocks(db: Session) -> List[Stock]:
-        """Populate data for all Fortune 500 stocks."""
-        stocks = []
-        for ticker in StockService.FORTUNE_500_TICKERS:
-            try:
-                stock = await StockService.populate_stock_data(db, ticker)
-                stocks.append(stock)
-            except Exception as e:
-                print(f"Error fetching data for {ticker}: {e}")
-                continue
-
-        return stocks
-
-    @staticmethod
-    def get_stock_prices(
-        db: Session, ticker: str, start_date: date, end_date: date
-    ) -> List[StockPrice]:
-        """Get stock prices for a date range."""
-        return (
-            db.query(StockPrice)
-            .filter(
+                .label("last_rank"),
+            )
+            .where(
                 and_(
-                    StockPrice.stock_ticker == ticker,
+                    StockPrice.stock_ticker.in_(set(tickers)),
                     StockPrice.date >= start_date,
                     StockPrice.date <= end_date,
                 )
             )
-            .order_by(StockPrice.date)
-            .all()
+            .subquery()
+        )
+
+        result = await db.execute(
+            select(
+                ranked.c.stock_ticker,
+                ranked.c.close_price,
+                ranked.c.first_rank,
+                ranked.c.last_rank,
+            ).where(or_(ranked.c.first_rank == 1, ranked.c.last_rank == 1))
         )
+
+        boundaries: Dict[str, List[int]] = {}
+        for ticker, close_price, first_rank, last_rank in result:
+            cents = decimal_to_cents(close_price)
+            prices = boundaries.setdefault(ticker, [cents, cents])
+            if first_rank == 1:
+                prices[0] = cents
+            if last_rank == 1:
+                prices[1] = cents
+
+        return {ticker: (first, last) for ticker, (first, last) in boundaries.items()}
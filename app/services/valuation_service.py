@@ -0,0 +1,401 @@
+"""Materialized daily portfolio valuation."""
+
+import logging
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import and_, delete, exists, insert, or_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncSessionLocal
+from app.models import Portfolio, PortfolioDailyValue, PortfolioStock
+from app.services.stock_service import StockService
+
+logger = logging.getLogger(__name__)
+
+# Portfolios recomputed per round trip
+REFRESH_CHUNK_SIZE = 500
+
+
+class ValuationService:
+    """
+    Service maintaining the ``portfolio_daily_values`` table.
+
+    A portfolio's value on a trading day is the sum over its holdings of
+    quantity times the latest close on or before that day; holdings are
+    worth nothing before their first close. Rows exist for every day on
+    which any holding has a close.
+
+    Return calculations value each holding at its first and last close
+    inside the requested range instead. Rows flagged ``all_priced``, where
+    every priced holding has a close that day, are where the two agree, so
+    readers only use stored values bounded by such rows.
+    """
+
+    @staticmethod
+    async def refresh_portfolios(
+        db: AsyncSession,
+        portfolio_ids: List[UUID],
+        from_date: Optional[date] = None,
+    ) -> int:
+        """
+        Recompute stored values for some portfolios.
+
+        With ``from_date``, only prices from the last close before that day
+        on are loaded and only later days are rewritten. Portfolios without
+        any stored value before ``from_date`` are recomputed in full, so a
+        portfolio whose valuation was never written does not end up with
+        only its recent days. The caller is responsible for committing.
+
+        Args:
+            db: Database session
+            portfolio_ids: Portfolios to recompute
+            from_date: Only recompute days on or after this date
+                (default: the whole history)
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        portfolio_ids = list(dict.fromkeys(portfolio_ids))
+        for offset in range(0, len(portfolio_ids), REFRESH_CHUNK_SIZE):
+            chunk_end = offset + REFRESH_CHUNK_SIZE
+            chunk = portfolio_ids[offset:chunk_end]
+            if from_date is None:
+                written += await ValuationService._refresh_chunk(db, chunk, None)
+                continue
+
+            valued = await ValuationService._valued_before(db, chunk, from_date)
+            unvalued = [
+                portfolio_id for portfolio_id in chunk if portfolio_id not in valued
+            ]
+            if unvalued:
+                written += await ValuationService._refresh_chunk(db, unvalued, None)
+            if valued:
+                written += await ValuationService._refresh_chunk(
+                    db, list(valued), from_date
+                )
+        return written
+
+    @staticmethod
+    def refresh_start(
+        stored: Optional[Tuple[date, date]], first_new: date
+    ) -> Optional[date]:
+        """
+        First day whose stored values change when bars from ``first_new`` on
+        are written for a ticker whose stored prices span ``stored``.
+
+        The first bars of a ticker, or bars predating its earliest stored
+        close, extend its history backwards and change which earlier rows
+        are ``all_priced``, so the affected portfolios are recomputed in
+        full (None).
+        """
+        if stored is None or first_new < stored[0]:
+            return None
+        return first_new
+
+    @staticmethod
+    async def refresh_for_ticker(
+        db: AsyncSession, ticker: str, from_date: Optional[date]
+    ) -> int:
+        """
+        Recompute stored values after new bars landed for a ticker.
+
+        Only portfolios holding the ticker, and only days on or after
+        ``from_date`` (see ``refresh_start``), are recomputed. The caller is
+        responsible for committing.
+
+        Returns:
+            Number of rows written
+        """
+        return await ValuationService.refresh_for_tickers(db, {ticker: from_date})
+
+    @staticmethod
+    async def refresh_for_tickers(
+        db: AsyncSession, from_dates: Dict[str, Optional[date]]
+    ) -> int:
+        """
+        Recompute stored values after new bars landed for many tickers.
+
+        Like ``refresh_for_ticker``, with each affected portfolio recomputed
+        once, from the earliest ``from_dates`` entry of the tickers it holds.
+
+        Args:
+            db: Database session
+            from_dates: Ticker to the first day to recompute, or None for
+                the whole history
+
+        Returns:
+            Number of rows written
+        """
+        if not from_dates:
+            return 0
+        result = await db.execute(
+            select(PortfolioStock.portfolio_id, PortfolioStock.stock_ticker).where(
+                PortfolioStock.stock_ticker.in_(list(from_dates))
+            )
+        )
+        starts: Dict[UUID, Optional[date]] = {}
+        for portfolio_id, ticker in result:
+            start = from_dates[ticker]
+            if portfolio_id in starts:
+                current = starts[portfolio_id]
+                start = None if None in (current, start) else min(current, start)
+            starts[portfolio_id] = start
+
+        groups: Dict[Optional[date], List[UUID]] = {}
+        for portfolio_id, start in starts.items():
+            groups.setdefault(start, []).append(portfolio_id)
+        written = 0
+        for start, portfolio_ids in groups.items():
+            written += await ValuationService.refresh_portfolios(
+                db, portfolio_ids, start
+            )
+        return written
+
+    @staticmethod
+    async def clear_portfolios(db: AsyncSession, portfolio_ids: List[UUID]) -> None:
+        """
+        Drop the stored values of portfolios whose holdings changed.
+
+        Reads compute their values from prices until ``refresh_later`` has
+        stored them again. The caller is responsible for committing.
+        """
+        await db.execute(
+            delete(PortfolioDailyValue).where(
+                PortfolioDailyValue.portfolio_id.in_(portfolio_ids)
+            )
+        )
+
+    @staticmethod
+    async def refresh_later(
+        portfolio_ids: List[UUID],
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ) -> None:
+        """
+        Recompute the stored values of portfolios on a session of their own.
+
+        Run after the write that changed the portfolios is committed, e.g. as
+        a background task of the request. Failures are logged; reads keep
+        computing the values from prices until the next refresh.
+        """
+        try:
+            async with session_factory() as db:
+                await ValuationService.refresh_portfolios(db, portfolio_ids)
+                await db.commit()
+        except Exception:
+            logger.exception(
+                "Could not refresh valuations of %d portfolios", len(portfolio_ids)
+            )
+
+    @staticmethod
+    async def rebuild_all(db: AsyncSession) -> int:
+        """
+        Recompute every portfolio's full history and commit.
+
+        Returns:
+            Number of rows written
+        """
+        result = await db.execute(select(Portfolio.id))
+        written = await ValuationService.refresh_portfolios(db, list(result.scalars()))
+        await db.commit()
+        return written
+
+    @staticmethod
+    async def get_boundary_values(
+        db: AsyncSession, portfolio_ids: List[UUID], start_date: date, end_date: date
+    ) -> Dict[UUID, Tuple[float, float]]:
+        """
+        Get the first and last stored value in a date range per portfolio.
+
+        Reads at most two rows per portfolio. Both rows must be
+        ``all_priced`` for the values to equal the sums of each holding's
+        first and last close in the range.
+
+        Returns:
+            Mapping of portfolio ID to (first value, last value). Portfolios
+            without stored values in the range, or whose first or last row
+            in it is not ``all_priced``, are omitted.
+        """
+        if not portfolio_ids:
+            return {}
+
+        in_range = and_(
+            PortfolioDailyValue.portfolio_id.in_(portfolio_ids),
+            PortfolioDailyValue.date >= start_date,
+            PortfolioDailyValue.date <= end_date,
+        )
+        bounds = (
+            select(
+                PortfolioDailyValue.portfolio_id,
+                func.min(PortfolioDailyValue.date).label("first_date"),
+                func.max(PortfolioDailyValue.date).label("last_date"),
+            )
+            .where(in_range)
+            .group_by(PortfolioDailyValue.portfolio_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                PortfolioDailyValue.portfolio_id,
+                PortfolioDailyValue.date,
+                PortfolioDailyValue.market_value,
+                PortfolioDailyValue.all_priced,
+                bounds.c.first_date,
+            ).join(
+                bounds,
+                and_(
+                    PortfolioDailyValue.portfolio_id == bounds.c.portfolio_id,
+                    or_(
+                        PortfolioDailyValue.date == bounds.c.first_date,
+                        PortfolioDailyValue.date == bounds.c.last_date,
+                    ),
+                ),
+            )
+        )
+
+        boundaries: Dict[UUID, List[float]] = {}
+        incomplete: Set[UUID] = set()
+        for portfolio_id, value_date, market_value, all_priced, first_date in result:
+            values = boundaries.setdefault(
+                portfolio_id, [float(market_value), float(market_value)]
+            )
+            values[0 if value_date == first_date else 1] = float(market_value)
+            if not all_priced:
+                incomplete.add(portfolio_id)
+        return {
+            portfolio_id: (first, last)
+            for portfolio_id, (first, last) in boundaries.items()
+            if portfolio_id not in incomplete
+        }
+
+    @staticmethod
+    async def get_values(
+        db: AsyncSession, portfolio_id: UUID, start_date: date, end_date: date
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get stored values in a date range.
+
+        From the first ``all_priced`` row on, every holding has a close in
+        the range, so stored values equal closes carried forward within the
+        range. Without such a first row nothing is returned.
+
+        Returns:
+            (date ordinals, values in dollars), oldest first; empty when the
+            range has no stored values or its first row is not ``all_priced``
+        """
+        result = await db.execute(
+            select(
+                PortfolioDailyValue.date,
+                PortfolioDailyValue.market_value,
+                PortfolioDailyValue.all_priced,
+            )
+            .where(
+                and_(
+                    PortfolioDailyValue.portfolio_id == portfolio_id,
+                    PortfolioDailyValue.date >= start_date,
+                    PortfolioDailyValue.date <= end_date,
+                )
+            )
+            .order_by(PortfolioDailyValue.date)
+        )
+        rows = result.all()
+        if rows and not rows[0][2]:
+            rows = []
+        return (
+            np.fromiter((row[0].toordinal() for row in rows), np.int64, len(rows)),
+            np.fromiter((row[1] for row in rows), np.float64, len(rows)),
+        )
+
+    @staticmethod
+    async def _valued_before(
+        db: AsyncSession, portfolio_ids: List[UUID], before: date
+    ) -> Set[UUID]:
+        """Portfolios with at least one stored value before a day."""
+        result = await db.execute(
+            select(Portfolio.id).where(
+                and_(
+                    Portfolio.id.in_(portfolio_ids),
+                    exists().where(
+                        and_(
+                            PortfolioDailyValue.portfolio_id == Portfolio.id,
+                            PortfolioDailyValue.date < before,
+                        )
+                    ),
+                )
+            )
+        )
+        return set(result.scalars())
+
+    @staticmethod
+    async def _refresh_chunk(
+        db: AsyncSession, portfolio_ids: List[UUID], from_date: Optional[date]
+    ) -> int:
+        holdings_result = await db.execute(
+            select(
+                PortfolioStock.portfolio_id,
+                PortfolioStock.stock_ticker,
+                PortfolioStock.quantity,
+            ).where(PortfolioStock.portfolio_id.in_(portfolio_ids))
+        )
+        holdings: Dict[UUID, List[Tuple[str, int]]] = {}
+        for portfolio_id, ticker, quantity in holdings_result:
+            holdings.setdefault(portfolio_id, []).append((ticker, quantity))
+
+        # Closes from from_date on, plus the latest one before it to carry in
+        columns = await StockService.get_close_columns(
+            db,
+            list({ticker for rows in holdings.values() for ticker, _ in rows}),
+            from_date or date.min,
+            date.max,
+            carry_in=True,
+        )
+
+        from_ordinal = from_date.toordinal() if from_date else 0
+        now = datetime.utcnow()
+        rows = []
+        for portfolio_id in portfolio_ids:
+            priced = [
+                (columns[ticker], quantity)
+                for ticker, quantity in holdings.get(portfolio_id, [])
+                if ticker in columns
+            ]
+            if not priced:
+                continue
+
+            days = np.unique(np.concatenate([dates for (dates, _), _ in priced]))
+            days = days[days >= from_ordinal]
+            values = np.zeros(len(days))
+            closed = np.zeros(len(days), dtype=np.int64)
+            for (dates, closes), quantity in priced:
+                # Index of the latest close on or before each day; -1 before
+                # the first close, where the holding is worth nothing
+                latest = np.searchsorted(dates, days, side="right") - 1
+                prices = np.where(latest >= 0, closes[np.maximum(latest, 0)], 0.0)
+                values += prices * quantity
+                closed += (latest >= 0) & (dates[np.maximum(latest, 0)] == days)
+            all_priced = closed == len(priced)
+
+            rows.extend(
+                {
+                    "portfolio_id": portfolio_id,
+                    "date": date.fromordinal(day),
+                    "market_value": round(value, 2),
+                    "all_priced": complete,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for day, value, complete in zip(
+                    days.tolist(), values.tolist(), all_priced.tolist()
+                )
+            )
+
+        stale = PortfolioDailyValue.portfolio_id.in_(portfolio_ids)
+        if from_date:
+            stale = and_(stale, PortfolioDailyValue.date >= from_date)
+        await db.execute(delete(PortfolioDailyValue).where(stale))
+        if rows:
+            await db.execute(insert(PortfolioDailyValue), rows)
+        return len(rows)
@@ -0,0 +1,149 @@
+"""The ``Decimal`` price code paths that integer cents replaced.
+
+``benchmarks.numeric`` times these against the current code. They are the
+previous ``StockService.parse_bar``, the price cache branch of
+``StockService.get_boundary_prices`` with ``TickerPrices.boundaries``, and
+``PortfolioService._summarize_returns``, copied unchanged except that
+methods became functions and the price cache lookup takes the loaded
+histories instead of a session.
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from app.services.portfolio_service import PortfolioService
+from app.services.price_cache import TickerPrices, cents_to_decimal
+
+
+def parse_bar(ticker: str, bar: dict) -> dict:
+    """Convert a Polygon aggregate bar into ``StockPrice`` column values."""
+    return {
+        "stock_ticker": ticker,
+        "date": datetime.fromtimestamp(bar["t"] / 1000).date(),
+        "open_price": Decimal(str(bar["o"])),
+        "high_price": Decimal(str(bar["h"])),
+        "low_price": Decimal(str(bar["l"])),
+        "close_price": Decimal(str(bar["c"])),
+        "volume": Decimal(str(bar["v"])),
+    }
+
+
+def boundaries(
+    history: TickerPrices, start_date: date, end_date: date
+) -> Optional[Tuple[Decimal, Decimal]]:
+    """First and last close inside a date range, if any."""
+    lo, hi = history.index_range(start_date, end_date)
+    if lo == hi:
+        return None
+    return cents_to_decimal(history.closes[lo]), cents_to_decimal(
+        history.closes[hi - 1]
+    )
+
+
+def get_boundary_prices(
+    histories: Dict[str, TickerPrices], start_date: date, end_date: date
+) -> Dict[str, Tuple[Decimal, Decimal]]:
+    """First and last close in a date range per ticker, from cached histories."""
+    boundary_prices = {}
+    for ticker, history in histories.items():
+        prices = boundaries(history, start_date, end_date)
+        if prices is not None:
+            boundary_prices[ticker] = prices
+    return boundary_prices
+
+
+def summarize_returns(
+    customer_ids: List[UUID],
+    holdings: List[Tuple[int, str, int]],
+    boundary_prices: Dict[str, Tuple[Decimal, Decimal]],
+    start_date: date,
+    end_date: date,
+) -> List[Dict]:
+    """
+    Compute holding and portfolio returns for many portfolios at once.
+
+    Args:
+        customer_ids: Customer UUIDs, one per portfolio
+        holdings: (index into ``customer_ids``, ticker, quantity) rows
+        boundary_prices: First and last close per ticker
+        start_date: Start date for calculation
+        end_date: End date for calculation
+
+    Returns:
+        Return details per customer, in ``customer_ids`` order
+    """
+    # Skip stocks with no price data
+    priced = [holding for holding in holdings if holding[1] in boundary_prices]
+    count = len(priced)
+
+    owners = np.fromiter((owner for owner, _, _ in priced), np.int64, count)
+    quantities = np.fromiter((qty for _, _, qty in priced), np.float64, count)
+    start_prices = np.fromiter(
+        (boundary_prices[ticker][0] for _, ticker, _ in priced), np.float64, count
+    )
+    end_prices = np.fromiter(
+        (boundary_prices[ticker][1] for _, ticker, _ in priced), np.float64, count
+    )
+
+    # Per-holding values and returns
+    start_values = start_prices * quantities
+    end_values = end_prices * quantities
+    stock_returns = end_values - start_values
+    stock_return_pcts = PortfolioService._percent_change(start_prices, end_prices)
+
+    # Per-portfolio totals
+    total_start_values = np.bincount(
+        owners, weights=start_values, minlength=len(customer_ids)
+    ).astype(np.float64)
+    total_end_values = np.bincount(
+        owners, weights=end_values, minlength=len(customer_ids)
+    ).astype(np.float64)
+    total_returns = total_end_values - total_start_values
+    return_percentages = PortfolioService._percent_change(
+        total_start_values, total_end_values
+    )
+
+    results = [
+        {
+            "customer_id": str(customer_id),
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "total_return": total_return,
+            "return_percentage": return_percentage,
+            "holdings": [],
+        }
+        for customer_id, total_return, return_percentage in zip(
+            customer_ids, total_returns.tolist(), return_percentages.tolist()
+        )
+    ]
+
+    for (owner, ticker, quantity), columns in zip(
+        priced,
+        zip(
+            start_prices.tolist(),
+            end_prices.tolist(),
+            start_values.tolist(),
+            end_values.tolist(),
+            stock_returns.tolist(),
+            stock_return_pcts.tolist(),
+        ),
+    ):
+        start_price, end_price, start_value, end_value, stock_return, pct = columns
+        results[owner]["holdings"].append(
+            {
+                "ticker": ticker,
+                "quantity": quantity,
+                "start_price": start_price,
+                "end_price": end_price,
+                "start_value": start_value,
+                "end_value": end_value,
+                "return": stock_return,
+                "return_percentage": pct,
+            }
+        )
+
+    return results
@@ -0,0 +1,99 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare before.json after.json --fail-above 10
+
+Prints the change of every metric per case and exits non-zero when any
+case's p95 latency regressed by more than ``--fail-above`` percent.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+# Metrics shown per case, and whether a higher value is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_per_s": True,
+    "peak_memory_bytes": False,
+}
+
+
+def percent_change(before: float, after: float) -> Optional[float]:
+    """Relative change in percent, or None when there is no baseline."""
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before: Dict, after: Dict) -> List[Dict]:
+    """Per-case, per-metric changes for cases present in both reports."""
+    rows = []
+    for case, old in before["results"].items():
+        new = after["results"].get(case)
+        if new is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in old or metric not in new:
+                continue
+            change = percent_change(old[metric], new[metric])
+            rows.append(
+                {
+                    "case": case,
+                    "metric": metric,
+                    "before": old[metric],
+                    "after": new[metric],
+                    "change_pct": change,
+                    "regression_pct": (
+                        None
+                        if change is None
+                        else (-change if higher_is_better else change)
+                    ),
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--fail-above",
+        type=float,
+        default=None,
+        help="Exit with status 1 if any p95 regressed by more than this percent",
+    )
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    rows = compare(before, after)
+    for row in rows:
+        change = "n/a" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        print(
+            f"{row['case']:<45} {row['metric']:<18} "
+            f"{row['before']:>14.2f} {row['after']:>14.2f} {change:>9}"
+        )
+
+    if args.fail_above is not None:
+        regressed = [
+            row
+            for row in rows
+            if row["metric"] == "p95_ms"
+            and row["regression_pct"] is not None
+            and row["regression_pct"] > args.fail_above
+        ]
+        if regressed:
+            cases = ", ".join(row["case"] for row in regressed)
+            print(f"p95 regressed by more than {args.fail_above}%: {cases}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Seeded synthetic data for benchmarks.
+
+Generates customers, portfolios, holdings, stocks and daily closes, and
+loads them into the database configured by ``DATABASE_URL``:
+
+    python -m benchmarks.data --customers 1000 --tickers 100 --days 250 --reset
+
+The same arguments and seed always produce the same data.
+"""
+
+import argparse
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.db.partitions import create_stock_price_partitions
+from app.models import Customer, Portfolio, PortfolioStock, Stock, StockPrice
+from app.models.base import Base
+
+# Rows per executemany round trip
+INSERT_CHUNK_SIZE = 5000
+# Last day of generated price history
+END_DATE = date(2024, 12, 31)
+
+
+@dataclass
+class Dataset:
+    """Generated rows, keyed by table."""
+
+    stocks: List[Dict] = field(default_factory=list)
+    prices: List[Dict] = field(default_factory=list)
+    customers: List[Dict] = field(default_factory=list)
+    portfolios: List[Dict] = field(default_factory=list)
+    holdings: List[Dict] = field(default_factory=list)
+
+    @property
+    def tables(self) -> Dict[str, List[Dict]]:
+        """Rows in foreign-key order."""
+        return {
+            Stock.__tablename__: self.stocks,
+            StockPrice.__tablename__: self.prices,
+            Customer.__tablename__: self.customers,
+            Portfolio.__tablename__: self.portfolios,
+            PortfolioStock.__tablename__: self.holdings,
+        }
+
+
+def ticker_symbols(count: int) -> List[str]:
+    """Deterministic fake ticker symbols: T0001, T0002, ..."""
+    return [f"T{index:04d}" for index in range(1, count + 1)]
+
+
+def trading_days(days: int, end: date = END_DATE) -> List[date]:
+    """The last ``days`` weekdays up to ``end``, oldest first."""
+    result = []
+    day = end
+    while len(result) < days:
+        if day.weekday() < 5:
+            result.append(day)
+        day -= timedelta(days=1)
+    return result[::-1]
+
+
+def generate(
+    customers: int,
+    tickers: int,
+    days: int,
+    seed: int = 42,
+    max_holdings: int = 10,
+) -> Dataset:
+    """
+    Generate a dataset.
+
+    Closes follow a geometric random walk per ticker; every customer holds
+    between 1 and ``max_holdings`` distinct tickers.
+    """
+    rng = np.random.default_rng(seed)
+
+    def next_uuid() -> uuid.UUID:
+        # Drawn from the seeded generator so reruns produce identical keys
+        return uuid.UUID(bytes=rng.bytes(16), version=4)
+
+    now = datetime(2025, 1, 1)
+    timestamps = {"created_at": now, "updated_at": now}
+    dataset = Dataset()
+    symbols = ticker_symbols(tickers)
+    calendar = trading_days(days)
+
+    for symbol in symbols:
+        dataset.stocks.append({"ticker": symbol, "name": f"{symbol} Inc", **timestamps})
+        start_price = rng.uniform(10, 500)
+        walk = np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(calendar))))
+        closes = np.round(start_price * walk, 2)
+        dataset.prices.extend(
+            {
+                "id": next_uuid(),
+                "stock_ticker": symbol,
+                "date": day,
+                "close_price": Decimal(f"{close:.2f}"),
+                "volume": Decimal(int(rng.integers(1e5, 1e7))),
+                **timestamps,
+            }
+            for day, close in zip(calendar, closes.tolist())
+        )
+
+    for index in range(customers):
+        customer_id, portfolio_id = next_uuid(), next_uuid()
+        dataset.customers.append(
+            {
+                "id": customer_id,
+                "name": f"Customer {index:06d}",
+                "address": f"{index} Benchmark Ave",
+                # Distinct creation times give keyset pagination a stable order
+                "created_at": now + timedelta(seconds=index),
+                "updated_at": now,
+            }
+        )
+        dataset.portfolios.append(
+            {"id": portfolio_id, "customer_id": customer_id, **timestamps}
+        )
+        held = rng.choice(
+            len(symbols),
+            size=int(rng.integers(1, min(max_holdings, len(symbols)) + 1)),
+            replace=False,
+        )
+        dataset.holdings.extend(
+            {
+                "id": next_uuid(),
+                "portfolio_id": portfolio_id,
+                "stock_ticker": symbols[column],
+                "quantity": int(rng.integers(1, 500)),
+                **timestamps,
+            }
+            for column in held.tolist()
+        )
+
+    return dataset
+
+
+def load(engine: Engine, dataset: Dataset, reset: bool = False) -> Dict[str, int]:
+    """
+    Insert a dataset with chunked executemany statements.
+
+    Args:
+        engine: Target engine
+        dataset: Rows to insert
+        reset: Drop and recreate every table first
+
+    Returns:
+        Rows inserted per table
+    """
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    counts = {}
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql" and dataset.prices:
+            days = [row["date"] for row in dataset.prices]
+            create_stock_price_partitions(conn, min(days), max(days))
+        for name, rows in dataset.tables.items():
+            table = Base.metadata.tables[name]
+            for chunk in _chunks(rows, INSERT_CHUNK_SIZE):
+                conn.execute(insert(table), chunk)
+            counts[name] = len(rows)
+    return counts
+
+
+def _chunks(rows: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for offset in range(0, len(rows), size):
+        end = offset + size
+        yield rows[offset:end]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--reset", action="store_true", help="Drop and recreate all tables first"
+    )
+    args = parser.parse_args()
+
+    from app.db import engine
+
+    dataset = generate(args.customers, args.tickers, args.days, args.seed)
+    for table, count in load(engine, dataset, reset=args.reset).items():
+        print(f"{table}: {count} rows")
+    print(f"portfolio_daily_values: {asyncio.run(rebuild_valuations())} rows")
+
+
+async def rebuild_valuations() -> int:
+    """Materialize daily values for the loaded portfolios."""
+    from app.db import AsyncSessionLocal, async_engine
+    from app.services.valuation_service import ValuationService
+
+    async with AsyncSessionLocal() as db:
+        written = await ValuationService.rebuild_all(db)
+    await async_engine.dispose()
+    return written
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Local stand-in for the Polygon aggregates API.
+
+Serves deterministic synthetic daily bars, or bars recorded by the
+application's Polygon response cache, per ticker and grouped by day, with
+configurable latency, failures, ``DELAYED`` responses and rate limiting:
+
+    python -m benchmarks.fake_polygon --port 8900 --latency-ms 50 \\
+        --error-rate 0.02 --rate-limit 100
+
+Point the application at it with ``POLYGON_BASE_URL=http://localhost:8900``
+and ``POLYGON_CACHE_DIR=`` so responses are not cached on disk.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.services.stock_service import StockService
+from benchmarks.data import ticker_symbols
+
+
+def default_universe() -> List[str]:
+    """The application's Fortune 500 tickers plus the symbols of benchmarks.data."""
+    return sorted(set(StockService.FORTUNE_500_TICKERS) | set(ticker_symbols(500)))
+
+
+@dataclass
+class FakePolygonConfig:
+    """Behaviour of the fake server."""
+
+    latency_ms: float = 0.0  # Mean added latency per request
+    latency_jitter_ms: float = 0.0  # Uniform jitter around the mean
+    error_rate: float = 0.0  # Share of requests answered with a 5xx
+    delayed_rate: float = 0.0  # Share of successful responses marked DELAYED
+    rate_limit: float = 0.0  # Requests per second before answering 429 (0: off)
+    recordings_dir: Optional[str] = None  # Polygon cache directory to replay
+    # Tickers in grouped daily responses, besides recorded ones
+    universe: List[str] = field(default_factory=default_universe)
+    seed: int = 0
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to one second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def synthetic_bars(ticker: str, start: date, end: date) -> List[dict]:
+    """
+    Daily bars for weekdays in a range.
+
+    A ticker's close on a given day is always the same, so repeated and
+    overlapping requests agree with each other.
+    """
+    bars = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            rng = random.Random(zlib.crc32(f"{ticker}:{day}".encode()))
+            base = 20 + zlib.crc32(ticker.encode()) % 480
+            close = round(base * (1 + 0.1 * rng.uniform(-1, 1)), 2)
+            timestamp = datetime(day.year, day.month, day.day, 12).timestamp()
+            bars.append(
+                {
+                    "t": int(timestamp * 1000),
+                    "o": round(close * rng.uniform(0.98, 1.02), 2),
+                    "h": round(close * 1.03, 2),
+                    "l": round(close * 0.97, 2),
+                    "c": close,
+                    "v": rng.randint(100_000, 10_000_000),
+                }
+            )
+        day += timedelta(days=1)
+    return bars
+
+
+def load_recordings(directory: str) -> Dict[str, List[dict]]:
+    """Merge bars recorded by ``PolygonClient``'s disk cache, per ticker."""
+    recorded: Dict[str, Dict[int, dict]] = {}
+    for path in glob.glob(os.path.join(directory, "aggs", "*.json")):
+        ticker = os.path.basename(path).rsplit("_", 2)[0]
+        with open(path) as f:
+            for bar in json.load(f):
+                recorded.setdefault(ticker, {})[bar["t"]] = bar
+    return {
+        ticker: [bars[t] for t in sorted(bars)] for ticker, bars in recorded.items()
+    }
+
+
+def create_app(config: FakePolygonConfig) -> FastAPI:
+    """Build the fake Polygon application."""
+    app = FastAPI(title="Fake Polygon")
+    rng = random.Random(config.seed)
+    bucket = TokenBucket(config.rate_limit) if config.rate_limit > 0 else None
+    recordings = load_recordings(config.recordings_dir) if config.recordings_dir else {}
+    stats = config.stats
+
+    def count(outcome: str) -> None:
+        stats[outcome] = stats.get(outcome, 0) + 1
+
+    async def simulate() -> Optional[JSONResponse]:
+        """Apply latency and failures; return an error response, if any."""
+        if config.latency_ms or config.latency_jitter_ms:
+            jitter = rng.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+            await asyncio.sleep(max(config.latency_ms + jitter, 0) / 1000)
+        if bucket is not None and not bucket.take():
+            count("rate_limited")
+            return JSONResponse(
+                {"status": "ERROR", "error": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if rng.random() < config.error_rate:
+            count("errors")
+            return JSONResponse(
+                {"status": "ERROR", "error": "Simulated failure"},
+                status_code=rng.choice([500, 502, 503]),
+            )
+        return None
+
+    def respond(results: List[dict], **extra) -> dict:
+        delayed = rng.random() < config.delayed_rate
+        count("delayed" if delayed else "ok")
+        return {
+            "status": "DELAYED" if delayed else "OK",
+            "resultsCount": len(results),
+            "results": results,
+            **extra,
+        }
+
+    @app.get("/v2/aggs/ticker/{ticker}/range/{multiplier}/{timespan}/{start}/{end}")
+    async def aggregates(
+        ticker: str, multiplier: int, timespan: str, start: date, end: date
+    ):
+        error = await simulate()
+        if error is not None:
+            return error
+        if ticker in recordings:
+            low = datetime(start.year, start.month, start.day).timestamp() * 1000
+            high = datetime(end.year, end.month, end.day, 23, 59).timestamp() * 1000
+            results = [bar for bar in recordings[ticker] if low <= bar["t"] <= high]
+        else:
+            results = synthetic_bars(ticker, start, end)
+        return respond(results, ticker=ticker, adjusted=True)
+
+    @app.get("/v2/aggs/grouped/locale/us/market/stocks/{day}")
+    async def grouped_daily(day: date):
+        error = await simulate()
+        if error is not None:
+            return error
+        low = datetime(day.year, day.month, day.day).timestamp() * 1000
+        high = low + 86_400_000
+        results = []
+        for ticker in sorted(set(config.universe) | set(recordings)):
+            if ticker in recordings:
+                bars = [bar for bar in recordings[ticker] if low <= bar["t"] < high]
+            else:
+                bars = synthetic_bars(ticker, day, day)
+            results.extend({"T": ticker, **bar} for bar in bars)
+        return respond(results, adjusted=True)
+
+    @app.get("/stats")
+    async def get_stats():
+        """Responses served so far, by outcome."""
+        return stats
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--delayed-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Requests per second (0: off)"
+    )
+    parser.add_argument("--recordings-dir", help="Polygon cache directory to replay")
+    parser.add_argument(
+        "--universe",
+        help="Comma-separated tickers in grouped daily responses "
+        "(default: the application's Fortune 500 tickers and T0001-T0500, "
+        "as generated by benchmarks.data)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakePolygonConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        delayed_rate=args.delayed_rate,
+        rate_limit=args.rate_limit,
+        recordings_dir=args.recordings_dir,
+        seed=args.seed,
+    )
+    if args.universe:
+        config.universe = args.universe.split(",")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""Drive a running app with a weighted mix of realistic requests.
+
+Seed the database first (see ``benchmarks.data``) and start the app, then
+step through request rates or concurrency levels to find where latency and
+errors take off:
+
+    python -m benchmarks.load --base-url http://localhost:8000 \\
+        --rate 50,100,200,400 --duration 30 --profile mixed --output load.json
+
+    python -m benchmarks.load --concurrency 1,8,32,128 --duration 30
+
+Each stage reports per-route request counts, error rates and latency
+percentiles. Open-loop (``--rate``) latencies are measured from each
+request's scheduled start, so queueing in the client counts against the
+app rather than hiding an overload.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+API_PREFIX = "/api/v1"
+# Date range used by return calculations; matches the seeded price history
+RETURNS_START = date(2024, 7, 1)
+RETURNS_END = date(2024, 12, 31)
+# Customers sampled from the seeded data at startup
+SAMPLE_CUSTOMERS = 1000
+PAGE_SIZE = 100
+BATCH_SIZE = 20
+
+# Relative weights of each operation, per workload profile
+PROFILES: Dict[str, Dict[str, int]] = {
+    "mixed": {
+        "customers.get": 25,
+        "customers.list": 10,
+        "customers.create": 5,
+        "customers.update": 3,
+        "customers.replace": 2,
+        "customers.delete": 2,
+        "portfolio.returns": 25,
+        "portfolio.timeseries": 5,
+        "portfolio.returns_batch": 3,
+        "stocks.get": 20,
+    },
+    "read-heavy": {
+        "customers.get": 35,
+        "customers.list": 15,
+        "portfolio.returns": 30,
+        "stocks.get": 20,
+    },
+    "write-heavy": {
+        "customers.get": 10,
+        "customers.create": 30,
+        "customers.update": 25,
+        "customers.replace": 15,
+        "customers.delete": 10,
+        "portfolio.returns": 10,
+    },
+    "analytics": {
+        "portfolio.returns": 50,
+        "portfolio.timeseries": 30,
+        "portfolio.returns_batch": 20,
+    },
+}
+
+
+@dataclass
+class Workload:
+    """Seeded identifiers the operations draw from, plus state they build up."""
+
+    customer_ids: List[str]
+    tickers: List[str]
+    rng: random.Random
+    created: List[str] = field(default_factory=list)
+    # Current holdings of each created customer, by ticker
+    holdings_of: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    cursor: Optional[str] = None
+
+    def customer(self) -> str:
+        return self.rng.choice(self.customer_ids)
+
+    def holdings(self) -> List[dict]:
+        chosen = self.rng.sample(self.tickers, min(len(self.tickers), 3))
+        return [{"ticker": t, "quantity": self.rng.randint(1, 500)} for t in chosen]
+
+
+Operation = Callable[[httpx.AsyncClient, Workload], Awaitable[httpx.Response]]
+
+
+async def get_customer(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    return await client.get(f"{API_PREFIX}/customers/{work.customer()}")
+
+
+async def list_customers(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    # Walk the keyset pages, starting over after the last one
+    params = {"limit": PAGE_SIZE}
+    if work.cursor:
+        params["cursor"] = work.cursor
+    response = await client.get(f"{API_PREFIX}/customers/", params=params)
+    work.cursor = response.headers.get("X-Next-Cursor")
+    return response
+
+
+async def create_customer(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    response = await client.post(
+        f"{API_PREFIX}/customers/",
+        json={
+            "name": f"Load {work.rng.randrange(10**9)}",
+            "address": "1 Load Test Way",
+            "stocks": work.holdings(),
+        },
+    )
+    if response.status_code == 201:
+        customer = response.json()
+        work.created.append(customer["id"])
+        work.holdings_of[customer["id"]] = {
+            holding["stock_ticker"]: holding["quantity"]
+            for holding in customer["portfolio_stocks"]
+        }
+    return response
+
+
+async def update_customer(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    # Only customers created by this run are modified, keeping the seeded
+    # data comparable between runs
+    if not work.created:
+        return await create_customer(client, work)
+    customer_id = work.rng.choice(work.created)
+    holding = work.holdings()[0]
+    response = await client.patch(
+        f"{API_PREFIX}/customers/{customer_id}/holdings/{holding['ticker']}",
+        json={"quantity": holding["quantity"]},
+    )
+    if response.status_code == 200:
+        work.holdings_of[customer_id][holding["ticker"]] = holding["quantity"]
+    return response
+
+
+async def replace_holdings(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    # PUT the full holdings list with one quantity changed and one holding
+    # swapped, so the server diffs mostly unchanged rows
+    if not work.created:
+        return await create_customer(client, work)
+    customer_id = work.rng.choice(work.created)
+    holdings = dict(work.holdings_of[customer_id])
+    if holdings:
+        holdings.pop(work.rng.choice(sorted(holdings)))
+    if holdings:
+        holdings[work.rng.choice(sorted(holdings))] = work.rng.randint(1, 500)
+    for holding in work.holdings():
+        if holding["ticker"] not in holdings:
+            holdings[holding["ticker"]] = holding["quantity"]
+            break
+    response = await client.put(
+        f"{API_PREFIX}/customers/{customer_id}",
+        json={
+            "stocks": [
+                {"ticker": ticker, "quantity": quantity}
+                for ticker, quantity in holdings.items()
+            ]
+        },
+    )
+    if response.status_code == 200:
+        work.holdings_of[customer_id] = holdings
+    return response
+
+
+async def delete_customer(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    if not work.created:
+        return await create_customer(client, work)
+    customer_id = work.created.pop(work.rng.randrange(len(work.created)))
+    work.holdings_of.pop(customer_id, None)
+    return await client.delete(f"{API_PREFIX}/customers/{customer_id}")
+
+
+async def portfolio_returns(
+    client: httpx.AsyncClient, work: Workload
+) -> httpx.Response:
+    return await client.get(
+        f"{API_PREFIX}/portfolio/{work.customer()}/returns",
+        params={"start_date": str(RETURNS_START), "end_date": str(RETURNS_END)},
+    )
+
+
+async def portfolio_timeseries(
+    client: httpx.AsyncClient, work: Workload
+) -> httpx.Response:
+    return await client.get(
+        f"{API_PREFIX}/portfolio/{work.customer()}/timeseries",
+        params={"start_date": str(RETURNS_START), "end_date": str(RETURNS_END)},
+    )
+
+
+async def portfolio_returns_batch(
+    client: httpx.AsyncClient, work: Workload
+) -> httpx.Response:
+    customer_ids = work.rng.sample(
+        work.customer_ids, min(len(work.customer_ids), BATCH_SIZE)
+    )
+    return await client.post(
+        f"{API_PREFIX}/portfolio/returns/batch",
+        json={
+            "customer_ids": customer_ids,
+            "start_date": str(RETURNS_START),
+            "end_date": str(RETURNS_END),
+            "include_holdings": False,
+        },
+    )
+
+
+async def get_stock(client: httpx.AsyncClient, work: Workload) -> httpx.Response:
+    return await client.get(f"{API_PREFIX}/stocks/{work.rng.choice(work.tickers)}")
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "customers.get": get_customer,
+    "customers.list": list_customers,
+    "customers.create": create_customer,
+    "customers.update": update_customer,
+    "customers.replace": replace_holdings,
+    "customers.delete": delete_customer,
+    "portfolio.returns": portfolio_returns,
+    "portfolio.timeseries": portfolio_timeseries,
+    "portfolio.returns_batch": portfolio_returns_batch,
+    "stocks.get": get_stock,
+}
+
+
+class Recorder:
+    """Latencies and failures per operation for one stage."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(
+        self,
+        name: str,
+        client: httpx.AsyncClient,
+        work: Workload,
+        started: Optional[float] = None,
+    ) -> None:
+        """Run an operation, timing it from ``started`` if given."""
+        started = time.perf_counter() if started is None else started
+        try:
+            response = await OPERATIONS[name](client, work)
+            if response.status_code >= 400:
+                self.errors[name][str(response.status_code)] += 1
+        except httpx.HTTPError as e:
+            self.errors[name][type(e).__name__] += 1
+        self.latencies[name].append(time.perf_counter() - started)
+
+    def summary(self, elapsed: float) -> Dict:
+        """Per-operation and overall latency percentiles and error rates."""
+        routes = {
+            name: summarize(samples, self.errors.get(name, {}), elapsed)
+            for name, samples in sorted(self.latencies.items())
+        }
+        everything = [s for samples in self.latencies.values() for s in samples]
+        errors: Dict[str, int] = defaultdict(int)
+        for by_kind in self.errors.values():
+            for kind, n in by_kind.items():
+                errors[kind] += n
+        return {"overall": summarize(everything, errors, elapsed), "routes": routes}
+
+
+def summarize(samples: List[float], errors: Dict[str, int], elapsed: float) -> Dict:
+    """Latency percentiles in milliseconds, throughput and error rate."""
+    if not samples:
+        return {"requests": 0}
+    latencies = np.array(samples) * 1000
+    failed = sum(errors.values())
+    return {
+        "requests": len(samples),
+        "throughput_per_s": len(samples) / elapsed if elapsed else 0.0,
+        "error_rate": failed / len(samples),
+        "errors": dict(errors),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+    }
+
+
+def chooser(profile: Dict[str, int], rng: random.Random) -> Callable[[], str]:
+    """Draw operation names in proportion to their weights."""
+    names = list(profile)
+    weights = [profile[name] for name in names]
+    return lambda: rng.choices(names, weights)[0]
+
+
+async def closed_loop(
+    client: httpx.AsyncClient,
+    work: Workload,
+    profile: Dict[str, int],
+    concurrency: int,
+    duration: float,
+) -> Dict:
+    """``concurrency`` workers each sending their next request as soon as one ends."""
+    recorder = Recorder()
+    choose = chooser(profile, work.rng)
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await recorder.call(choose(), client, work)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def open_loop(
+    client: httpx.AsyncClient,
+    work: Workload,
+    profile: Dict[str, int],
+    rate: float,
+    duration: float,
+    max_in_flight: int,
+) -> Dict:
+    """
+    Start requests at ``rate`` per second with Poisson arrivals.
+
+    Arrivals beyond ``max_in_flight`` outstanding requests wait for a slot,
+    and that wait is part of their recorded latency.
+    """
+    recorder = Recorder()
+    choose = chooser(profile, work.rng)
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks = []
+
+    async def send(name: str, scheduled: float) -> None:
+        async with slots:
+            await recorder.call(name, client, work, started=scheduled)
+
+    started = time.perf_counter()
+    scheduled = started
+    while scheduled < started + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(choose(), scheduled)))
+        scheduled += work.rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    result = recorder.summary(time.perf_counter() - started)
+    result["offered_rate_per_s"] = rate
+    return result
+
+
+async def sample_workload(client: httpx.AsyncClient, seed: int) -> Workload:
+    """Collect customer ids and held tickers from the seeded data."""
+    customer_ids, tickers = [], set()
+    cursor = None
+    while len(customer_ids) < SAMPLE_CUSTOMERS:
+        params = {"limit": PAGE_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(f"{API_PREFIX}/customers/", params=params)
+        response.raise_for_status()
+        for customer in response.json():
+            customer_ids.append(customer["id"])
+            tickers.update(h["stock_ticker"] for h in customer["portfolio_stocks"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    if not customer_ids or not tickers:
+        raise SystemExit("No data found; seed it with `python -m benchmarks.data`")
+    return Workload(customer_ids, sorted(tickers), random.Random(seed))
+
+
+async def run(args: argparse.Namespace) -> List[Dict]:
+    """Run one stage per requested rate or concurrency level."""
+    profile = PROFILES[args.profile]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        work = await sample_workload(client, args.seed)
+        stages = []
+        for level in args.levels:
+            if args.rate:
+                result = await open_loop(
+                    client, work, profile, level, args.duration, args.max_in_flight
+                )
+            else:
+                result = await closed_loop(
+                    client, work, profile, int(level), args.duration
+                )
+            result["stage"] = {args.mode: level}
+            stages.append(result)
+            overall = result["overall"]
+            print(
+                f"{args.mode}={level:g}: {overall['throughput_per_s']:.1f} req/s, "
+                f"p95 {overall.get('p95_ms', 0):.1f} ms, "
+                f"p99 {overall.get('p99_ms', 0):.1f} ms, "
+                f"errors {overall.get('error_rate', 0):.2%}"
+            )
+        # Remove customers this run created and did not delete
+        for customer_id in work.created:
+            await client.delete(f"{API_PREFIX}/customers/{customer_id}")
+    return stages
+
+
+def levels(value: str) -> List[float]:
+    return [float(level) for level in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--rate", type=levels, help="Requests per second, e.g. 50,100")
+    mode.add_argument("--concurrency", type=levels, help="Workers, e.g. 1,8,32")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds/stage")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    args.mode = "rate" if args.rate else "concurrency"
+    args.levels = args.rate or args.concurrency
+
+    stages = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "base_url": args.base_url,
+            "profile": args.profile,
+            "weights": PROFILES[args.profile],
+            "duration_s": args.duration,
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
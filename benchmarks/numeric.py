@@ -0,0 +1,172 @@
+"""Benchmark the integer-cent price paths against Decimal baselines.
+
+Runs in process without a database:
+
+    python -m benchmarks.numeric --bars 100000 --customers 20000 --holdings 25
+
+``ingest.parse`` turns Polygon bars into price rows and ``returns.summarize``
+looks up boundary closes in cached histories and computes returns of large
+batches of portfolios from them. The ``.decimal`` cases run the previous
+``Decimal`` code, kept in ``benchmarks.baseline`` (five ``Decimal(str(x))``
+per bar; ``Decimal`` closes converted to float per holding), the ``.cents``
+cases run the code the application uses now. The
+output has the same shape as ``benchmarks.run``, so ``benchmarks.compare``
+works on it, plus the p50 speedup of every case pair.
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from array import array
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks import baseline
+from benchmarks.data import ticker_symbols
+from benchmarks.fake_polygon import synthetic_bars
+from benchmarks.run import metadata, summarize
+from app.services.portfolio_service import PortfolioService
+from app.services.price_cache import TickerPrices
+from app.services.stock_service import StockService
+
+# Tickers bars and holdings are drawn from
+TICKERS = 500
+RETURNS_START = date(2024, 7, 1)
+RETURNS_END = date(2024, 12, 31)
+
+
+def boundary_cents(
+    histories: Dict[str, TickerPrices], start_date: date, end_date: date
+) -> Dict[str, Tuple[int, int]]:
+    """The price cache branch of ``StockService.get_boundary_cents``."""
+    boundaries = {}
+    for ticker, history in histories.items():
+        prices = history.boundaries(start_date, end_date)
+        if prices is not None:
+            boundaries[ticker] = prices
+    return boundaries
+
+
+def bars(count: int) -> List[Tuple[str, dict]]:
+    """About ``count`` synthetic (ticker, bar) pairs."""
+    symbols = ticker_symbols(TICKERS)
+    days = max(count // len(symbols) * 7 // 5, 1)
+    start = date(2024, 1, 1)
+    pairs = []
+    for ticker in symbols:
+        for bar in synthetic_bars(ticker, start, start + timedelta(days=days - 1)):
+            pairs.append((ticker, bar))
+    return pairs[:count]
+
+
+def portfolios(
+    customers: int, holdings: int, seed: int
+) -> Tuple[List[uuid.UUID], List[Tuple[int, str, int]], Dict[str, TickerPrices]]:
+    """Customers, their holdings and cached histories with two closes per ticker."""
+    rng = random.Random(seed)
+    symbols = ticker_symbols(TICKERS)
+    customer_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(customers)]
+    rows = [
+        (owner, ticker, rng.randint(1, 500))
+        for owner in range(customers)
+        for ticker in rng.sample(symbols, holdings)
+    ]
+    days = array("l", [RETURNS_START.toordinal(), RETURNS_END.toordinal()])
+    histories = {
+        ticker: TickerPrices(
+            days, array("q", [rng.randint(1_000, 50_000), rng.randint(1_000, 50_000)])
+        )
+        for ticker in symbols
+    }
+    return customer_ids, rows, histories
+
+
+def measure(operation: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Time an already warmed up operation."""
+    operation()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def run(args: argparse.Namespace) -> Tuple[Dict[str, int], Dict[str, Dict]]:
+    pairs = bars(args.bars)
+    customer_ids, holdings, histories = portfolios(
+        args.customers, args.holdings, args.seed
+    )
+
+    cases = {
+        "ingest.parse.decimal": lambda: [
+            baseline.parse_bar(ticker, bar) for ticker, bar in pairs
+        ],
+        "ingest.parse.cents": lambda: [
+            StockService.parse_bar(ticker, bar) for ticker, bar in pairs
+        ],
+        "returns.summarize.decimal": lambda: baseline.summarize_returns(
+            customer_ids,
+            holdings,
+            baseline.get_boundary_prices(histories, RETURNS_START, RETURNS_END),
+            RETURNS_START,
+            RETURNS_END,
+        ),
+        "returns.summarize.cents": lambda: PortfolioService._summarize_returns(
+            customer_ids,
+            holdings,
+            boundary_cents(histories, RETURNS_START, RETURNS_END),
+            RETURNS_START,
+            RETURNS_END,
+        ),
+    }
+    results = {name: measure(case, args.iterations) for name, case in cases.items()}
+    dataset = {
+        "bars": len(pairs),
+        "customers": len(customer_ids),
+        "holdings": len(holdings),
+    }
+    return dataset, results
+
+
+def speedups(results: Dict[str, Dict]) -> Dict[str, float]:
+    """p50 of each ``.decimal`` case divided by its ``.cents`` counterpart."""
+    return {
+        name.rsplit(".", 1)[0]: result["p50_ms"]
+        / results[name.replace(".decimal", ".cents")]["p50_ms"]
+        for name, result in results.items()
+        if name.endswith(".decimal")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--holdings", type=int, default=25)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    args.warmup = 1
+
+    dataset, results = run(args)
+    report = {
+        "meta": metadata(args),
+        "dataset": dataset,
+        "results": results,
+        "speedup": speedups(results),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
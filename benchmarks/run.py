@@ -0,0 +1,270 @@
+"""Benchmark services and HTTP routes against seeded data.
+
+Seed the database first (see ``benchmarks.data``), then:
+
+    python -m benchmarks.run --iterations 200 --output results.json
+
+Every case reports p50/p95/p99/mean latency in milliseconds, throughput
+and peak traced memory. Compare two result files with
+``python -m benchmarks.compare before.json after.json``.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal, async_engine
+from app.models import Customer, Stock
+from app.services import stock_service
+from app.services.customer_service import CustomerService
+from app.services.polygon_client import PolygonClient
+from app.services.portfolio_service import PortfolioService
+from app.services.price_cache import price_cache
+from app.services.return_cache import return_cache
+from app.services.stock_service import StockService
+
+# Date range used by return calculations
+RETURNS_START = date(2024, 7, 1)
+RETURNS_END = date(2024, 12, 31)
+# Iterations traced for peak memory; tracing slows calls down, so it is
+# kept out of the timed iterations
+MEMORY_ITERATIONS = 5
+# Customers polled repeatedly by the warm-cache case
+HOT_CUSTOMERS = 10
+
+Operation = Callable[[], Awaitable[object]]
+
+
+def summarize(samples: List[float], elapsed: float) -> Dict[str, float]:
+    """Latency percentiles in milliseconds and throughput per second."""
+    latencies = np.array(samples) * 1000
+    return {
+        "iterations": len(samples),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "throughput_per_s": len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+async def measure(
+    operation: Operation,
+    iterations: int,
+    warmup: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, float]:
+    """Time an operation, then trace a few more calls for peak memory."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        await operation()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - start)
+    result = summarize(samples, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        for _ in range(MEMORY_ITERATIONS):
+            if setup:
+                setup()
+            tracemalloc.reset_peak()
+            await operation()
+        result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def clear_caches() -> None:
+    """Make the next call read from the database."""
+    price_cache.clear()
+    return_cache.clear()
+
+
+def stub_polygon(days: int = 14) -> PolygonClient:
+    """A Polygon client answering every aggregates call with synthetic bars."""
+    base = int(datetime(2024, 12, 1, 12).timestamp() * 1000)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bars = [
+            {
+                "t": base + day * 86_400_000,
+                "o": 100.0,
+                "h": 101.0,
+                "l": 99.0,
+                "c": 100.0 + day,
+                "v": 1000,
+            }
+            for day in range(days)
+        ]
+        return httpx.Response(200, json={"status": "OK", "results": bars})
+
+    return PolygonClient(
+        api_key="benchmark",
+        base_url="https://polygon.invalid",
+        timeout=5.0,
+        max_connections=10,
+        max_retries=0,
+        backoff_seconds=0.0,
+        cache_dir="",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+async def run(
+    iterations: int, warmup: int, seed: int
+) -> Tuple[Dict[str, int], Dict[str, Dict]]:
+    """
+    Run every benchmark case.
+
+    Returns:
+        Dataset size, and results per case
+    """
+    rng = random.Random(seed)
+    async with AsyncSessionLocal() as db:
+        customer_ids = list((await db.execute(select(Customer.id))).scalars())
+        tickers = list((await db.execute(select(Stock.ticker))).scalars())
+    if not customer_ids or not tickers:
+        raise SystemExit("No data found; seed it with `python -m benchmarks.data`")
+
+    def pick_customer():
+        return rng.choice(customer_ids)
+
+    from app.main import app
+
+    results: Dict[str, Dict] = {}
+
+    async with AsyncSessionLocal() as db:
+        cases: Dict[str, Operation] = {
+            "service.get_customers": lambda: CustomerService.get_customers(db, 0, 100),
+            "service.get_customers_page": lambda: CustomerService.get_customers_page(
+                db, 100
+            ),
+            "service.get_customer": lambda: CustomerService.get_customer(
+                db, pick_customer()
+            ),
+            "service.calculate_portfolio_return": (
+                lambda: PortfolioService.calculate_portfolio_return(
+                    db, pick_customer(), RETURNS_START, RETURNS_END
+                )
+            ),
+        }
+        for name, operation in cases.items():
+            results[name] = await measure(operation, iterations, warmup, clear_caches)
+            db.expunge_all()
+
+        # Repeated calls for a few hot customers, served by warm caches
+        hot_customers = customer_ids[:HOT_CUSTOMERS]
+        results["service.calculate_portfolio_return.cached"] = await measure(
+            lambda: PortfolioService.calculate_portfolio_return(
+                db, rng.choice(hot_customers), RETURNS_START, RETURNS_END
+            ),
+            iterations,
+            warmup,
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        def get(path_factory: Callable[[], str], **params) -> Operation:
+            async def operation():
+                response = await client.get(path_factory(), params=params)
+                response.raise_for_status()
+
+            return operation
+
+        routes = {
+            "http.GET /customers/{id}": get(
+                lambda: f"/api/v1/customers/{pick_customer()}"
+            ),
+            "http.GET /customers/": get(lambda: "/api/v1/customers/", limit=100),
+            "http.GET /portfolio/{id}/returns": get(
+                lambda: f"/api/v1/portfolio/{pick_customer()}/returns",
+                start_date=str(RETURNS_START),
+                end_date=str(RETURNS_END),
+            ),
+            "http.GET /stocks/{ticker}": get(
+                lambda: f"/api/v1/stocks/{rng.choice(tickers)}"
+            ),
+        }
+        for name, operation in routes.items():
+            results[name] = await measure(operation, iterations, warmup, clear_caches)
+
+    # Ingestion last, as it rewrites part of the seeded price history
+    async with AsyncSessionLocal() as db:
+        original_client = stock_service.polygon_client
+        stock_service.polygon_client = stub_polygon()
+        try:
+            results["service.populate_stock_data"] = await measure(
+                lambda: StockService.populate_stock_data(db, rng.choice(tickers)),
+                iterations,
+                warmup,
+            )
+        finally:
+            await stock_service.polygon_client.close()
+            stock_service.polygon_client = original_client
+
+    await async_engine.dispose()
+    return {"customers": len(customer_ids), "tickers": len(tickers)}, results
+
+
+def metadata(args: argparse.Namespace) -> Dict:
+    """Describe the environment a run happened in."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "seed": args.seed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    dataset, results = asyncio.run(run(args.iterations, args.warmup, args.seed))
+    report = {"meta": metadata(args), "dataset": dataset, "results": results}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -42,8 +42,8 @@ export class ApiService {
     return this.http.post<Stock>(`${this.apiUrl}/stocks/populate/${ticker}`, {});
   }
 
-  populateFortune500(): Observable<{message: string, status: string}> {
-    return this.http.post<{message: string, status: string}>(`${this.apiUrl}/stocks/populate-fortune500`, {});
+  populateFortune500(): Observable<{message: string, status: string, job_id: string}> {
+    return this.http.post<{message: string, status: string, job_id: string}>(`${this.apiUrl}/stocks/populate-fortune500`, {});
   }
 
   // Portfolio endpoints
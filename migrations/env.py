@@ -11,7 +11,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.config import get_settings
 from app.models.base import Base
-from app.models import Customer, Portfolio, Stock, PortfolioStock, StockPrice
+from app.models import (
+    Customer,
+    Portfolio,
+    Stock,
+    PortfolioStock,
+    StockPrice,
+    PortfolioDailyValue,
+    IngestionJob,
+)
 
 # this is the Alembic Config object
 config = context.config
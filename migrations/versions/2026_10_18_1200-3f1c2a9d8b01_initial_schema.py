@@ -0,0 +1,109 @@
+"""Initial schema
+
+Revision ID: 3f1c2a9d8b01
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+Databases created before migrations were tracked already have this schema:
+mark them with ``alembic stamp 3f1c2a9d8b01`` before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2a9d8b01"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "customers",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("address", sa.String(500), nullable=False),
+        *_timestamps(),
+    )
+    op.create_index("ix_customers_name", "customers", ["name"])
+
+    op.create_table(
+        "stocks",
+        sa.Column("ticker", sa.String(10), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("exchange", sa.String(50), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("idx_stock_ticker", "stocks", ["ticker"])
+
+    op.create_table(
+        "portfolios",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "customer_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("customers.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        ),
+        *_timestamps(),
+    )
+
+    op.create_table(
+        "portfolio_stocks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "portfolio_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("portfolios.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "stock_ticker",
+            sa.String(10),
+            sa.ForeignKey("stocks.ticker", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        *_timestamps(),
+        sa.UniqueConstraint("portfolio_id", "stock_ticker", name="uq_portfolio_stock"),
+    )
+
+    op.create_table(
+        "stock_prices",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "stock_ticker",
+            sa.String(10),
+            sa.ForeignKey("stocks.ticker", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("open_price", sa.Numeric(10, 2), nullable=True),
+        sa.Column("high_price", sa.Numeric(10, 2), nullable=True),
+        sa.Column("low_price", sa.Numeric(10, 2), nullable=True),
+        sa.Column("close_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("volume", sa.Numeric(20, 0), nullable=True),
+        *_timestamps(),
+        sa.UniqueConstraint("stock_ticker", "date", name="uq_stock_price_date"),
+    )
+    op.create_index("ix_stock_prices_date", "stock_prices", ["date"])
+    op.create_index(
+        "idx_stock_price_ticker_date", "stock_prices", ["stock_ticker", "date"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stock_prices")
+    op.drop_table("portfolio_stocks")
+    op.drop_table("portfolios")
+    op.drop_table("stocks")
+    op.drop_table("customers")
@@ -0,0 +1,37 @@
+"""Add portfolio_daily_values
+
+Revision ID: 3de153a4cb38
+Revises: 3f1c2a9d8b01
+Create Date: 2026-10-18 12:05:00.000000
+
+The table starts empty; fill it with ``python -m scripts.rebuild_valuations``.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3de153a4cb38"
+down_revision = "3f1c2a9d8b01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_daily_values",
+        sa.Column(
+            "portfolio_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("portfolios.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("date", sa.Date(), primary_key=True),
+        sa.Column("market_value", sa.Numeric(20, 2), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_daily_values")
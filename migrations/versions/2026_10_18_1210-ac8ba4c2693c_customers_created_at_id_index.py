@@ -0,0 +1,23 @@
+"""Index customers on (created_at, id)
+
+Revision ID: ac8ba4c2693c
+Revises: 3de153a4cb38
+Create Date: 2026-10-18 12:10:00.000000
+
+Backs keyset pagination of the customer list.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "ac8ba4c2693c"
+down_revision = "3de153a4cb38"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_customers_created_at_id", "customers", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_customers_created_at_id", table_name="customers")
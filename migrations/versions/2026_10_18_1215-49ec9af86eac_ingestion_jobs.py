@@ -0,0 +1,43 @@
+"""Add ingestion_jobs
+
+Revision ID: 49ec9af86eac
+Revises: ac8ba4c2693c
+Create Date: 2026-10-18 12:15:00.000000
+
+Durable queue of stock ingestion jobs claimed by job workers.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "49ec9af86eac"
+down_revision = "ac8ba4c2693c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("tickers", sa.JSON(), nullable=False),
+        sa.Column("backfill_from", sa.Date(), nullable=True),
+        sa.Column("progress", sa.JSON(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("worker_id", sa.String(255), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "idx_ingestion_job_status_created", "ingestion_jobs", ["status", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ingestion_jobs")
@@ -0,0 +1,28 @@
+"""Add ingestion_jobs.mode
+
+Revision ID: 32d0bf1f2e55
+Revises: 49ec9af86eac
+Create Date: 2026-10-18 12:20:00.000000
+
+Existing jobs keep the per-ticker mode they were queued with.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "32d0bf1f2e55"
+down_revision = "49ec9af86eac"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ingestion_jobs",
+        sa.Column("mode", sa.String(20), nullable=False, server_default="per_ticker"),
+    )
+    op.alter_column("ingestion_jobs", "mode", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("ingestion_jobs", "mode")
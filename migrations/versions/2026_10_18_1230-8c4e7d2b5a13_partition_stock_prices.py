@@ -0,0 +1,126 @@
+"""Partition stock_prices by date
+
+Revision ID: 8c4e7d2b5a13
+Revises: 32d0bf1f2e55
+Create Date: 2026-10-18 12:30:00.000000
+
+Rebuilds ``stock_prices`` as a table range-partitioned by ``date`` (yearly or
+monthly, per ``STOCK_PRICE_PARTITION_GRANULARITY``) and copies the existing
+rows over. The primary key becomes ``(id, date)``, since PostgreSQL requires
+the partition key in every unique constraint; ``uq_stock_price_date`` stays
+the upsert target. ``idx_stock_price_ticker_date`` duplicated the index of
+``uq_stock_price_date`` and the B-tree on ``date`` is replaced by a BRIN
+index. PostgreSQL only; the rows are copied in a single transaction, so run
+it during a maintenance window on large tables.
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import get_settings
+from app.db.partitions import create_partition_sql, partitions_between
+
+# revision identifiers, used by Alembic.
+revision = "8c4e7d2b5a13"
+down_revision = "32d0bf1f2e55"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, stock_ticker, date, open_price, high_price, low_price, close_price, "
+    "volume, created_at, updated_at"
+)
+COLUMN_DEFINITIONS = """
+    id UUID NOT NULL,
+    stock_ticker VARCHAR(10) NOT NULL
+        REFERENCES stocks (ticker) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    open_price NUMERIC(10, 2),
+    high_price NUMERIC(10, 2),
+    low_price NUMERIC(10, 2),
+    close_price NUMERIC(10, 2) NOT NULL,
+    volume NUMERIC(20, 0),
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+"""
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE stock_prices RENAME TO stock_prices_unpartitioned")
+    op.execute(
+        "ALTER TABLE stock_prices_unpartitioned DROP CONSTRAINT uq_stock_price_date"
+    )
+    op.execute(
+        "ALTER INDEX stock_prices_pkey RENAME TO stock_prices_unpartitioned_pkey"
+    )
+    op.execute("DROP INDEX ix_stock_prices_date")
+    op.execute("DROP INDEX idx_stock_price_ticker_date")
+
+    op.execute(
+        f"""
+        CREATE TABLE stock_prices (
+            {COLUMN_DEFINITIONS},
+            PRIMARY KEY (id, date),
+            CONSTRAINT uq_stock_price_date UNIQUE (stock_ticker, date)
+        ) PARTITION BY RANGE (date)
+        """
+    )
+
+    # Cover the stored history and everything up to the end of next year;
+    # later periods are created ahead of time by the ingestion workers
+    first, last = conn.execute(
+        sa.text("SELECT min(date), max(date) FROM stock_prices_unpartitioned")
+    ).one()
+    today = date.today()
+    first = min(first or today, today)
+    last = max(last or today, date(today.year + 1, 12, 31))
+    granularity = get_settings().stock_price_partition_granularity
+    for name, start, end in partitions_between(first, last, granularity):
+        op.execute(create_partition_sql(name, start, end))
+
+    op.execute(
+        f"INSERT INTO stock_prices ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM stock_prices_unpartitioned"
+    )
+    op.execute("DROP TABLE stock_prices_unpartitioned")
+    op.execute(
+        "CREATE INDEX idx_stock_price_date_brin ON stock_prices USING brin (date)"
+    )
+    op.execute("ANALYZE stock_prices")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute(
+        f"""
+        CREATE TABLE stock_prices_unpartitioned (
+            {COLUMN_DEFINITIONS},
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(
+        f"INSERT INTO stock_prices_unpartitioned ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM stock_prices"
+    )
+    # Drops every partition with it
+    op.execute("DROP TABLE stock_prices")
+    op.execute("ALTER TABLE stock_prices_unpartitioned RENAME TO stock_prices")
+    op.execute(
+        "ALTER INDEX stock_prices_unpartitioned_pkey RENAME TO stock_prices_pkey"
+    )
+    op.execute(
+        "ALTER TABLE stock_prices "
+        "ADD CONSTRAINT uq_stock_price_date UNIQUE (stock_ticker, date)"
+    )
+    op.create_index("ix_stock_prices_date", "stock_prices", ["date"])
+    op.create_index(
+        "idx_stock_price_ticker_date", "stock_prices", ["stock_ticker", "date"]
+    )
@@ -0,0 +1,29 @@
+"""Add portfolio_daily_values.all_priced
+
+Revision ID: 5b9e1f3c7a24
+Revises: 8c4e7d2b5a13
+Create Date: 2026-10-18 12:40:00.000000
+
+Existing rows are marked not all_priced, so reads compute returns from prices
+until the table is rebuilt with ``python -m scripts.rebuild_valuations``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5b9e1f3c7a24"
+down_revision = "8c4e7d2b5a13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "portfolio_daily_values",
+        sa.Column("all_priced", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.alter_column("portfolio_daily_values", "all_priced", server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("portfolio_daily_values", "all_priced")
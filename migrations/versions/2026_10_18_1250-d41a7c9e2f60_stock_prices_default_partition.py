@@ -0,0 +1,35 @@
+"""Add a DEFAULT partition to stock_prices
+
+Revision ID: d41a7c9e2f60
+Revises: 5b9e1f3c7a24
+Create Date: 2026-10-18 12:50:00.000000
+
+Bars outside every range partition land in ``stock_prices_default`` instead
+of failing, so writes never need to create partitions. Upcoming partitions
+are created ahead of time by the ingestion workers. PostgreSQL only.
+"""
+from alembic import op
+
+from app.db.partitions import create_default_partition_sql, DEFAULT_PARTITION
+
+# revision identifiers, used by Alembic.
+revision = "d41a7c9e2f60"
+down_revision = "5b9e1f3c7a24"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(create_default_partition_sql())
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # Rows in the default partition are moved back to their range partitions,
+    # which must exist
+    op.execute(f"ALTER TABLE stock_prices DETACH PARTITION {DEFAULT_PARTITION}")
+    op.execute(f"INSERT INTO stock_prices SELECT * FROM {DEFAULT_PARTITION}")
+    op.execute(f"DROP TABLE {DEFAULT_PARTITION}")
@@ -0,0 +1,47 @@
+"""Run ingestion job workers outside the API processes.
+
+    python -m scripts.ingest_worker --workers 4
+
+Jobs are claimed with ``FOR UPDATE SKIP LOCKED``, so any number of these
+processes can run against the same database. Also creates upcoming
+``stock_prices`` partitions once a day. Stops after the current ticker on
+SIGINT or SIGTERM.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.db import async_engine
+from app.db.partitions import maintain_partitions
+from app.services.job_service import JobService, default_worker_id
+from app.services.polygon_client import polygon_client
+
+
+async def main(workers: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await polygon_client.start()
+    try:
+        await asyncio.gather(
+            *(
+                JobService.work(stop, worker_id=f"{default_worker_id()}:{index}")
+                for index in range(workers)
+            ),
+            maintain_partitions(async_engine, stop),
+        )
+    finally:
+        await polygon_client.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ingestion job workers")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.workers))
@@ -0,0 +1,23 @@
+"""Recompute every portfolio's stored daily values.
+
+Run once after creating the ``portfolio_daily_values`` table, or whenever
+prices were loaded outside the API:
+
+    python -m scripts.rebuild_valuations
+"""
+
+import asyncio
+
+from app.db import AsyncSessionLocal, async_engine
+from app.services.valuation_service import ValuationService
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        written = await ValuationService.rebuild_all(db)
+    await async_engine.dispose()
+    print(f"Wrote {written} daily portfolio values")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,27 +1,46 @@
 """Pytest configuration and fixtures."""
 
+import httpx
 import pytest
+import pytest_asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.db.query_budget import track_queries
+from app.metrics import instrument_engine
 from app.models.base import Base
-from app.db import get_db
+from app.db import get_db, get_async_db, get_async_session_factory
+from app.services.price_cache import price_cache
+from app.services.return_cache import return_cache
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# No pooling: the test client and async tests each run their own event loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+instrument_engine(async_engine.sync_engine, "test")
+track_queries(async_engine.sync_engine)
+
 
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database for each test."""
     Base.metadata.create_all(bind=engine)
+    price_cache.clear()
+    return_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -30,6 +49,24 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest_asyncio.fixture(scope="function")
+async def async_db_session(db_session):
+    """Async session on the same fresh database as ``db_session``."""
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async def override_get_async_db():
+    """Give each request its own session on the test database."""
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+def override_get_async_session_factory():
+    """Open background sessions on the test database."""
+    return TestingAsyncSessionLocal
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with database override."""
@@ -41,11 +78,33 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = (
+        override_get_async_session_factory
+    )
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
 
+@pytest_asyncio.fixture(scope="function")
+async def async_client(db_session):
+    """
+    Create an async test client calling the app in the test's own task.
+
+    Unlike ``client``, context-local state such as query budgets is shared
+    between the test and the request.
+    """
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = (
+        override_get_async_session_factory
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+
 @pytest.fixture
 def sample_customer_data():
     """Sample customer data for testing."""
@@ -0,0 +1,195 @@
+"""Tests for the benchmark tooling."""
+
+from datetime import date
+
+import httpx
+import pytest
+from sqlalchemy import func
+
+from app.models import StockPrice
+from app.services import stock_service
+from app.services.ingestion_service import IngestionService
+from app.services.polygon_client import PolygonClient
+from app.services.portfolio_service import PortfolioService
+from app.services.stock_service import StockService
+from benchmarks.compare import compare
+from benchmarks.data import generate
+from benchmarks.fake_polygon import FakePolygonConfig, create_app
+from benchmarks.load import PROFILES, closed_loop, sample_workload
+from benchmarks import baseline
+from benchmarks.numeric import RETURNS_END, RETURNS_START, boundary_cents, portfolios
+from benchmarks.run import summarize
+
+
+def test_generate_is_deterministic():
+    """Test the same seed produces identical datasets."""
+    first = generate(customers=5, tickers=3, days=10, seed=7)
+    second = generate(customers=5, tickers=3, days=10, seed=7)
+
+    assert first == second
+    assert len(first.customers) == 5
+    assert len(first.prices) == 3 * 10
+    assert all(1 <= quantity["quantity"] < 500 for quantity in first.holdings)
+    assert generate(customers=5, tickers=3, days=10, seed=8) != first
+
+
+def test_summarize_and_compare():
+    """Test percentiles and regressions between two runs."""
+    result = summarize([0.001] * 99 + [0.101], elapsed=1.0)
+    assert result["p50_ms"] == 1.0
+    assert result["p99_ms"] > 1.0
+    assert result["throughput_per_s"] == 100.0
+
+    before = {"results": {"case": {"p95_ms": 10.0, "throughput_per_s": 100.0}}}
+    after = {"results": {"case": {"p95_ms": 12.0, "throughput_per_s": 80.0}}}
+    changes = {row["metric"]: row["regression_pct"] for row in compare(before, after)}
+    assert changes == {"p95_ms": 20.0, "throughput_per_s": 20.0}
+
+
+def test_cent_returns_match_decimal_baseline():
+    """Test the integer-cent return math agrees with the Decimal baseline."""
+    customer_ids, holdings, histories = portfolios(50, 5, seed=1)
+
+    expected_results = baseline.summarize_returns(
+        customer_ids,
+        holdings,
+        baseline.get_boundary_prices(histories, RETURNS_START, RETURNS_END),
+        RETURNS_START,
+        RETURNS_END,
+    )
+    results = PortfolioService._summarize_returns(
+        customer_ids,
+        holdings,
+        boundary_cents(histories, RETURNS_START, RETURNS_END),
+        RETURNS_START,
+        RETURNS_END,
+    )
+
+    assert len(results) == len(expected_results) == 50
+    for result, expected in zip(results, expected_results):
+        assert result["total_return"] == pytest.approx(expected["total_return"])
+        assert len(result["holdings"]) == len(expected["holdings"])
+        for holding, expected_holding in zip(result["holdings"], expected["holdings"]):
+            assert holding == pytest.approx(expected_holding)
+
+
+def fake_polygon_client(config: FakePolygonConfig) -> PolygonClient:
+    """A Polygon client talking to the fake server in-process."""
+    return PolygonClient(
+        api_key="test",
+        base_url="http://fake-polygon",
+        max_retries=0,
+        transport=httpx.ASGITransport(app=create_app(config)),
+    )
+
+
+@pytest.mark.asyncio
+async def test_fake_polygon_serves_deterministic_bars():
+    """Test the fake server returns the same weekday bars on every call."""
+    config = FakePolygonConfig(delayed_rate=1.0)
+    client = fake_polygon_client(config)
+    await client.start()
+    try:
+        first = await client.get_aggregates("AAPL", date(2024, 1, 1), date(2024, 1, 7))
+        second = await client.get_aggregates("AAPL", date(2024, 1, 3), date(2024, 1, 3))
+    finally:
+        await client.close()
+
+    # Monday to Friday only, and DELAYED responses are accepted
+    assert len(first) == 5
+    assert second == [first[2]]
+    assert config.stats == {"delayed": 2}
+
+
+@pytest.mark.asyncio
+async def test_fake_polygon_grouped_daily():
+    """Test grouped daily bars match the per-ticker bars of the same day."""
+    client = fake_polygon_client(FakePolygonConfig(universe=["AAPL", "MSFT"]))
+    await client.start()
+    try:
+        grouped = await client.get_grouped_daily(date(2024, 1, 3))
+        weekend = await client.get_grouped_daily(date(2024, 1, 6))
+        single = await client.get_aggregates("MSFT", date(2024, 1, 3), date(2024, 1, 3))
+    finally:
+        await client.close()
+
+    assert [bar["T"] for bar in grouped] == ["AAPL", "MSFT"]
+    assert {**single[0], "T": "MSFT"} == grouped[1]
+    assert weekend == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_grouped_against_fake_polygon(
+    db_session, async_db_session, monkeypatch
+):
+    """Test grouped ingestion stores bars for every app ticker from the fake server."""
+    client = fake_polygon_client(FakePolygonConfig())
+    monkeypatch.setattr(stock_service, "polygon_client", client)
+    tickers = StockService.FORTUNE_500_TICKERS
+    await client.start()
+    try:
+        summary = await IngestionService.ingest_grouped(
+            async_db_session, tickers, requests_per_second=0, end_date=date(2024, 1, 5)
+        )
+    finally:
+        await client.close()
+
+    assert summary["failed_days"] == {}
+    assert {result["status"] for result in summary["tickers"].values()} == {"ok"}
+    stored = dict(
+        db_session.query(StockPrice.stock_ticker, func.count())
+        .group_by(StockPrice.stock_ticker)
+        .all()
+    )
+    assert set(stored) == set(tickers)
+    assert summary["inserted"] == sum(stored.values()) > 0
+
+
+@pytest.mark.asyncio
+async def test_fake_polygon_failures():
+    """Test simulated errors and rate limiting."""
+    failing = fake_polygon_client(FakePolygonConfig(error_rate=1.0))
+    await failing.start()
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await failing.get_aggregates("AAPL", date(2024, 1, 1), date(2024, 1, 7))
+    finally:
+        await failing.close()
+
+    app = create_app(FakePolygonConfig(rate_limit=1))
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://fake-polygon"
+    ) as client:
+        path = "/v2/aggs/ticker/AAPL/range/1/day/2024-01-01/2024-01-07"
+        assert (await client.get(path)).status_code == 200
+        limited = await client.get(path)
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_load_closed_loop(async_client, sample_customer_data):
+    """Test a short mixed-workload stage reports every route it exercised."""
+    for _ in range(3):
+        response = await async_client.post(
+            "/api/v1/customers/", json=sample_customer_data
+        )
+        assert response.status_code == 201
+
+    work = await sample_workload(async_client, seed=1)
+    assert len(work.customer_ids) == 3
+    assert work.tickers == ["AAPL", "GOOGL"]
+
+    profile = {
+        "customers.get": 1,
+        "customers.list": 1,
+        "customers.create": 1,
+        "customers.update": 1,
+        "customers.replace": 1,
+    }
+    result = await closed_loop(async_client, work, profile, concurrency=2, duration=0.2)
+
+    assert set(result["routes"]) == set(profile)
+    assert result["overall"]["requests"] > 0
+    assert result["overall"]["error_rate"] == 0
+    assert set(PROFILES["mixed"]) >= set(profile)
@@ -1,8 +1,13 @@
 """Tests for customer API endpoints."""
 
+import json
+
 import pytest
 from uuid import UUID
 
+from app.models import Customer, Portfolio, Stock
+from app.services.valuation_service import ValuationService
+
 
 def test_create_customer(client, sample_customer_data):
     """Test creating a new customer."""
@@ -98,3 +103,194 @@ def test_update_customer_portfolio(client, sample_customer_data):
     assert len(data["portfolio_stocks"]) == 1
     assert data["portfolio_stocks"][0]["stock_ticker"] == "MSFT"
     assert data["portfolio_stocks"][0]["quantity"] == 15
+
+
+def test_list_customers_cursor_pagination(client, sample_customer_data):
+    """Test cursor pages cover every customer exactly once."""
+    names = [f"Customer {i}" for i in range(5)]
+    for name in names:
+        client.post("/api/v1/customers/", json={**sample_customer_data, "name": name})
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/v1/customers/", params=params)
+        assert response.status_code == 200
+        seen.extend(customer["name"] for customer in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert seen == names
+
+
+def test_list_customers_invalid_cursor(client):
+    """Test a malformed cursor is rejected."""
+    response = client.get("/api/v1/customers/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_export_customers(client, sample_customer_data):
+    """Test the export streams every customer in the single-customer shape."""
+    ids = [
+        client.post(
+            "/api/v1/customers/", json={**sample_customer_data, **extra}
+        ).json()["id"]
+        for extra in ({}, {"name": "Jane Doe", "stocks": []})
+    ]
+
+    response = client.get("/api/v1/customers/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ids
+    for line in lines:
+        expected = client.get(f"/api/v1/customers/{line['id']}").json()
+        expected["portfolio_stocks"].sort(key=lambda stock: stock["stock_ticker"])
+        assert line == expected
+    assert lines[1]["portfolio_stocks"] == []
+
+
+def test_bulk_create_customers(client, db_session, sample_customer_data):
+    """Test bulk create inserts valid items and reports the rest."""
+    db_session.add_all(
+        [Stock(ticker="AAPL", name="AAPL"), Stock(ticker="GOOGL", name="GOOGL")]
+    )
+    db_session.commit()
+
+    response = client.post(
+        "/api/v1/customers/bulk",
+        json={
+            "customers": [
+                sample_customer_data,
+                {"name": "", "address": "Nowhere"},
+                {**sample_customer_data, "stocks": [{"ticker": "MSFT", "quantity": 1}]},
+                {"name": "Jane Doe", "address": "456 Oak Ave"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 2
+    results = data["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert "name" in results[1]["error"]
+    assert "MSFT" in results[2]["error"]
+
+    created = client.get(f"/api/v1/customers/{results[0]['id']}").json()
+    assert {
+        stock["stock_ticker"]: stock["quantity"]
+        for stock in created["portfolio_stocks"]
+    } == {
+        "AAPL": 10,
+        "GOOGL": 5,
+    }
+    assert client.get(f"/api/v1/customers/{results[3]['id']}").status_code == 200
+
+
+def test_bulk_create_customers_values_after_commit(
+    client, db_session, sample_customer_data, monkeypatch
+):
+    """Test bulk create stores valuations only once the customers are committed."""
+    db_session.add_all(
+        [Stock(ticker="AAPL", name="AAPL"), Stock(ticker="GOOGL", name="GOOGL")]
+    )
+    db_session.commit()
+
+    refreshed = []
+
+    async def refresh_later(portfolio_ids, session_factory):
+        db_session.expire_all()
+        refreshed.append((list(portfolio_ids), db_session.query(Customer).count()))
+
+    monkeypatch.setattr(ValuationService, "refresh_later", refresh_later)
+    client.post(
+        "/api/v1/customers/bulk",
+        json={
+            "customers": [
+                sample_customer_data,
+                {"name": "Jane Doe", "address": "456 Oak Ave"},
+            ]
+        },
+    )
+
+    portfolio = db_session.query(Portfolio).join(Customer).filter_by(name="John Doe")
+    assert refreshed == [([portfolio.one().id], 2)]
+
+
+def test_update_customer_portfolio_keeps_unchanged_holdings(
+    client, sample_customer_data
+):
+    """Test replacing holdings only rewrites the ones that changed."""
+    created = client.post("/api/v1/customers/", json=sample_customer_data).json()
+    before = {stock["stock_ticker"]: stock for stock in created["portfolio_stocks"]}
+
+    response = client.put(
+        f"/api/v1/customers/{created['id']}",
+        json={
+            "stocks": [
+                {"ticker": "AAPL", "quantity": 10},
+                {"ticker": "MSFT", "quantity": 3},
+            ]
+        },
+    )
+    after = {
+        stock["stock_ticker"]: stock for stock in response.json()["portfolio_stocks"]
+    }
+    assert set(after) == {"AAPL", "MSFT"}
+    assert after["AAPL"] == before["AAPL"]
+
+
+def test_set_holding(client, db_session, sample_customer_data):
+    """Test changing, adding and removing single holdings."""
+    db_session.add(Stock(ticker="MSFT", name="MSFT"))
+    db_session.commit()
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    url = f"/api/v1/customers/{customer_id}/holdings"
+
+    def quantities(response):
+        assert response.status_code == 200
+        return {
+            stock["stock_ticker"]: stock["quantity"]
+            for stock in response.json()["portfolio_stocks"]
+        }
+
+    assert quantities(client.patch(f"{url}/AAPL", json={"quantity": 20})) == {
+        "AAPL": 20,
+        "GOOGL": 5,
+    }
+    assert quantities(client.patch(f"{url}/msft", json={"quantity": 1})) == {
+        "AAPL": 20,
+        "GOOGL": 5,
+        "MSFT": 1,
+    }
+    assert quantities(client.patch(f"{url}/GOOGL", json={"quantity": 0})) == {
+        "AAPL": 20,
+        "MSFT": 1,
+    }
+    assert client.patch(f"{url}/NOPE", json={"quantity": 1}).status_code == 404
+
+
+def test_get_customer_conditional(client, sample_customer_data):
+    """Test If-None-Match returns 304 until the customer or holdings change."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    url = f"/api/v1/customers/{customer_id}"
+
+    etag = client.get(url).headers["ETag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    client.patch(f"{url}/holdings/AAPL", json={"quantity": 11})
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,38 @@
+"""Tests for Prometheus instrumentation."""
+
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_route_metrics_use_path_templates(client, sample_customer_data):
+    """Test requests are recorded per route template with their SQL usage."""
+    route = "/api/v1/customers/{customer_id}"
+    labels = {"method": "GET", "route": route}
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    requests_before = _sample(
+        "http_request_duration_seconds_count", status="200", **labels
+    )
+    statements_before = _sample("http_request_db_statements_sum", **labels)
+
+    client.get(f"/api/v1/customers/{customer_id}")
+
+    assert (
+        _sample("http_request_duration_seconds_count", status="200", **labels)
+        == requests_before + 1
+    )
+    assert _sample("http_request_db_statements_sum", **labels) > statements_before
+    assert _sample("http_requests_in_flight", **labels) == 0
+
+
+def test_metrics_endpoint_exposes_instrumentation(client):
+    """Test the /metrics mount serves the recorded series."""
+    client.get("/health")
+    response = client.get("/metrics/")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
+    assert "polygon_fetch_duration_seconds" in response.text
@@ -0,0 +1,103 @@
+"""Tests for the shared Polygon client."""
+
+from datetime import date
+
+import httpx
+import pytest
+
+from app.services.polygon_client import PolygonClient
+
+BARS = [{"t": 1704196800000, "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 100}]
+
+
+def _client(handler, **kwargs) -> PolygonClient:
+    return PolygonClient(
+        api_key="test",
+        backoff_seconds=0,
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    """Test rate-limited and failed requests are retried."""
+    statuses = [429, 503, 200]
+
+    def handler(request):
+        status = statuses.pop(0)
+        body = {"status": "OK", "results": BARS} if status == 200 else {}
+        return httpx.Response(status, json=body)
+
+    client = _client(handler)
+    try:
+        bars = await client.get_aggregates("AAPL", date(2024, 1, 1), date(2024, 1, 5))
+    finally:
+        await client.close()
+
+    assert bars == BARS
+    assert statuses == []
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    """Test persistent upstream errors are raised once retries run out."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = _client(handler, max_retries=2)
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.get_aggregates("AAPL", date(2024, 1, 1), date(2024, 1, 5))
+    finally:
+        await client.close()
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_caches_closed_ranges_on_disk(tmp_path):
+    """Test historical ranges are served from disk after the first fetch."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"status": "DELAYED", "results": BARS})
+
+    client = _client(handler, cache_dir=str(tmp_path))
+    try:
+        for _ in range(2):
+            bars = await client.get_aggregates(
+                "BRK.B", date(2024, 1, 1), date(2024, 1, 5)
+            )
+            assert bars == BARS
+        await client.get_aggregates("BRK.B", date(2024, 1, 1), date.today())
+        await client.get_aggregates("BRK.B", date(2024, 1, 1), date.today())
+    finally:
+        await client.close()
+
+    # One fetch for the closed range, two for the range ending today
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_grouped_daily(tmp_path):
+    """Test grouped daily bars are requested by day and cached once closed."""
+    calls = []
+    grouped = [{"T": "AAPL", **BARS[0]}, {"T": "MSFT", **BARS[0]}]
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"status": "OK", "results": grouped})
+
+    client = _client(handler, cache_dir=str(tmp_path))
+    try:
+        for _ in range(2):
+            assert await client.get_grouped_daily(date(2024, 1, 2)) == grouped
+    finally:
+        await client.close()
+
+    assert calls == ["/v2/aggs/grouped/locale/us/market/stocks/2024-01-02"]
@@ -0,0 +1,369 @@
+"""Tests for portfolio API endpoints."""
+
+import asyncio
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.models import PortfolioDailyValue, Stock, StockPrice
+from app.services.price_cache import price_cache
+from app.services.valuation_service import ValuationService
+
+
+@pytest.fixture
+def sample_prices(db_session):
+    """Seed closing prices for the sample customer's holdings."""
+    closes = {
+        "AAPL": [
+            ("2024-01-02", "100.00"),
+            ("2024-01-03", "105.00"),
+            ("2024-01-04", "110.00"),
+        ],
+        "GOOGL": [("2024-01-02", "200.00"), ("2024-01-04", "190.00")],
+    }
+    for ticker, bars in closes.items():
+        db_session.add(Stock(ticker=ticker, name=ticker))
+        for day, close in bars:
+            db_session.add(
+                StockPrice(
+                    stock_ticker=ticker,
+                    date=date.fromisoformat(day),
+                    close_price=Decimal(close),
+                )
+            )
+    db_session.commit()
+    return closes
+
+
+def test_calculate_portfolio_returns(client, sample_customer_data, sample_prices):
+    """Test portfolio returns use the first and last close of each holding."""
+    create_response = client.post("/api/v1/customers/", json=sample_customer_data)
+    customer_id = create_response.json()["id"]
+
+    response = client.get(
+        f"/api/v1/portfolio/{customer_id}/returns",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-31"},
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    holdings = {holding["ticker"]: holding for holding in data["holdings"]}
+    assert holdings["AAPL"]["start_price"] == 100.0
+    assert holdings["AAPL"]["end_price"] == 110.0
+    assert holdings["GOOGL"]["start_price"] == 200.0
+    assert holdings["GOOGL"]["end_price"] == 190.0
+    # AAPL: 10 * (110 - 100) = 100, GOOGL: 5 * (190 - 200) = -50
+    assert data["total_return"] == 50.0
+    assert data["return_percentage"] == pytest.approx(50.0 / 2000.0 * 100)
+
+
+def test_calculate_portfolio_returns_skips_unpriced_holdings(
+    client, sample_customer_data, sample_prices
+):
+    """Test holdings without prices in the range are left out."""
+    create_response = client.post(
+        "/api/v1/customers/",
+        json={**sample_customer_data, "stocks": [{"ticker": "MSFT", "quantity": 3}]},
+    )
+    customer_id = create_response.json()["id"]
+
+    response = client.get(
+        f"/api/v1/portfolio/{customer_id}/returns",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-31"},
+    )
+    assert response.status_code == 200
+    assert response.json()["holdings"] == []
+
+
+def test_calculate_portfolio_returns_batch(client, sample_customer_data, sample_prices):
+    """Test batch returns stream one line per requested customer."""
+    first_id = client.post("/api/v1/customers/", json=sample_customer_data).json()["id"]
+    second_id = client.post(
+        "/api/v1/customers/",
+        json={**sample_customer_data, "stocks": [{"ticker": "AAPL", "quantity": 1}]},
+    ).json()["id"]
+    missing_id = "00000000-0000-0000-0000-000000000000"
+
+    response = client.post(
+        "/api/v1/portfolio/returns/batch",
+        json={
+            "customer_ids": [first_id, second_id, missing_id],
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["customer_id"] for line in lines] == [first_id, second_id, missing_id]
+
+    single = client.get(
+        f"/api/v1/portfolio/{first_id}/returns",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-31"},
+    ).json()
+    assert lines[0] == single
+    assert lines[1]["total_return"] == 10.0
+    assert "error" in lines[2]
+
+
+def test_calculate_portfolio_returns_batch_all_customers(
+    client, sample_customer_data, sample_prices
+):
+    """Test batch returns can cover every customer."""
+    for name in ("John Doe", "Jane Doe", "Jim Doe"):
+        client.post("/api/v1/customers/", json={**sample_customer_data, "name": name})
+
+    response = client.post(
+        "/api/v1/portfolio/returns/batch",
+        json={
+            "all_customers": True,
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-31",
+        },
+    )
+    assert response.status_code == 200
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert all(line["total_return"] == 50.0 for line in lines)
+
+
+def test_calculate_portfolio_returns_batch_requires_selection(client):
+    """Test batch requests must name customers or ask for all of them."""
+    response = client.post(
+        "/api/v1/portfolio/returns/batch",
+        json={"start_date": "2024-01-01", "end_date": "2024-01-31"},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("cache_bytes", [1024 * 1024, 0], ids=["cached", "uncached"])
+def test_portfolio_timeseries(
+    client, sample_customer_data, sample_prices, monkeypatch, cache_bytes
+):
+    """Test daily values forward-fill non-trading days."""
+    monkeypatch.setattr(price_cache, "max_bytes", cache_bytes)
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+
+    response = client.get(
+        f"/api/v1/portfolio/{customer_id}/timeseries",
+        params={"start_date": "2024-01-01", "end_date": "2024-01-05"},
+    )
+    assert response.status_code == 200
+
+    points = response.json()["points"]
+    assert [point["date"] for point in points] == [
+        "2024-01-01",
+        "2024-01-02",
+        "2024-01-03",
+        "2024-01-04",
+        "2024-01-05",
+    ]
+    # AAPL x10 and GOOGL x5; GOOGL has no close on 01-03
+    assert [point["market_value"] for point in points] == [
+        2000.0,
+        2000.0,
+        2050.0,
+        2050.0,
+        2050.0,
+    ]
+    assert [point["daily_return_percentage"] for point in points] == pytest.approx(
+        [0.0, 0.0, 2.5, 0.0, 0.0]
+    )
+    assert points[-1]["cumulative_return_percentage"] == pytest.approx(2.5)
+
+
+def test_portfolio_timeseries_invalid_range(client, sample_customer_data):
+    """Test a start date after the end date is rejected."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+
+    response = client.get(
+        f"/api/v1/portfolio/{customer_id}/timeseries",
+        params={"start_date": "2024-02-01", "end_date": "2024-01-01"},
+    )
+    assert response.status_code == 400
+
+
+def test_calculate_portfolio_returns_batch_totals_only(
+    client, sample_customer_data, sample_prices
+):
+    """Test totals read from stored daily values match the live calculation."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    request = {
+        "customer_ids": [customer_id],
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-31",
+    }
+
+    live = json.loads(client.post("/api/v1/portfolio/returns/batch", json=request).text)
+    stored = json.loads(
+        client.post(
+            "/api/v1/portfolio/returns/batch",
+            json={**request, "include_holdings": False},
+        ).text
+    )
+    assert stored["holdings"] == []
+    assert stored["total_return"] == live["total_return"] == 50.0
+    assert stored["return_percentage"] == pytest.approx(live["return_percentage"])
+
+
+def test_portfolio_returns_cache_invalidated_by_holdings_change(
+    client, sample_customer_data, sample_prices
+):
+    """Test repeated return calls are cached until the holdings change."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    url = f"/api/v1/portfolio/{customer_id}/returns"
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+    def hits():
+        return REGISTRY.get_sample_value("portfolio_return_cache_hits_total")
+
+    first = client.get(url, params=params).json()
+    hits_before = hits()
+    assert client.get(url, params=params).json() == first
+    assert hits() == hits_before + 1
+
+    client.put(
+        f"/api/v1/customers/{customer_id}",
+        json={"stocks": [{"ticker": "AAPL", "quantity": 1}]},
+    )
+    updated = client.get(url, params=params).json()
+    assert hits() == hits_before + 1
+    assert updated["total_return"] == 10.0
+
+
+def test_portfolio_returns_cache_invalidated_by_other_processes(
+    client, db_session, sample_customer_data, sample_prices
+):
+    """Test cached returns notice price writes committed by another process."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    url = f"/api/v1/portfolio/{customer_id}/returns"
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    assert client.get(url, params=params).json()["total_return"] == 50.0
+
+    # As an ingestion worker would, without touching this process's caches
+    aapl = db_session.get(Stock, "AAPL")
+    db_session.add(
+        StockPrice(
+            stock_ticker="AAPL",
+            date=date(2024, 1, 5),
+            close_price=Decimal("120.00"),
+        )
+    )
+    aapl.updated_at = datetime.utcnow()
+    db_session.commit()
+
+    assert client.get(url, params=params).json()["total_return"] == 150.0
+
+
+def test_portfolio_values_refreshed_after_holdings_change(
+    client, db_session, sample_customer_data, sample_prices, monkeypatch
+):
+    """Test holdings changes store daily values after the response."""
+    customer_id = client.post("/api/v1/customers/", json=sample_customer_data).json()[
+        "id"
+    ]
+    assert db_session.query(PortfolioDailyValue).count() == 3
+
+    deferred = []
+
+    async def defer(*args):
+        deferred.append(args)
+
+    monkeypatch.setattr(ValuationService, "refresh_later", defer)
+    client.put(
+        f"/api/v1/customers/{customer_id}",
+        json={"stocks": [{"ticker": "AAPL", "quantity": 1}]},
+    )
+    db_session.expire_all()
+    assert db_session.query(PortfolioDailyValue).count() == 0
+    assert len(deferred) == 1
+
+    # Until the refresh has run, totals are computed from holdings
+    request = {
+        "customer_ids": [customer_id],
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-31",
+        "include_holdings": False,
+    }
+    totals = json.loads(
+        client.post("/api/v1/portfolio/returns/batch", json=request).text
+    )
+    assert totals["total_return"] == 10.0
+
+    monkeypatch.undo()
+    asyncio.run(ValuationService.refresh_later(*deferred[0]))
+    db_session.expire_all()
+    assert sorted(
+        float(row.market_value) for row in db_session.query(PortfolioDailyValue)
+    ) == [100.0, 105.0, 110.0]
+    totals = json.loads(
+        client.post("/api/v1/portfolio/returns/batch", json=request).text
+    )
+    assert totals["total_return"] == 10.0
+
+
+def test_portfolio_endpoints_agree_on_holdings_starting_mid_range(
+    client, db_session, sample_customer_data, sample_prices
+):
+    """Test stored and computed returns agree when a holding starts mid-range."""
+    db_session.add(Stock(ticker="XYZ", name="XYZ"))
+    for day, close in (("2024-01-03", "50.00"), ("2024-01-04", "60.00")):
+        db_session.add(
+            StockPrice(
+                stock_ticker="XYZ",
+                date=date.fromisoformat(day),
+                close_price=Decimal(close),
+            )
+        )
+    db_session.commit()
+    customer_id = client.post(
+        "/api/v1/customers/",
+        json={
+            **sample_customer_data,
+            "stocks": [
+                {"ticker": "AAPL", "quantity": 10},
+                {"ticker": "XYZ", "quantity": 5},
+            ],
+        },
+    ).json()["id"]
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    request = {"customer_ids": [customer_id], **params}
+
+    single = client.get(f"/api/v1/portfolio/{customer_id}/returns", params=params)
+    batch = json.loads(
+        client.post("/api/v1/portfolio/returns/batch", json=request).text
+    )
+    totals = json.loads(
+        client.post(
+            "/api/v1/portfolio/returns/batch",
+            json={**request, "include_holdings": False},
+        ).text
+    )
+    # AAPL: 10 * (110 - 100) = 100, XYZ: 5 * (60 - 50) = 50
+    for result in (single.json(), batch, totals):
+        assert result["total_return"] == 150.0
+        assert result["return_percentage"] == pytest.approx(150.0 / 1250.0 * 100)
+
+    url = f"/api/v1/portfolio/{customer_id}/timeseries"
+    stored = client.get(url, params=params).json()["points"]
+    db_session.query(PortfolioDailyValue).delete()
+    db_session.commit()
+    computed = client.get(url, params=params).json()["points"]
+    assert stored == computed
+    assert stored[0]["market_value"] == 1250.0
+    assert stored[-1]["market_value"] == 1400.0
@@ -0,0 +1,108 @@
+"""Tests for the in-memory price cache."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models import Stock, StockPrice
+from app.services.price_cache import PriceCache, float_to_cents
+
+
+def _seed_prices(db_session, ticker, closes):
+    db_session.add(Stock(ticker=ticker, name=ticker))
+    for day, close in closes:
+        db_session.add(
+            StockPrice(
+                stock_ticker=ticker,
+                date=date.fromisoformat(day),
+                close_price=Decimal(close),
+            )
+        )
+    db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_range_lookup(db_session, async_db_session):
+    """Test date-range lookups return the closes inside the range."""
+    _seed_prices(
+        db_session,
+        "AAPL",
+        [("2024-01-02", "100.00"), ("2024-01-03", "101.25"), ("2024-01-05", "99.10")],
+    )
+    cache = PriceCache(max_bytes=1024 * 1024, ttl_seconds=60)
+
+    history = await cache.load(async_db_session, ["AAPL", "MSFT"])
+    assert set(history) == {"AAPL"}
+
+    points = history["AAPL"].points(date(2024, 1, 3), date(2024, 1, 4))
+    assert [(p.date, p.close_price) for p in points] == [
+        (date(2024, 1, 3), Decimal("101.25"))
+    ]
+    assert history["AAPL"].boundaries(date(2024, 1, 1), date(2024, 1, 31)) == (
+        10000,
+        9910,
+    )
+    assert history["AAPL"].boundaries(date(2024, 2, 1), date(2024, 2, 28)) is None
+
+
+def test_float_to_cents():
+    """Test float prices round to cents like their decimal text would."""
+    assert float_to_cents(189.95) == 18995
+    assert float_to_cents(1.005) == 101
+    assert float_to_cents(0.1234) == 12
+    assert float_to_cents(12.0) == 1200
+    assert float_to_cents(0.0049999999) == 0
+    assert float_to_cents(-1.005) == -101
+
+
+@pytest.mark.asyncio
+async def test_invalidate_reloads_ticker(db_session, async_db_session):
+    """Test invalidated tickers are read again from the database."""
+    _seed_prices(db_session, "AAPL", [("2024-01-02", "100.00")])
+    cache = PriceCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    await cache.load(async_db_session, ["AAPL"])
+
+    db_session.add(
+        StockPrice(stock_ticker="AAPL", date=date(2024, 1, 3), close_price=Decimal("1"))
+    )
+    db_session.commit()
+    assert len((await cache.load(async_db_session, ["AAPL"]))["AAPL"].dates) == 1
+
+    cache.invalidate("AAPL")
+    assert len((await cache.load(async_db_session, ["AAPL"]))["AAPL"].dates) == 2
+
+
+@pytest.mark.asyncio
+async def test_reloads_ticker_written_elsewhere(db_session, async_db_session):
+    """Test tickers whose stocks.updated_at moved are read again."""
+    _seed_prices(db_session, "AAPL", [("2024-01-02", "100.00")])
+    cache = PriceCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    await cache.load(async_db_session, ["AAPL"])
+
+    # As another process's StockService.store_price_rows would
+    db_session.add(
+        StockPrice(stock_ticker="AAPL", date=date(2024, 1, 3), close_price=Decimal("1"))
+    )
+    db_session.get(Stock, "AAPL").updated_at = datetime.utcnow()
+    db_session.commit()
+    assert len((await cache.load(async_db_session, ["AAPL"]))["AAPL"].dates) == 2
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used(db_session, async_db_session):
+    """Test the cache stays within its memory budget by evicting LRU tickers."""
+    for ticker in ("AAPL", "MSFT", "GOOGL"):
+        _seed_prices(db_session, ticker, [("2024-01-02", "10.00")])
+    probe = PriceCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    entry_size = (await probe.load(async_db_session, ["AAPL"]))["AAPL"].nbytes
+
+    cache = PriceCache(max_bytes=entry_size * 2, ttl_seconds=60)
+    await cache.load(async_db_session, ["AAPL"])
+    await cache.load(async_db_session, ["MSFT"])
+    cache.get("AAPL")
+    await cache.load(async_db_session, ["GOOGL"])
+
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") is not None
+    assert cache.size <= cache.max_bytes
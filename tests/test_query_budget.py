@@ -0,0 +1,34 @@
+"""Tests for SQL statement budgets."""
+
+import pytest
+from sqlalchemy import select
+
+from app.db.query_budget import QueryBudgetExceeded, query_budget
+from app.models import Customer
+
+
+@pytest.mark.asyncio
+async def test_get_customer_query_budget(async_client, sample_customer_data):
+    """Test fetching a customer with holdings stays within two statements."""
+    response = await async_client.post("/api/v1/customers/", json=sample_customer_data)
+    customer_id = response.json()["id"]
+
+    with query_budget(2, "GET /customers/{id}") as counter:
+        response = await async_client.get(f"/api/v1/customers/{customer_id}")
+
+    assert response.status_code == 200
+    assert 0 < counter.count <= 2
+
+
+@pytest.mark.asyncio
+async def test_query_budget_reports_repeated_statements(async_db_session):
+    """Test an overrun lists statements issued once per row."""
+    with pytest.raises(QueryBudgetExceeded) as excinfo:
+        with query_budget(2, "loop"):
+            for name in ("a", "b", "c"):
+                await async_db_session.execute(
+                    select(Customer).where(Customer.name == name)
+                )
+
+    assert "loop issued 3 SQL statements (budget 2)" in str(excinfo.value)
+    assert "3x SELECT" in str(excinfo.value)
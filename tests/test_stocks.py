@@ -0,0 +1,445 @@
+"""Tests for stock API endpoints."""
+
+import asyncio
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+import pytest
+
+from app.db.partitions import partitions_between
+from app.models import IngestionJob, Portfolio, PortfolioDailyValue, StockPrice
+from app.services import ingestion_service
+from app.services.ingestion_service import IngestionService, RateLimiter
+from app.services.job_service import JobService
+from app.services.stock_service import StockService
+from app.services.valuation_service import ValuationService
+from tests.conftest import TestingAsyncSessionLocal
+
+
+def _bar(day: str, close: float) -> dict:
+    timestamp = datetime.strptime(day, "%Y-%m-%d").replace(hour=12).timestamp()
+    return {
+        "t": int(timestamp * 1000),
+        "o": close - 1,
+        "h": close + 1,
+        "l": close - 2,
+        "c": close,
+        "v": 1000,
+    }
+
+
+@pytest.fixture
+def polygon_bars(monkeypatch):
+    """Replace the Polygon fetch with a mutable list of canned bars."""
+    bars = []
+
+    async def fake_fetch(ticker, start_date, end_date):
+        return list(bars)
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+    return bars
+
+
+def test_populate_stock_data_reports_row_counts(client, db_session, polygon_bars):
+    """Test repeated ingests update existing bars instead of duplicating them."""
+    polygon_bars.extend([_bar("2024-01-02", 100.0), _bar("2024-01-03", 101.5)])
+
+    response = client.post("/api/v1/stocks/populate/aapl")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ticker"] == "AAPL"
+    assert data["rows_inserted"] == 2
+    assert data["rows_updated"] == 0
+
+    polygon_bars[1] = _bar("2024-01-03", 102.0)
+    polygon_bars.append(_bar("2024-01-04", 103.0))
+
+    response = client.post("/api/v1/stocks/populate/AAPL")
+    data = response.json()
+    assert data["rows_inserted"] == 1
+    assert data["rows_updated"] == 2
+
+    closes = {
+        price.date.isoformat(): float(price.close_price)
+        for price in db_session.query(StockPrice).filter_by(stock_ticker="AAPL")
+    }
+    assert closes == {"2024-01-02": 100.0, "2024-01-03": 102.0, "2024-01-04": 103.0}
+
+
+def test_ingestion_ranges():
+    """Test only days from the watermark on are planned, with paged backfills."""
+    today = date(2024, 6, 30)
+    assert StockService.ingestion_ranges(None, today) == [
+        (today - timedelta(days=14), today)
+    ]
+
+    stored = (date(2024, 1, 2), date(2024, 6, 27))
+    assert StockService.ingestion_ranges(stored, today) == [(date(2024, 6, 27), today)]
+
+    ranges = StockService.ingestion_ranges(stored, today, date(2022, 1, 1))
+    assert ranges == [
+        (date(2022, 1, 1), date(2022, 12, 31)),
+        (date(2023, 1, 1), date(2023, 12, 31)),
+        (date(2024, 1, 1), date(2024, 1, 1)),
+        (date(2024, 6, 27), today),
+    ]
+
+
+def test_partitions_between():
+    """Test partitions cover a date range with half-open bounds."""
+    assert partitions_between(date(2023, 6, 1), date(2024, 1, 1), "year") == [
+        ("stock_prices_2023", date(2023, 1, 1), date(2024, 1, 1)),
+        ("stock_prices_2024", date(2024, 1, 1), date(2025, 1, 1)),
+    ]
+    assert partitions_between(date(2023, 12, 31), date(2024, 1, 31), "month") == [
+        ("stock_prices_2023_12", date(2023, 12, 1), date(2024, 1, 1)),
+        ("stock_prices_2024_01", date(2024, 1, 1), date(2024, 2, 1)),
+    ]
+    with pytest.raises(ValueError):
+        partitions_between(date(2024, 1, 1), date(2024, 1, 1), "week")
+
+
+def test_populate_stock_data_fetches_from_watermark(client, monkeypatch):
+    """Test a refresh only requests the days since the last stored price."""
+    requested = []
+
+    async def fake_fetch(ticker, start_date, end_date):
+        requested.append((start_date, end_date))
+        return [_bar("2024-01-02", 100.0), _bar("2024-01-03", 101.0)]
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+
+    client.post("/api/v1/stocks/populate/AAPL")
+    assert requested[0][1] - requested[0][0] == timedelta(days=14)
+
+    requested.clear()
+    response = client.post(
+        "/api/v1/stocks/populate/AAPL", params={"backfill_from": "2023-12-01"}
+    )
+    assert response.status_code == 200
+    assert requested[0] == (date(2023, 12, 1), date(2024, 1, 1))
+    # Forward from the watermark, paged up to today
+    assert requested[1][0] == date(2024, 1, 3)
+    assert requested[-1][1] == date.today()
+
+
+@pytest.mark.asyncio
+async def test_ingest_grouped(db_session, async_db_session, monkeypatch):
+    """Test grouped ingestion fetches each missing day once for all tickers."""
+    requested = []
+
+    async def fake_grouped(day):
+        requested.append(day)
+        if day == date(2024, 1, 10):
+            raise RuntimeError("upstream error")
+        bar = _bar(day.isoformat(), 10.0 + day.day)
+        return [{"T": ticker, **bar} for ticker in ("AAPL", "MSFT", "UNTRACKED")]
+
+    async def fake_fetch(ticker, start_date, end_date):
+        return [_bar("2024-01-08", 50.0)]
+
+    monkeypatch.setattr(StockService, "fetch_grouped_daily", fake_grouped)
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+    monkeypatch.setattr(ingestion_service.settings, "ingest_initial_days", 4)
+    # AAPL is stored up to Monday 8 January
+    await IngestionService.ingest_tickers(
+        async_db_session, ["AAPL"], requests_per_second=0
+    )
+
+    summary = await IngestionService.ingest_grouped(
+        async_db_session,
+        ["AAPL", "MSFT"],
+        requests_per_second=0,
+        end_date=date(2024, 1, 11),
+    )
+
+    # MSFT is new and needs 7-11 January (weekdays 8-11); AAPL needs 8-11
+    assert requested == [date(2024, 1, day) for day in (8, 9, 10, 11)]
+    assert summary["requests"] == 4
+    assert summary["failed_days"] == {"2024-01-10": "upstream error"}
+    assert summary["tickers"]["MSFT"]["status"] == "error"
+    assert summary["tickers"]["AAPL"]["bars"] == 3
+    assert (summary["inserted"], summary["updated"]) == (5, 1)
+
+    closes = {
+        (price.stock_ticker, price.date.day): float(price.close_price)
+        for price in db_session.query(StockPrice)
+    }
+    assert closes == {
+        ("AAPL", 8): 18.0,
+        ("AAPL", 9): 19.0,
+        ("AAPL", 11): 21.0,
+        ("MSFT", 8): 18.0,
+        ("MSFT", 9): 19.0,
+        ("MSFT", 11): 21.0,
+    }
+
+
+def test_get_stock(client, polygon_bars):
+    """Test retrieving a populated stock."""
+    client.post("/api/v1/stocks/populate/MSFT")
+
+    response = client.get("/api/v1/stocks/msft")
+    assert response.status_code == 200
+    assert response.json()["ticker"] == "MSFT"
+
+
+def test_get_nonexistent_stock(client):
+    """Test retrieving a stock that was never populated."""
+    response = client.get("/api/v1/stocks/NOPE")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_ingest_tickers_summarizes_failures(
+    db_session, async_db_session, monkeypatch
+):
+    """Test concurrent ingestion records per-ticker success and failure."""
+
+    async def fake_fetch(ticker, start_date, end_date):
+        await asyncio.sleep(0.01)
+        if ticker == "BAD":
+            raise RuntimeError("upstream error")
+        return [_bar("2024-01-02", 10.0)]
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+
+    summary = await IngestionService.ingest_tickers(
+        async_db_session, ["AAPL", "BAD", "MSFT"], concurrency=2, requests_per_second=0
+    )
+
+    assert summary["total"] == 3
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 1
+    assert summary["tickers"]["AAPL"] == {"status": "ok", "inserted": 1, "updated": 0}
+    assert summary["tickers"]["BAD"] == {"status": "error", "error": "upstream error"}
+    assert db_session.query(StockPrice).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_ingest_tickers_refreshes_valuations_once(
+    async_client, db_session, async_db_session, monkeypatch, sample_customer_data
+):
+    """Test concurrent ingestion refreshes stored valuations once per batch."""
+    await async_client.post("/api/v1/customers/", json=sample_customer_data)
+
+    async def fake_fetch(ticker, start_date, end_date):
+        return [_bar("2024-01-02", 100.0 if ticker == "AAPL" else 200.0)]
+
+    refreshes = []
+    refresh_for_tickers = ValuationService.refresh_for_tickers
+
+    async def spy(db, from_dates):
+        refreshes.append(dict(from_dates))
+        return await refresh_for_tickers(db, from_dates)
+
+    reported = []
+
+    async def on_result(ticker, result):
+        values = db_session.query(PortfolioDailyValue).all()
+        db_session.commit()
+        reported.append((ticker, [float(row.market_value) for row in values]))
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+    monkeypatch.setattr(ValuationService, "refresh_for_tickers", spy)
+
+    await IngestionService.ingest_tickers(
+        async_db_session,
+        ["AAPL", "GOOGL"],
+        requests_per_second=0,
+        on_result=on_result,
+    )
+
+    # First bars of a ticker recompute the portfolios holding it in full
+    assert refreshes == [{"AAPL": None, "GOOGL": None}]
+    # Results are reported once the valuations they affect are stored
+    assert sorted(reported) == [("AAPL", [2000.0]), ("GOOGL", [2000.0])]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests():
+    """Test the rate limiter enforces its per-second budget."""
+    limiter = RateLimiter(rate=50)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(5):
+        await limiter.acquire()
+    assert loop.time() - started >= 4 / 50 * 0.9
+
+
+def test_populate_stock_data_updates_portfolio_values(
+    client, db_session, polygon_bars, sample_customer_data
+):
+    """Test ingesting bars refreshes stored values of portfolios holding them."""
+    polygon_bars.append(_bar("2024-01-02", 100.0))
+    client.post("/api/v1/stocks/populate/AAPL")
+    customer = client.post("/api/v1/customers/", json=sample_customer_data).json()
+
+    polygon_bars[0] = _bar("2024-01-02", 90.0)
+    polygon_bars.append(_bar("2024-01-03", 120.0))
+    client.post("/api/v1/stocks/populate/AAPL")
+
+    portfolio = db_session.query(Portfolio).filter_by(customer_id=UUID(customer["id"]))
+    values = {
+        row.date.isoformat(): float(row.market_value)
+        for row in db_session.query(PortfolioDailyValue).filter_by(
+            portfolio_id=portfolio.one().id
+        )
+    }
+    assert values == {"2024-01-02": 900.0, "2024-01-03": 1200.0}
+
+
+def test_portfolio_values_exclude_holdings_before_first_bar(
+    client, db_session, polygon_bars, sample_customer_data
+):
+    """Test holdings are worth nothing before their ticker's first bar."""
+    polygon_bars.extend([_bar("2024-01-02", 100.0), _bar("2024-01-03", 110.0)])
+    client.post("/api/v1/stocks/populate/AAPL")
+    polygon_bars[:] = [_bar("2024-01-03", 200.0)]
+    client.post("/api/v1/stocks/populate/GOOGL")
+    customer = client.post("/api/v1/customers/", json=sample_customer_data).json()
+    portfolio_id = (
+        db_session.query(Portfolio).filter_by(customer_id=UUID(customer["id"])).one().id
+    )
+
+    def stored_values():
+        db_session.expire_all()
+        return {
+            row.date.isoformat(): float(row.market_value)
+            for row in db_session.query(PortfolioDailyValue).filter_by(
+                portfolio_id=portfolio_id
+            )
+        }
+
+    # AAPL x10 and GOOGL x5; GOOGL has no bar on 01-02 yet
+    assert stored_values() == {"2024-01-02": 1000.0, "2024-01-03": 2100.0}
+
+    # A bar predating GOOGL's history revalues the earlier days too
+    polygon_bars[:] = [_bar("2024-01-02", 190.0)]
+    client.post("/api/v1/stocks/populate/GOOGL")
+    assert stored_values() == {"2024-01-02": 1950.0, "2024-01-03": 2100.0}
+
+
+def test_populate_stock_data_invalidates_cached_returns(
+    client, polygon_bars, sample_customer_data
+):
+    """Test ingesting bars for a held ticker refreshes cached returns."""
+    polygon_bars.extend([_bar("2024-01-02", 100.0), _bar("2024-01-03", 110.0)])
+    client.post("/api/v1/stocks/populate/AAPL")
+    customer_id = client.post(
+        "/api/v1/customers/",
+        json={**sample_customer_data, "stocks": [{"ticker": "AAPL", "quantity": 10}]},
+    ).json()["id"]
+    url = f"/api/v1/portfolio/{customer_id}/returns"
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    assert client.get(url, params=params).json()["total_return"] == 100.0
+
+    polygon_bars.append(_bar("2024-01-04", 120.0))
+    client.post("/api/v1/stocks/populate/AAPL")
+    assert client.get(url, params=params).json()["total_return"] == 200.0
+
+
+def test_get_stock_conditional(client, polygon_bars):
+    """Test If-None-Match on an unchanged stock returns 304."""
+    client.post("/api/v1/stocks/populate/MSFT")
+
+    etag = client.get("/api/v1/stocks/MSFT").headers["ETag"]
+    response = client.get("/api/v1/stocks/msft", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.get("/api/v1/stocks/MSFT", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_fortune500_job_records_progress(async_client, monkeypatch):
+    """Test the Fortune 500 ingest is queued, run by a worker and reported."""
+
+    async def fake_fetch(ticker, start_date, end_date):
+        if ticker == "BAD":
+            raise RuntimeError("upstream error")
+        return [_bar("2024-01-02", 10.0)]
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+    monkeypatch.setattr(StockService, "FORTUNE_500_TICKERS", ["AAPL", "BAD", "MSFT"])
+    monkeypatch.setattr(ingestion_service.settings, "polygon_requests_per_second", 0)
+
+    response = await async_client.post("/api/v1/stocks/populate-fortune500")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["Location"].endswith(f"/api/v1/stocks/jobs/{job_id}")
+
+    job = (await async_client.get(f"/api/v1/stocks/jobs/{job_id}")).json()
+    assert job["status"] == "pending"
+    assert job["remaining"] == 3
+
+    async with TestingAsyncSessionLocal() as db:
+        claimed = await JobService.claim_next(db, "worker-1")
+    assert str(claimed) == job_id
+    await JobService.run_job(claimed, TestingAsyncSessionLocal)
+
+    job = (await async_client.get(f"/api/v1/stocks/jobs/{job_id}")).json()
+    assert job["status"] == "completed"
+    assert job["attempts"] == 1
+    assert (job["succeeded"], job["failed"], job["remaining"]) == (2, 1, 0)
+    assert job["progress"]["AAPL"] == {"status": "ok", "inserted": 1, "updated": 0}
+    assert job["progress"]["BAD"] == {"status": "error", "error": "upstream error"}
+
+    missing = await async_client.get(f"/api/v1/stocks/jobs/{UUID(int=0)}")
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_claim_next_job(async_db_session):
+    """Test jobs are claimed oldest first, once, and reclaimed when stale."""
+    first = await JobService.enqueue_ingestion(async_db_session, ["AAPL"])
+    second = await JobService.enqueue_ingestion(async_db_session, ["MSFT"])
+
+    assert await JobService.claim_next(async_db_session, "w1") == first.id
+    assert await JobService.claim_next(async_db_session, "w2") == second.id
+    assert await JobService.claim_next(async_db_session, "w3") is None
+
+    # A worker that stopped sending heartbeats loses its job
+    first.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    await async_db_session.commit()
+    assert await JobService.claim_next(async_db_session, "w3") == first.id
+    await async_db_session.refresh(first)
+    assert (first.worker_id, first.attempts) == ("w3", 2)
+
+    # Until it has used up its attempts
+    first.attempts = 3
+    first.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    await async_db_session.commit()
+    assert await JobService.claim_next(async_db_session, "w4") is None
+    await async_db_session.refresh(first)
+    assert first.status == IngestionJob.FAILED
+
+
+@pytest.mark.asyncio
+async def test_stopped_job_is_released_after_current_ticker(
+    async_db_session, monkeypatch
+):
+    """Test stopping a worker releases its job after the ticker being stored."""
+    stop = asyncio.Event()
+
+    async def fake_fetch(ticker, start_date, end_date):
+        if ticker == "MSFT":
+            # Stop while AAPL is being stored
+            await asyncio.sleep(0.01)
+            stop.set()
+        return [_bar("2024-01-02", 10.0)]
+
+    monkeypatch.setattr(StockService, "fetch_stock_data_from_polygon", fake_fetch)
+    monkeypatch.setattr(ingestion_service.settings, "ingest_concurrency", 1)
+    monkeypatch.setattr(ingestion_service.settings, "polygon_requests_per_second", 0)
+
+    job = await JobService.enqueue_ingestion(async_db_session, ["AAPL", "MSFT", "NVDA"])
+    assert await JobService.claim_next(async_db_session, "w1") == job.id
+    await JobService.run_job(job.id, TestingAsyncSessionLocal, stop)
+
+    await async_db_session.refresh(job)
+    assert job.status == IngestionJob.PENDING
+    assert (job.worker_id, job.attempts) == (None, 0)
+    assert list(job.progress) == ["AAPL"]
+    assert await JobService.claim_next(async_db_session, "w2") == job.id